@@ -0,0 +1,33 @@
+"""add variant_index to generation_history
+
+Revision ID: a7d2e5f8c3b1
+Revises: f3c8a1d6b9e4
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d2e5f8c3b1"
+down_revision: Union[str, Sequence[str], None] = "f3c8a1d6b9e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # generation_type is a plain VARCHAR, so the new 'variant' value needs no
+    # type change; only single-image generations exist so far (NULL index)
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.add_column(sa.Column("variant_index", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.drop_column("variant_index")
@@ -0,0 +1,33 @@
+"""add lease_expires_at to generation_history
+
+Revision ID: b8e4f2a6c9d3
+Revises: a7d2e5f8c3b1
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e4f2a6c9d3"
+down_revision: Union[str, Sequence[str], None] = "a7d2e5f8c3b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows already in flight get no lease (NULL), so they count as abandoned
+    # and can be resumed
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.add_column(sa.Column("lease_expires_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.drop_column("lease_expires_at")
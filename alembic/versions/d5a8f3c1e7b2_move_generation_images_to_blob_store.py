@@ -0,0 +1,196 @@
+"""move generation images out of generation_history into the blob store
+
+Revision ID: d5a8f3c1e7b2
+Revises: c4d1e7b9a2f3
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from PIL import Image
+
+from manganize_web.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a8f3c1e7b2"
+down_revision: Union[str, Sequence[str], None] = "c4d1e7b9a2f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+generation_history = sa.table(
+    "generation_history",
+    sa.column("id", sa.String),
+    sa.column("image_data", sa.LargeBinary),
+    sa.column("image_hash", sa.String),
+    sa.column("image_size", sa.Integer),
+    sa.column("image_width", sa.Integer),
+    sa.column("image_height", sa.Integer),
+)
+
+
+# The blob store layout as of this revision, inlined so that later changes
+# to the application's blob store cannot change what this migration does
+class _LocalBlobs:
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    def _path(self, key: str) -> Path:
+        return self._root / key[:2] / key
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def get(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+
+class _ObjectStorageBlobs:
+    def __init__(self, prefix: str) -> None:
+        import boto3
+        from botocore.config import Config as BotoConfig
+
+        self._prefix = prefix.strip("/")
+        self._bucket = settings.storage_bucket
+        self._client = boto3.client(
+            "s3",
+            region_name=settings.storage_region,
+            endpoint_url=settings.storage_endpoint_url,
+            aws_access_key_id=settings.storage_access_key_id,
+            aws_secret_access_key=settings.storage_secret_access_key,
+            config=BotoConfig(
+                signature_version="s3v4",
+                s3={
+                    "addressing_style": (
+                        "path" if settings.storage_force_path_style else "virtual"
+                    )
+                },
+            ),
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self._prefix}/{key[:2]}/{key}"
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in {"404", "NoSuchKey"}:
+                return False
+            raise
+        return True
+
+    def put(self, key: str, data: bytes) -> None:
+        self._client.put_object(
+            Bucket=self._bucket,
+            Key=self._object_key(key),
+            Body=data,
+            ContentType="image/png",
+        )
+
+    def get(self, key: str) -> bytes:
+        response = self._client.get_object(
+            Bucket=self._bucket, Key=self._object_key(key)
+        )
+        return response["Body"].read()
+
+
+def _blobs() -> _LocalBlobs | _ObjectStorageBlobs:
+    if settings.blob_store_backend == "object_storage":
+        return _ObjectStorageBlobs(settings.blob_store_object_prefix)
+    return _LocalBlobs(Path(settings.blob_store_dir))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.add_column(
+            sa.Column("image_hash", sa.String(length=64), nullable=True)
+        )
+        batch_op.add_column(sa.Column("image_size", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("image_width", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("image_height", sa.Integer(), nullable=True))
+        batch_op.create_index("idx_image_hash", ["image_hash"], unique=False)
+
+    # Move existing images one row at a time to keep memory usage flat
+    bind = op.get_bind()
+    blobs = _blobs()
+    generation_ids = bind.execute(
+        sa.select(generation_history.c.id).where(
+            generation_history.c.image_data.is_not(None)
+        )
+    ).scalars()
+    for generation_id in list(generation_ids):
+        image_data = bind.execute(
+            sa.select(generation_history.c.image_data).where(
+                generation_history.c.id == generation_id
+            )
+        ).scalar_one()
+        image_hash = hashlib.sha256(image_data).hexdigest()
+        with Image.open(io.BytesIO(image_data)) as image:
+            width, height = image.size
+        if not blobs.exists(image_hash):
+            blobs.put(image_hash, image_data)
+        bind.execute(
+            sa.update(generation_history)
+            .where(generation_history.c.id == generation_id)
+            .values(
+                image_hash=image_hash,
+                image_size=len(image_data),
+                image_width=width,
+                image_height=height,
+            )
+        )
+
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.drop_column("image_data")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.add_column(sa.Column("image_data", sa.LargeBinary(), nullable=True))
+
+    # Copy images back inline; blobs are left in place
+    bind = op.get_bind()
+    blobs = _blobs()
+    rows = bind.execute(
+        sa.select(generation_history.c.id, generation_history.c.image_hash).where(
+            generation_history.c.image_hash.is_not(None)
+        )
+    ).all()
+    for generation_id, image_hash in rows:
+        bind.execute(
+            sa.update(generation_history)
+            .where(generation_history.c.id == generation_id)
+            .values(image_data=blobs.get(image_hash))
+        )
+
+    with op.batch_alter_table("generation_history") as batch_op:
+        batch_op.drop_index("idx_image_hash")
+        batch_op.drop_column("image_height")
+        batch_op.drop_column("image_width")
+        batch_op.drop_column("image_size")
+        batch_op.drop_column("image_hash")
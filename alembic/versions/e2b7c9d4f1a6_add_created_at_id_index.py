@@ -0,0 +1,33 @@
+"""add composite (created_at, id) index for keyset pagination
+
+Revision ID: e2b7c9d4f1a6
+Revises: d5a8f3c1e7b2
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b7c9d4f1a6"
+down_revision: Union[str, Sequence[str], None] = "d5a8f3c1e7b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "idx_created_at_id",
+        "generation_history",
+        ["created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_created_at_id", table_name="generation_history")
@@ -0,0 +1,34 @@
+"""add content_hash to upload_sources
+
+Revision ID: f3c8a1d6b9e4
+Revises: e2b7c9d4f1a6
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a1d6b9e4"
+down_revision: Union[str, Sequence[str], None] = "e2b7c9d4f1a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing uploads keep a NULL hash; they expire within UPLOAD_TTL_HOURS
+    with op.batch_alter_table("upload_sources") as batch_op:
+        batch_op.add_column(
+            sa.Column("content_hash", sa.String(length=64), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("upload_sources") as batch_op:
+        batch_op.drop_column("content_hash")
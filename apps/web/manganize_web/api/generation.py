@@ -1,11 +1,20 @@
 """API endpoints for manga generation"""
 
-import io
+from collections.abc import AsyncIterator, Awaitable, Callable
 from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import Response
-from PIL import Image
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import Response, StreamingResponse
+from manganize_core.instrumentation import instrumentation
 from sse_starlette.sse import EventSourceResponse
 
 from manganize_web.models.database import get_db_session
@@ -13,12 +22,27 @@ from manganize_web.models.generation import GenerationTypeEnum
 from manganize_web.repositories.database_session import DatabaseSession
 from manganize_web.schemas.generation import (
     CreateRevisionRequest,
+    GenerationStatus,
     RevisionCreateResponse,
+    StoredImage,
 )
+from manganize_web.services.blob_store import BlobNotFoundError, blob_store
+from manganize_web.services.event_bus import TERMINAL_STATUSES, event_bus
 from manganize_web.services.generator import generator_service
+from manganize_web.services.job_runner import JobQueueFullError, job_runner
+from manganize_web.services.thumbnail import thumbnail_service
 from manganize_web.services.upload_source import upload_source_service
 from manganize_web.templates import templates
 from manganize_web.utils.filename import generate_download_filename
+from manganize_web.utils.http_cache import (
+    ByteRange,
+    RangeNotSatisfiableError,
+    if_none_match,
+    if_range,
+    make_etag,
+    parse_range,
+)
+from manganize_web.utils.streams import iterate_in_context
 
 router = APIRouter()
 
@@ -63,26 +87,39 @@ async def create_generation(
     topic: str = Form(""),
     character: str = Form(...),
     upload_id: str | None = Form(None),
+    variants: int = Form(1),
     db_session: DatabaseSession = Depends(get_db_session),
 ):
     """
     Create a new manga generation request.
 
+    With ``variants`` > 1 the research runs once and that many images are
+    generated from it; progress is streamed for the returned (parent)
+    generation.
+
     Returns HTML partial with progress indicator and SSE connection.
     """
     # Delegate to service layer
     try:
-        generation_id = await generator_service.create_generation_request(
-            topic=topic,
-            character_name=character,
-            upload_id=upload_id,
-            db_session=db_session,
-        )
+        # The queue slot is held while the row is created, so a full queue
+        # never leaves an orphaned pending row behind
+        with job_runner.reserve():
+            generation_id = await generator_service.create_generation_request(
+                topic=topic,
+                character_name=character,
+                upload_id=upload_id,
+                db_session=db_session,
+                variants=variants,
+            )
+            job_runner.submit(generation_id, reserved=True)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     # Return HTML with SSE connection
-    # The actual generation will be triggered by the SSE stream endpoint
+    # The generation runs in the background job runner; the SSE stream
+    # endpoint only subscribes to its progress
     return templates.TemplateResponse(
         "partials/progress.html",
         {
@@ -133,53 +170,141 @@ async def create_revision_generation(
         Revision generation ID
     """
     try:
-        revision_generation_id = await generator_service.create_revision_request(
-            parent_generation_id=generation_id,
-            revision_payload=payload.model_dump(mode="json", exclude_none=True),
-            db_session=db_session,
-        )
+        with job_runner.reserve():
+            revision_generation_id = await generator_service.create_revision_request(
+                parent_generation_id=generation_id,
+                revision_payload=payload.model_dump(mode="json", exclude_none=True),
+                db_session=db_session,
+            )
+            job_runner.submit(revision_generation_id, reserved=True)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     return RevisionCreateResponse(generation_id=revision_generation_id)
 
 
 @router.get("/generate/{generation_id}/stream")
 async def stream_generation_progress(
+    request: Request,
     generation_id: str,
+    last_event_id: int | None = Query(
+        None, ge=0, description="Last received event ID (reconnect fallback)"
+    ),
     db_session: DatabaseSession = Depends(get_db_session),
 ) -> EventSourceResponse:
     """
     Stream generation progress updates via Server-Sent Events.
 
+    The generation itself runs in the background job runner and publishes
+    to the progress event bus; this endpoint is just one of any number of
+    subscribers, so disconnecting does not stop it. Reconnecting clients
+    only receive events newer than ``Last-Event-ID`` (header or
+    ``last_event_id`` query). Finished generations return their terminal
+    status straight away.
+
     Args:
         generation_id: UUID of the generation
+        last_event_id: Last received event ID when the header cannot be set
 
     Returns:
         EventSourceResponse with progress updates
     """
 
-    generation = await generator_service.get_generation_by_id(generation_id, db_session)
+    # Only the status columns are needed to decide how to stream
+    snapshot = await generator_service.get_status_snapshot(generation_id, db_session)
 
-    if not generation:
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Generation not found")
 
+    header_event_id = request.headers.get("last-event-id", "")
+    if header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+
+    if (
+        not job_runner.is_active(generation_id)
+        and snapshot.status not in TERMINAL_STATUSES
+        and await generator_service.is_resumable(generation_id, db_session)
+    ):
+        # Pending, or left in flight by a worker that crashed or was stopped
+        # (its lease expired), and not running here: resume it. The row is
+        # claimed before running, so this never runs it twice.
+        try:
+            job_runner.submit(generation_id)
+        except JobQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
     async def event_generator():
         """Generate SSE events for progress updates"""
-        async for status in generator_service.generate_for_request(
-            generation_id,
-            db_session,
-        ):
+        if not event_bus.has_channel(generation_id):
+            # Not tracked by this process: report the persisted state
             yield {
+                "event": "progress",
+                "data": snapshot.model_dump_json(),
+            }
+            return
+
+        async for event_id, status in event_bus.subscribe(generation_id, last_event_id):
+            yield {
+                "id": str(event_id),
                 "event": "progress",
                 "data": status.model_dump_json(),
             }
 
             # If completed or error, close stream
-            if status.status in ("completed", "error"):
-                break
+            if status.status in TERMINAL_STATUSES:
+                return
+
+        # Channel closed with nothing new for this client: resend the end
+        if latest := event_bus.latest(generation_id):
+            event_id, status = latest
+            yield {
+                "id": str(event_id),
+                "event": "progress",
+                "data": status.model_dump_json(),
+            }
+
+    async def traced_event_generator():
+        """Time the stream as part of the generation's trace"""
+        with (
+            instrumentation.trace(generation_id),
+            instrumentation.stage("request", "generation_stream"),
+        ):
+            async for event in event_generator():
+                yield event
+
+    # The trace key and span are set when the stream starts and reset when it
+    # ends, so every step must run in the same context
+    return EventSourceResponse(iterate_in_context(traced_event_generator()))
 
-    return EventSourceResponse(event_generator())
+
+@router.get("/generate/{generation_id}/status")
+async def get_generation_status(
+    generation_id: str,
+    db_session: DatabaseSession = Depends(get_db_session),
+) -> GenerationStatus:
+    """
+    Get the latest progress status of a generation.
+
+    Reads the most recent event from the progress event bus, falling back
+    to the persisted state for generations not tracked in this process.
+
+    Args:
+        generation_id: UUID of the generation
+
+    Returns:
+        Latest GenerationStatus
+    """
+    if latest := event_bus.latest(generation_id):
+        return latest[1]
+
+    snapshot = await generator_service.get_status_snapshot(generation_id, db_session)
+
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Generation not found")
+
+    return snapshot
 
 
 @router.get("/generate/{generation_id}/result")
@@ -203,11 +328,19 @@ async def get_generation_result(
     if not generation:
         raise HTTPException(status_code=404, detail="Generation not found")
 
+    # Other images generated from the same research, if any
+    variants = (
+        await generator_service.list_variants(generation_id, db_session)
+        if generation.variant_index == 0
+        else []
+    )
+
     return templates.TemplateResponse(
         "partials/result.html",
         {
             "request": request,
             "generation": generation,
+            "variants": variants,
             "status_value": (
                 generation.status.value
                 if hasattr(generation.status, "value")
@@ -223,40 +356,130 @@ async def get_generation_result(
     )
 
 
+async def _require_image(
+    generation_id: str, db_session: DatabaseSession
+) -> StoredImage:
+    """Look up the stored image of a generation without loading the full row."""
+    image = await generator_service.get_image(generation_id, db_session)
+    if image is not None and not image.size:
+        # Rows saved without a size: measure the blob so lengths and ranges hold
+        try:
+            data = await blob_store.get_bytes(image.hash)
+        except BlobNotFoundError:
+            raise HTTPException(status_code=404, detail="Image not found in storage")
+        image = image.model_copy(update={"size": len(data)})
+    if image is not None:
+        return image
+
+    if not await generator_service.get_status_snapshot(generation_id, db_session):
+        raise HTTPException(status_code=404, detail="Generation not found")
+    raise HTTPException(status_code=404, detail="Image not yet generated")
+
+
+async def _conditional_response(
+    request: Request,
+    *,
+    etag: str,
+    size: int,
+    media_type: str,
+    open_stream: Callable[[ByteRange | None], Awaitable[AsyncIterator[bytes]]],
+    headers: dict[str, str],
+) -> Response:
+    """
+    Build a streaming response honoring If-None-Match, Range and If-Range.
+
+    Args:
+        request: Incoming request
+        etag: Strong ETag of the representation
+        size: Size of the representation in bytes
+        media_type: Content type of the representation
+        open_stream: Opens the body (or an inclusive byte range of it)
+        headers: Extra headers sent with every response
+
+    Returns:
+        304, 416, 206 or 200 response
+    """
+    response_headers = {**headers, "ETag": etag, "Accept-Ranges": "bytes"}
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+
+    byte_range = None
+    if if_range(request.headers.get("if-range"), etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiableError:
+            return Response(
+                status_code=416,
+                headers={**response_headers, "Content-Range": f"bytes */{size}"},
+            )
+
+    if byte_range is None:
+        return StreamingResponse(
+            await open_stream(None),
+            media_type=media_type,
+            headers={**response_headers, "Content-Length": str(size)},
+        )
+
+    start, end = byte_range
+    return StreamingResponse(
+        await open_stream(byte_range),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            **response_headers,
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{size}",
+        },
+    )
+
+
+def _image_stream_opener(
+    image_hash: str,
+) -> Callable[[ByteRange | None], Awaitable[AsyncIterator[bytes]]]:
+    """Return a function opening a stored image (or a byte range of it)."""
+
+    async def open_stream(byte_range: ByteRange | None) -> AsyncIterator[bytes]:
+        try:
+            return await blob_store.open_stream(image_hash, byte_range=byte_range)
+        except BlobNotFoundError:
+            raise HTTPException(status_code=404, detail="Image not found in storage")
+
+    return open_stream
+
+
 @router.get("/images/{generation_id}")
 async def serve_image(
+    request: Request,
     generation_id: str,
     db_session: DatabaseSession = Depends(get_db_session),
 ) -> Response:
     """
     Serve generated manga image.
 
+    Supports conditional requests (ETag / If-None-Match) and byte ranges.
+
     Args:
         generation_id: UUID of the generation
 
     Returns:
-        PNG image
+        PNG image streamed from the blob store
     """
 
-    generation = await generator_service.get_generation_by_id(generation_id, db_session)
-
-    if not generation:
-        raise HTTPException(status_code=404, detail="Generation not found")
-
-    if not generation.image_data:
-        raise HTTPException(status_code=404, detail="Image not yet generated")
+    image = await _require_image(generation_id, db_session)
 
-    return Response(
-        content=generation.image_data,
+    return await _conditional_response(
+        request,
+        etag=make_etag(image.hash),
+        size=image.size,
         media_type="image/png",
-        headers={
-            "Cache-Control": "public, max-age=31536000",
-        },
+        open_stream=_image_stream_opener(image.hash),
+        headers={"Cache-Control": "public, max-age=31536000"},
     )
 
 
 @router.get("/images/{generation_id}/download")
 async def download_image(
+    request: Request,
     generation_id: str,
     db_session: DatabaseSession = Depends(get_db_session),
 ) -> Response:
@@ -265,6 +488,9 @@ async def download_image(
 
     Format: manganize_{datetime}_{title}.png
 
+    Supports conditional requests (ETag / If-None-Match) and byte ranges so
+    interrupted downloads can be resumed.
+
     Args:
         generation_id: UUID of the generation
 
@@ -272,14 +498,11 @@ async def download_image(
         PNG image with Content-Disposition header for download
     """
 
+    image = await _require_image(generation_id, db_session)
     generation = await generator_service.get_generation_by_id(generation_id, db_session)
-
     if not generation:
         raise HTTPException(status_code=404, detail="Generation not found")
 
-    if not generation.image_data:
-        raise HTTPException(status_code=404, detail="Image not yet generated")
-
     # Generate filename
     filename = generate_download_filename(
         generation.generated_title,
@@ -289,9 +512,12 @@ async def download_image(
     encoded_filename = quote(filename.encode("utf-8"))
     ascii_fallback = "manganize_manga.png"  # Simple ASCII fallback
 
-    return Response(
-        content=generation.image_data,
+    return await _conditional_response(
+        request,
+        etag=make_etag(image.hash),
+        size=image.size,
         media_type="image/png",
+        open_stream=_image_stream_opener(image.hash),
         headers={
             "Content-Disposition": f"attachment; filename=\"{ascii_fallback}\"; filename*=UTF-8''{encoded_filename}",
             "Cache-Control": "public, max-age=31536000",
@@ -301,48 +527,57 @@ async def download_image(
 
 @router.get("/images/{generation_id}/thumbnail")
 async def serve_thumbnail(
+    request: Request,
     generation_id: str,
+    size: int = Query(200, description="Thumbnail bounding box size in pixels"),
     db_session: DatabaseSession = Depends(get_db_session),
 ) -> Response:
     """
-    Serve generated manga image thumbnail (200x200).
+    Serve generated manga image thumbnail.
+
+    Thumbnails are precomputed in every configured size and format; the
+    format (AVIF, WebP or PNG) is chosen from the Accept header. Supports
+    conditional requests (ETag / If-None-Match) and byte ranges.
 
     Args:
         generation_id: UUID of the generation
+        size: Thumbnail size (one of the configured thumbnail sizes)
 
     Returns:
-        Thumbnail PNG image
+        Thumbnail image with a strong ETag
     """
+    if size not in thumbnail_service.sizes:
+        raise HTTPException(status_code=400, detail="Unsupported thumbnail size")
 
-    generation = await generator_service.get_generation_by_id(generation_id, db_session)
+    image = await _require_image(generation_id, db_session)
+    fmt = thumbnail_service.negotiate_format(request.headers.get("accept"))
 
-    if not generation:
-        raise HTTPException(status_code=404, detail="Generation not found")
-
-    if not generation.image_data:
-        raise HTTPException(status_code=404, detail="Image not yet generated")
-
-    # Load image from bytes
     try:
-        image = Image.open(io.BytesIO(generation.image_data))
-
-        # Generate thumbnail (200x200, maintain aspect ratio)
-        image.thumbnail((200, 200), Image.Resampling.LANCZOS)
-
-        # Save thumbnail to bytes
-        thumbnail_buffer = io.BytesIO()
-        image.save(thumbnail_buffer, format="PNG", optimize=True)
-        thumbnail_data = thumbnail_buffer.getvalue()
-
-        return Response(
-            content=thumbnail_data,
-            media_type="image/png",
-            headers={
-                "Cache-Control": "public, max-age=31536000",
-            },
-        )
+        thumbnail = await thumbnail_service.get(image.hash, size, fmt)
+    except BlobNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found in storage")
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate thumbnail: {str(e)}",
         )
+
+    async def open_stream(byte_range: ByteRange | None) -> AsyncIterator[bytes]:
+        start, end = byte_range or (0, len(thumbnail.data) - 1)
+
+        async def read_chunks() -> AsyncIterator[bytes]:
+            yield thumbnail.data[start : end + 1]
+
+        return read_chunks()
+
+    return await _conditional_response(
+        request,
+        etag=thumbnail.etag,
+        size=len(thumbnail.data),
+        media_type=thumbnail.media_type,
+        open_stream=open_stream,
+        headers={
+            "Cache-Control": "public, max-age=31536000",
+            "Vary": "Accept",
+        },
+    )
@@ -15,7 +15,12 @@ router = APIRouter()
 @router.get("/history", response_class=HTMLResponse)
 async def list_history(
     request: Request,
-    page: int = Query(1, ge=1, description="Page number (1-indexed)"),
+    cursor: str | None = Query(
+        None, description="Cursor returned with the previous page (keyset paging)"
+    ),
+    page: int | None = Query(
+        None, ge=1, description="Page number (1-indexed, legacy OFFSET paging)"
+    ),
     limit: int = Query(10, ge=1, le=50, description="Items per page"),
     db_session: DatabaseSession = Depends(get_db_session),
 ):
@@ -23,22 +28,36 @@ async def list_history(
     Get paginated generation history list.
 
     Returns HTML partial with history items for HTMX infinite scroll.
+    Pages are addressed by an opaque ``cursor`` (keyset pagination over
+    ``(created_at, id)``); ``page`` is still accepted for old clients.
     """
-    generations, total_count = await history_service.list_history(
-        db_session=db_session,
-        page=page,
-        limit=limit,
-    )
-
-    # Calculate if there are more pages
-    has_more = (page * limit) < total_count
+    next_cursor = None
+    if page is not None and cursor is None:
+        generations, total_count = await history_service.list_history(
+            db_session=db_session,
+            page=page,
+            limit=limit,
+        )
+        has_more = (page * limit) < total_count
+    else:
+        try:
+            generations, next_cursor = await history_service.list_history_page(
+                db_session=db_session,
+                cursor=cursor,
+                limit=limit,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        has_more = next_cursor is not None
 
     return templates.TemplateResponse(
         "partials/history_list.html",
         {
             "request": request,
             "generations": generations,
-            "page": page,
+            "page": page or 1,
+            "next_cursor": next_cursor,
+            "limit": limit,
             "has_more": has_more,
         },
     )
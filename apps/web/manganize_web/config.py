@@ -2,6 +2,7 @@
 
 from typing import Literal
 
+from manganize_core.model_limiter import ModelLimit
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -27,6 +28,78 @@ class Settings(BaseSettings):
     # Rate limiting
     rate_limit_per_minute: int = 10
 
+    # Background generation jobs
+    generation_max_concurrency: int = 2
+    generation_queue_size: int = 100
+    generation_max_variants: int = 4
+    generation_variant_concurrency: int = 2
+    # A running generation's claim is renewed every third of this; a row left
+    # in flight by a crashed or stopped worker can be resumed once it expires
+    generation_lease_seconds: float = 60.0
+
+    # Background warm-up of fresh workers (imports, default character's
+    # graph, browser pool, Gemini connections); /ready returns 503 until done
+    prewarm_enabled: bool = False
+
+    # Progress event bus
+    event_bus_buffer_size: int = 16
+    event_bus_max_closed_channels: int = 256
+
+    # Gemini API connection pool
+    genai_max_connections: int = 20
+    genai_max_keepalive_connections: int = 10
+    genai_keepalive_expiry_seconds: float = 60.0
+
+    # Per-model Gemini call limits: concurrent calls, call starts per minute
+    # and burst size (0 = unlimited). Calls over the limit wait in a queue.
+    gemini_model_limits: dict[str, ModelLimit] = {
+        "gemini-2.5-pro": ModelLimit(max_concurrency=4, requests_per_minute=150),
+        "gemini-2.5-flash": ModelLimit(max_concurrency=8, requests_per_minute=1000),
+        "gemini-3-pro-image-preview": ModelLimit(
+            max_concurrency=2, requests_per_minute=20
+        ),
+    }
+
+    # Retries of Gemini image calls (transient errors only) and the
+    # process-wide retry budget (retries earned per call, max banked retries)
+    gemini_retry_max_attempts: int = 3
+    gemini_retry_base_delay_seconds: float = 4.0
+    gemini_retry_max_delay_seconds: float = 15.0
+    gemini_retry_max_retry_after_seconds: float = 60.0
+    gemini_retry_budget_ratio: float = 0.2
+    gemini_retry_budget_max_tokens: float = 10.0
+
+    # Prometheus metrics of stage timings, exposed on /metrics
+    metrics_enabled: bool = True
+
+    # OpenTelemetry spans of stages, one trace per generation (needs the
+    # "tracing" extra). Exporters: console, file (JSON lines) or otlp
+    # (configured by the standard OTEL_EXPORTER_OTLP_* variables).
+    tracing_enabled: bool = False
+    tracing_exporter: str = "console"
+    tracing_file_path: str = "./.cache/traces.jsonl"
+    tracing_service_name: str = "manganize-web"
+
+    # Headless browser pool for web page retrieval
+    browser_pool_size: int = 1
+    browser_pool_contexts_per_browser: int = 2
+    browser_pool_max_pages_per_browser: int = 50
+    browser_pool_health_check_interval_seconds: float = 30.0
+    browser_pool_launch_retry_interval_seconds: float = 60.0
+
+    # On-disk cache of fetched web pages and documents
+    page_cache_enabled: bool = True
+    page_cache_dir: str = "./.cache/pages"
+    page_cache_ttl_seconds: int = 86400
+    page_cache_max_mb: int = 256
+
+    # On-disk cache of researcher results (keyed by topic, source and date)
+    research_cache_enabled: bool = True
+    research_cache_dir: str = "./.cache/research"
+    research_cache_ttl_seconds: int = 259200
+    research_cache_max_entries: int = 1000
+    research_cache_bucket_days: int = 1
+
     # File upload
     max_file_size_mb: int = 10
     upload_ttl_hours: int = 24
@@ -42,6 +115,17 @@ class Settings(BaseSettings):
     storage_object_prefix: str = "uploads"
     storage_signed_url_ttl_seconds: int = 900
 
+    # Generated image blob store
+    blob_store_backend: Literal["local", "object_storage"] = "local"
+    blob_store_dir: str = "./data/blobs"
+    blob_store_object_prefix: str = "images"
+
+    # Precomputed thumbnails (PNG is always rendered as a fallback)
+    thumbnail_sizes: list[int] = [200, 400]
+    thumbnail_formats: list[str] = ["avif", "webp"]
+    thumbnail_workers: int = 1
+    thumbnail_cache_max_mb: int = 32
+
     # CORS
     cors_origins: list[str] = ["http://localhost:8000", "http://127.0.0.1:8000"]
 
@@ -1,11 +1,14 @@
 """FastAPI application entry point for Manganize Web App"""
 
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, AsyncGenerator
 
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
@@ -22,6 +25,10 @@ from manganize_web.models.database import (
 from manganize_web.models.generation import GenerationStatusEnum, GenerationTypeEnum
 from manganize_web.repositories.database_session import DatabaseSession
 from manganize_web.services.generator import generator_service
+from manganize_web.services.job_runner import job_runner
+from manganize_web.services.metrics import stage_metrics
+from manganize_web.services.thumbnail import thumbnail_service
+from manganize_web.services.warmup import warmup_service
 from manganize_web.templates import templates
 
 # Rate limiter configuration
@@ -36,15 +43,87 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
     """
     Application lifespan manager.
 
-    Initializes database on startup and cleans up on shutdown.
+    Initializes database, the shared Gemini client, per-model Gemini call
+    limits and retries, stage metrics and traces, browser pools, the page
+    and research caches and background job workers on startup and cleans up
+    on shutdown. When enabled, a background warm-up prepares the generation
+    pipeline while the worker already serves requests.
     """
+    from manganize_core.browser_pool import browser_pool
+    from manganize_core.genai_client import genai_client_manager
+    from manganize_core.instrumentation import instrumentation
+    from manganize_core.model_limiter import model_limiter
+    from manganize_core.page_cache import page_cache
+    from manganize_core.research_cache import research_cache
+    from manganize_core.retry import gemini_retry
+
     # Startup: Create engine and store in app.state
     engine = create_engine()
     app.state.engine = engine
     app.state.session_maker = create_session_maker(engine)
 
     await init_db(engine)
+    genai_client_manager.configure(
+        max_connections=settings.genai_max_connections,
+        max_keepalive_connections=settings.genai_max_keepalive_connections,
+        keepalive_expiry=settings.genai_keepalive_expiry_seconds,
+    )
+    model_limiter.configure(settings.gemini_model_limits)
+    gemini_retry.configure(
+        max_attempts=settings.gemini_retry_max_attempts,
+        base_delay=settings.gemini_retry_base_delay_seconds,
+        max_delay=settings.gemini_retry_max_delay_seconds,
+        max_retry_after=settings.gemini_retry_max_retry_after_seconds,
+        budget_ratio=settings.gemini_retry_budget_ratio,
+        budget_max_tokens=settings.gemini_retry_budget_max_tokens,
+    )
+    if settings.metrics_enabled:
+        instrumentation.add_observer(stage_metrics)
+    if settings.tracing_enabled:
+        # Optional dependency: only imported when tracing is turned on
+        from manganize_web.services.tracing import stage_tracer
+
+        stage_tracer.start(
+            exporter=settings.tracing_exporter,
+            service_name=settings.tracing_service_name,
+            file_path=settings.tracing_file_path,
+        )
+        instrumentation.add_observer(stage_tracer)
+    # Browsers are launched lazily on the first page retrieval
+    browser_pool.configure(
+        num_browsers=settings.browser_pool_size,
+        contexts_per_browser=settings.browser_pool_contexts_per_browser,
+        max_pages_per_browser=settings.browser_pool_max_pages_per_browser,
+        health_check_interval=settings.browser_pool_health_check_interval_seconds,
+        launch_retry_interval=settings.browser_pool_launch_retry_interval_seconds,
+    )
+    page_cache.configure(
+        directory=Path(settings.page_cache_dir),
+        ttl_seconds=settings.page_cache_ttl_seconds,
+        max_bytes=settings.page_cache_max_mb * 1024 * 1024,
+        enabled=settings.page_cache_enabled,
+    )
+    research_cache.configure(
+        directory=Path(settings.research_cache_dir),
+        ttl_seconds=settings.research_cache_ttl_seconds,
+        max_entries=settings.research_cache_max_entries,
+        bucket_days=settings.research_cache_bucket_days,
+        enabled=settings.research_cache_enabled,
+    )
+    job_runner.start(app.state.session_maker)
+    if settings.prewarm_enabled:
+        warmup_service.start(app.state.session_maker)
     yield
+    await warmup_service.stop()
+    await job_runner.stop()
+    instrumentation.remove_observer(stage_metrics)
+    if settings.tracing_enabled:
+        instrumentation.remove_observer(stage_tracer)
+        stage_tracer.shutdown()
+    await asyncio.to_thread(browser_pool.close)
+    await asyncio.to_thread(thumbnail_service.shutdown)
+    await genai_client_manager.aclose()
+    genai_client_manager.close()
     await engine.dispose()
 
 
@@ -85,7 +164,11 @@ async def index(request: Request):
     """Main page - manga generation interface"""
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "title": "Manganize - マンガ画像生成"},
+        {
+            "request": request,
+            "title": "Manganize - マンガ画像生成",
+            "max_variants": settings.generation_max_variants,
+        },
     )
 
 
@@ -126,7 +209,7 @@ async def revision_workspace_page(
             detail="Generation is not completed yet",
         )
 
-    if not generation.image_data:
+    if not generation.image_hash:
         raise HTTPException(status_code=404, detail="Image not yet generated")
 
     return templates.TemplateResponse(
@@ -150,3 +233,22 @@ async def revision_workspace_page(
 async def health() -> dict[str, str]:
     """Health check endpoint"""
     return {"status": "ok"}
+
+
+# Readiness endpoint for load balancers
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness check: 503 until the background warm-up has finished"""
+    return JSONResponse(
+        warmup_service.status(),
+        status_code=200 if warmup_service.ready else 503,
+    )
+
+
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Expose stage timings and in-flight stages in Prometheus text format"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -4,7 +4,9 @@ from collections.abc import AsyncGenerator
 from typing import TYPE_CHECKING, Any
 
 from fastapi import Request
-from sqlalchemy import MetaData
+from manganize_core.instrumentation import instrumentation
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -26,11 +28,54 @@ def create_engine() -> AsyncEngine:
     Returns:
         AsyncEngine: SQLAlchemy async engine instance
     """
-    return create_async_engine(
+    engine = create_async_engine(
         settings.database_url,
         echo=settings.debug,
         future=True,
     )
+    _instrument_queries(engine)
+    return engine
+
+
+def _instrument_queries(engine: AsyncEngine) -> None:
+    """
+    Time every SQL statement as a ``database`` stage named after its verb.
+
+    Args:
+        engine: SQLAlchemy async engine
+    """
+    sync_engine = engine.sync_engine
+    system = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement else "SQL"
+        stage = instrumentation.stage(
+            "database",
+            verb,
+            tags={"db.system": system, "db.statement": statement},
+        )
+        stage.__enter__()
+        conn.info.setdefault("manganize_stages", []).append(stage)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn: Connection, *args: Any) -> None:
+        if stages := conn.info.get("manganize_stages"):
+            stages.pop().__exit__(None, None, None)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context: Any) -> None:
+        conn = exception_context.connection
+        if conn is not None and (stages := conn.info.get("manganize_stages")):
+            error = exception_context.original_exception
+            stages.pop().__exit__(type(error), error, error.__traceback__)
 
 
 def create_session_maker(
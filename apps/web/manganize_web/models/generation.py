@@ -1,21 +1,22 @@
 """GenerationHistory model for manga generation tracking"""
 
-from datetime import datetime, timezone
+from datetime import UTC, datetime
 from enum import Enum
 from typing import Any
 
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import JSON, ForeignKey, Index, LargeBinary, String, Text
+from sqlalchemy import JSON, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from manganize_web.models.database import Base
 
 
 class GenerationTypeEnum(str, Enum):
-    """Generation type for initial image or revision image"""
+    """Generation type for initial image, revision image or variant image"""
 
     INITIAL = "initial"
     REVISION = "revision"
+    VARIANT = "variant"
 
 
 class GenerationStatusEnum(str, Enum):
@@ -33,8 +34,8 @@ class GenerationHistory(Base):
     """
     Represents a manga generation request and its result.
 
-    Tracks the input topic, generated title, character used, image data,
-    status, and timestamps for each generation.
+    Tracks the input topic, generated title, character used, a reference to
+    the image in the blob store, status, and timestamps for each generation.
     """
 
     __tablename__ = "generation_history"
@@ -48,7 +49,11 @@ class GenerationHistory(Base):
 
     # Generation outputs
     generated_title: Mapped[str] = mapped_column(String(100), nullable=False)
-    image_data: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Image bytes live in the blob store, keyed by their SHA-256
+    image_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    image_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    image_width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    image_height: Mapped[int | None] = mapped_column(Integer, nullable=True)
     generation_type: Mapped[GenerationTypeEnum] = mapped_column(
         SQLEnum(GenerationTypeEnum, values_callable=lambda x: [e.value for e in x]),
         nullable=False,
@@ -65,6 +70,8 @@ class GenerationHistory(Base):
         nullable=True,
     )
     revision_payload: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+    # Position within a multi-variant request; 0 is the parent (INITIAL) row
+    variant_index: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     # Status tracking
     status: Mapped[GenerationStatusEnum] = mapped_column(
@@ -73,20 +80,25 @@ class GenerationHistory(Base):
         default=GenerationStatusEnum.PENDING,
     )
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Until when the worker running this generation holds it; an in-flight
+    # row whose lease has run out (or that has none) was abandoned
+    lease_expires_at: Mapped[datetime | None] = mapped_column(nullable=True)
 
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(
-        nullable=False, default=lambda: datetime.now(timezone.utc)
+        nullable=False, default=lambda: datetime.now(UTC)
     )
     completed_at: Mapped[datetime | None] = mapped_column(nullable=True)
 
     # Indexes for query performance
     __table_args__ = (
         Index("idx_created_at", "created_at"),
+        Index("idx_created_at_id", "created_at", "id"),
         Index("idx_status", "status"),
         Index("idx_generation_type", "generation_type"),
         Index("idx_parent_generation_id", "parent_generation_id"),
         Index("idx_source_upload_id", "source_upload_id"),
+        Index("idx_image_hash", "image_hash"),
     )
 
     def __repr__(self) -> str:
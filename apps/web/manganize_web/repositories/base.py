@@ -1,7 +1,9 @@
 """Base repository for common CRUD operations"""
 
-from typing import Generic, TypeVar
+import inspect
+from typing import Any, Generic, TypeVar
 
+from manganize_core.instrumentation import instrumentation
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,8 +17,30 @@ class BaseRepository(Generic[T]):
     Generic base repository providing common CRUD operations.
 
     Type parameter T should be a SQLAlchemy model class.
+
+    Public coroutine methods of subclasses (including the inherited CRUD
+    methods) are timed as ``repository`` stages, labelled
+    ``<Repository>.<method>``.
     """
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in dir(cls):
+            if name.startswith("_"):
+                continue
+            method = inspect.getattr_static(cls, name)
+            if not inspect.iscoroutinefunction(method):
+                continue
+            # Re-label methods already wrapped for a parent repository
+            method = inspect.unwrap(method)
+            setattr(
+                cls,
+                name,
+                instrumentation.instrumented("repository", f"{cls.__name__}.{name}")(
+                    method
+                ),
+            )
+
     def __init__(self, session: AsyncSession, model_class: type[T]) -> None:
         """
         Initialize repository.
@@ -1,10 +1,22 @@
 """Repository for GenerationHistory model"""
 
-from datetime import datetime, timezone
-from typing import Any
-
-from sqlalchemy import select
+from datetime import UTC, datetime, timedelta
+from typing import Any, cast
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.engine import CursorResult
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from manganize_web.models.generation import (
     GenerationHistory,
@@ -12,6 +24,14 @@ from manganize_web.models.generation import (
     GenerationTypeEnum,
 )
 from manganize_web.repositories.base import BaseRepository
+from manganize_web.schemas.generation import StoredImage
+
+# Statuses of a generation a worker is running
+IN_FLIGHT_STATUSES = (
+    GenerationStatusEnum.RESEARCHING,
+    GenerationStatusEnum.WRITING,
+    GenerationStatusEnum.GENERATING,
+)
 
 
 class GenerationRepository(BaseRepository[GenerationHistory]):
@@ -38,6 +58,54 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
         """
         return await self.get(generation_id)
 
+    async def get_status(
+        self, generation_id: str
+    ) -> tuple[GenerationStatusEnum, str | None] | None:
+        """
+        Get only the status columns of a generation.
+
+        Args:
+            generation_id: UUID of the generation
+
+        Returns:
+            Tuple of (status, error message), or None if not found
+        """
+        result = await self._session.execute(
+            select(GenerationHistory.status, GenerationHistory.error_message).where(
+                GenerationHistory.id == generation_id
+            )
+        )
+        row = result.one_or_none()
+        return (row.status, row.error_message) if row else None
+
+    async def get_image(self, generation_id: str) -> StoredImage | None:
+        """
+        Get only the image reference columns of a generation.
+
+        Args:
+            generation_id: UUID of the generation
+
+        Returns:
+            StoredImage if the generation has an image, None otherwise
+        """
+        result = await self._session.execute(
+            select(
+                GenerationHistory.image_hash,
+                GenerationHistory.image_size,
+                GenerationHistory.image_width,
+                GenerationHistory.image_height,
+            ).where(GenerationHistory.id == generation_id)
+        )
+        row = result.one_or_none()
+        if not row or not row.image_hash:
+            return None
+        return StoredImage(
+            hash=row.image_hash,
+            size=row.image_size or 0,
+            width=row.image_width or 0,
+            height=row.image_height or 0,
+        )
+
     async def create(self, generation: GenerationHistory) -> GenerationHistory:
         """
         Create new generation record.
@@ -50,10 +118,110 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
         """
         return await self.add(generation)
 
+    @staticmethod
+    def _claimable(now: datetime) -> ColumnElement[bool]:
+        """Match pending rows and in-flight rows abandoned by their worker."""
+        return or_(
+            GenerationHistory.status == GenerationStatusEnum.PENDING,
+            and_(
+                GenerationHistory.status.in_(IN_FLIGHT_STATUSES),
+                or_(
+                    GenerationHistory.lease_expires_at.is_(None),
+                    GenerationHistory.lease_expires_at <= now,
+                ),
+            ),
+        )
+
+    async def claim(self, generation_id: str, lease_seconds: float) -> bool:
+        """
+        Atomically take over a generation for running it.
+
+        A pending generation, or one left in flight by a worker that
+        stopped renewing its lease (crash, restart, cancelled job), is moved
+        to the researching status with a new lease. Only one caller can
+        succeed for a given generation, which keeps reconnecting clients and
+        multiple worker processes from running the same generation twice.
+
+        Args:
+            generation_id: UUID of the generation
+            lease_seconds: How long the claim holds without being renewed
+
+        Returns:
+            True if the generation was claimed, False otherwise
+        """
+        now = datetime.now(UTC)
+        # An UPDATE returns a cursor result, which carries the row count
+        result = cast(
+            CursorResult[Any],
+            await self._session.execute(
+                update(GenerationHistory)
+                .where(GenerationHistory.id == generation_id, self._claimable(now))
+                .values(
+                    status=GenerationStatusEnum.RESEARCHING,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                )
+                .execution_options(synchronize_session="fetch")
+            ),
+        )
+        return result.rowcount == 1
+
+    async def is_claimable(self, generation_id: str) -> bool:
+        """
+        Check whether a generation is pending or abandoned in flight.
+
+        Args:
+            generation_id: UUID of the generation
+
+        Returns:
+            True if ``claim`` would currently succeed, False otherwise
+        """
+        result = await self._session.execute(
+            select(GenerationHistory.id).where(
+                GenerationHistory.id == generation_id,
+                self._claimable(datetime.now(UTC)),
+            )
+        )
+        return result.first() is not None
+
+    async def renew_leases(
+        self, generation_ids: list[str], lease_seconds: float
+    ) -> None:
+        """
+        Extend the leases of running generations and their variants.
+
+        Args:
+            generation_ids: UUIDs of the generations run by this worker
+            lease_seconds: New lease duration from now
+        """
+        await self._session.execute(
+            update(GenerationHistory)
+            .where(
+                or_(
+                    GenerationHistory.id.in_(generation_ids),
+                    GenerationHistory.parent_generation_id.in_(generation_ids)
+                    & (GenerationHistory.generation_type == GenerationTypeEnum.VARIANT),
+                ),
+                GenerationHistory.status.in_(IN_FLIGHT_STATUSES),
+            )
+            .values(
+                lease_expires_at=datetime.now(UTC) + timedelta(seconds=lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def expire_leases(self, generation_ids: list[str]) -> None:
+        """
+        Give up running generations so that they can be resumed right away.
+
+        Args:
+            generation_ids: UUIDs of the generations stopped by this worker
+        """
+        await self.renew_leases(generation_ids, 0)
+
     async def update_with_result(
         self,
         generation_id: str,
-        image_data: bytes,
+        image: StoredImage,
         title: str,
     ) -> None:
         """
@@ -61,15 +229,19 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
 
         Args:
             generation_id: UUID of the generation
-            image_data: Generated image binary data
+            image: Generated image stored in the blob store
             title: Generated title
         """
         generation = await self.get_by_id(generation_id)
         if generation:
-            generation.image_data = image_data
+            generation.image_hash = image.hash
+            generation.image_size = image.size
+            generation.image_width = image.width
+            generation.image_height = image.height
             generation.generated_title = title
             generation.status = GenerationStatusEnum.COMPLETED
-            generation.completed_at = datetime.now(timezone.utc)
+            generation.completed_at = datetime.now(UTC)
+            generation.lease_expires_at = None
 
     async def update_error(
         self,
@@ -87,7 +259,47 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
         if generation:
             generation.status = GenerationStatusEnum.ERROR
             generation.error_message = error_message
-            generation.completed_at = datetime.now(timezone.utc)
+            generation.completed_at = datetime.now(UTC)
+            generation.lease_expires_at = None
+
+    @staticmethod
+    def _history_list_query(
+        status_filter: GenerationStatusEnum | None,
+    ) -> Select[tuple[GenerationHistory]]:
+        """Build the base history query loading only the rendered columns."""
+        query = select(GenerationHistory).options(
+            load_only(
+                GenerationHistory.id,
+                GenerationHistory.character_name,
+                GenerationHistory.input_topic,
+                GenerationHistory.generated_title,
+                GenerationHistory.status,
+                GenerationHistory.image_hash,
+                GenerationHistory.created_at,
+                raiseload=True,
+            )
+        )
+        if status_filter:
+            query = query.where(GenerationHistory.status == status_filter)
+        return query
+
+    async def count_history(
+        self, status_filter: GenerationStatusEnum | None = None
+    ) -> int:
+        """
+        Count generations with SELECT COUNT(*).
+
+        Args:
+            status_filter: Optional status to filter by
+
+        Returns:
+            Number of matching generations
+        """
+        query = select(func.count()).select_from(GenerationHistory)
+        if status_filter:
+            query = query.where(GenerationHistory.status == status_filter)
+        result = await self._session.execute(query)
+        return result.scalar_one()
 
     async def list_history(
         self,
@@ -96,7 +308,10 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
         status_filter: GenerationStatusEnum | None = None,
     ) -> tuple[list[GenerationHistory], int]:
         """
-        List generation history with pagination and optional filtering.
+        List generation history with OFFSET pagination and optional filtering.
+
+        Prefer ``list_history_after`` for deep pagination; OFFSET cost grows
+        with the page number.
 
         Args:
             page: Page number (1-indexed)
@@ -106,32 +321,78 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
         Returns:
             Tuple of (list of generations, total count)
         """
-        # Build base query
-        query = select(GenerationHistory)
+        # Order by created_at DESC (newest first), id breaks ties
+        query = (
+            self._history_list_query(status_filter)
+            .order_by(GenerationHistory.created_at.desc(), GenerationHistory.id.desc())
+            .offset((page - 1) * limit)
+            .limit(limit)
+        )
 
-        # Apply status filter if provided
-        if status_filter:
-            query = query.where(GenerationHistory.status == status_filter)
+        result = await self._session.execute(query)
+        generations = list(result.scalars().all())
 
-        # Order by created_at DESC (newest first)
-        query = query.order_by(GenerationHistory.created_at.desc())
+        return generations, await self.count_history(status_filter)
 
-        # Get total count
-        count_query = select(GenerationHistory)
-        if status_filter:
-            count_query = count_query.where(GenerationHistory.status == status_filter)
-        count_result = await self._session.execute(count_query)
-        total_count = len(list(count_result.scalars().all()))
+    async def list_history_after(
+        self,
+        cursor: tuple[datetime, str] | None = None,
+        limit: int = 10,
+        status_filter: GenerationStatusEnum | None = None,
+    ) -> tuple[list[GenerationHistory], bool]:
+        """
+        List generation history with keyset pagination over (created_at, id).
+
+        Each page seeks directly past the cursor using the
+        ``idx_created_at_id`` index, so the cost does not depend on how deep
+        the client has scrolled.
+
+        Args:
+            cursor: (created_at, id) of the last item of the previous page,
+                or None for the first page
+            limit: Number of items per page
+            status_filter: Optional status to filter by
 
-        # Apply pagination
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
+        Returns:
+            Tuple of (list of generations, whether more items follow)
+        """
+        query = self._history_list_query(status_filter)
+        if cursor is not None:
+            cursor_created_at, cursor_id = cursor
+            query = query.where(
+                tuple_(GenerationHistory.created_at, GenerationHistory.id)
+                < tuple_(
+                    literal(cursor_created_at, GenerationHistory.created_at.type),
+                    literal(cursor_id, GenerationHistory.id.type),
+                )
+            )
+
+        # Fetch one extra row to know whether another page exists
+        query = query.order_by(
+            GenerationHistory.created_at.desc(), GenerationHistory.id.desc()
+        ).limit(limit + 1)
 
-        # Execute query
         result = await self._session.execute(query)
         generations = list(result.scalars().all())
 
-        return generations, total_count
+        return generations[:limit], len(generations) > limit
+
+    async def count_image_references(self, image_hash: str) -> int:
+        """
+        Count generations referencing an image blob.
+
+        Args:
+            image_hash: Content hash of the image
+
+        Returns:
+            Number of generations referencing the image
+        """
+        result = await self._session.execute(
+            select(func.count())
+            .select_from(GenerationHistory)
+            .where(GenerationHistory.image_hash == image_hash)
+        )
+        return result.scalar_one()
 
     async def delete_by_id(self, generation_id: str) -> bool:
         """
@@ -176,10 +437,62 @@ class GenerationRepository(BaseRepository[GenerationHistory]):
             parent_generation_id=parent_generation.id,
             source_upload_id=parent_generation.source_upload_id,
             revision_payload=revision_payload,
-            created_at=datetime.now(timezone.utc),
+            created_at=datetime.now(UTC),
         )
         return await self.create(revision)
 
+    async def create_variant(
+        self,
+        parent_generation: GenerationHistory,
+        variant_generation_id: str,
+        variant_index: int,
+    ) -> GenerationHistory:
+        """
+        Create variant generation record sharing the parent's inputs.
+
+        Args:
+            parent_generation: Parent (first variant) generation of the request
+            variant_generation_id: New generation ID for the variant
+            variant_index: Position of the variant within the request
+
+        Returns:
+            Created variant generation
+        """
+        variant = GenerationHistory(
+            id=variant_generation_id,
+            character_name=parent_generation.character_name,
+            input_topic=parent_generation.input_topic,
+            generated_title="",  # Will be filled after generation
+            status=GenerationStatusEnum.PENDING,
+            generation_type=GenerationTypeEnum.VARIANT,
+            parent_generation_id=parent_generation.id,
+            source_upload_id=parent_generation.source_upload_id,
+            variant_index=variant_index,
+            created_at=datetime.now(UTC),
+        )
+        return await self.create(variant)
+
+    async def list_variants(self, parent_generation_id: str) -> list[GenerationHistory]:
+        """
+        List the other variants generated together with a parent generation.
+
+        Args:
+            parent_generation_id: Parent generation ID
+
+        Returns:
+            Variants ordered by variant_index ASC
+        """
+        query = (
+            select(GenerationHistory)
+            .where(
+                GenerationHistory.parent_generation_id == parent_generation_id,
+                GenerationHistory.generation_type == GenerationTypeEnum.VARIANT,
+            )
+            .order_by(GenerationHistory.variant_index.asc())
+        )
+        result = await self._session.execute(query)
+        return list(result.scalars().all())
+
     async def get_parent(self, generation_id: str) -> GenerationHistory | None:
         """
         Get parent generation of a revision.
@@ -1,6 +1,6 @@
 """Repository for UploadSource model."""
 
-from datetime import datetime, timezone
+from datetime import UTC, datetime
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -26,4 +26,4 @@ class UploadSourceRepository(BaseRepository[UploadSource]):
         """Set used timestamp for an upload source."""
         source = await self.get_by_id(upload_id)
         if source:
-            source.used_at = datetime.now(timezone.utc)
+            source.used_at = datetime.now(UTC)
@@ -49,6 +49,15 @@ class GenerationResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class StoredImage(BaseModel):
+    """Reference to a generated image kept in the blob store"""
+
+    hash: str = Field(..., min_length=64, max_length=64, description="SHA-256")
+    size: int = Field(..., ge=0, description="Size in bytes")
+    width: int = Field(..., ge=0)
+    height: int = Field(..., ge=0)
+
+
 class GenerationStatus(BaseModel):
     """Schema for generation status updates via SSE"""
 
@@ -56,6 +65,11 @@ class GenerationStatus(BaseModel):
     status: GenerationStatusEnum
     message: str
     progress: int = Field(..., ge=0, le=100, description="Progress of the generation")
+    queue_position: int | None = Field(
+        None,
+        ge=1,
+        description="Position in the job queue or Gemini model queue while waiting",
+    )
 
     model_config = {"use_enum_values": True}
 
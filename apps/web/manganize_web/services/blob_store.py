@@ -0,0 +1,277 @@
+"""Content-addressed blob store for generated images."""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from collections.abc import AsyncIterator, Iterator
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
+
+from PIL import Image
+
+from manganize_web.config import settings
+from manganize_web.schemas.generation import StoredImage
+from manganize_web.services.storage import StorageBackend, get_storage_backend
+from manganize_web.utils.http_cache import ByteRange
+
+# Chunk size used when streaming blobs to clients
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class BlobNotFoundError(LookupError):
+    """Raised when a blob does not exist in the store"""
+
+
+class BlobStoreBackend(Protocol):
+    """Interface for blob store backends."""
+
+    def put(self, key: str, data: bytes, content_type: str | None) -> None:
+        """Store bytes under a key (overwriting is allowed)."""
+
+    def get(self, key: str) -> bytes:
+        """Read all bytes of a blob."""
+
+    def iter_chunks(
+        self, key: str, chunk_size: int, byte_range: ByteRange | None = None
+    ) -> Iterator[bytes]:
+        """Read a blob, or an inclusive byte range of it, in chunks."""
+
+    def exists(self, key: str) -> bool:
+        """Return whether a blob exists."""
+
+    def delete(self, key: str) -> None:
+        """Delete a blob if it exists."""
+
+
+class LocalBlobStoreBackend:
+    """Backend storing blobs as files under a local directory."""
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    def _path(self, key: str) -> Path:
+        return self._root / key[:2] / key
+
+    def put(self, key: str, data: bytes, content_type: str | None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(key) from e
+
+    def iter_chunks(
+        self, key: str, chunk_size: int, byte_range: ByteRange | None = None
+    ) -> Iterator[bytes]:
+        # Open eagerly so a missing blob is reported before streaming starts
+        try:
+            f = self._path(key).open("rb")
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(key) from e
+
+        def read_chunks() -> Iterator[bytes]:
+            with f:
+                if byte_range is None:
+                    while chunk := f.read(chunk_size):
+                        yield chunk
+                    return
+
+                start, end = byte_range
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0 and (chunk := f.read(min(chunk_size, remaining))):
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return read_chunks()
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+class ObjectStorageBlobStoreBackend:
+    """Backend storing blobs in the S3-compatible object storage."""
+
+    def __init__(self, storage: StorageBackend, prefix: str) -> None:
+        self._storage = storage
+        self._prefix = prefix.strip("/")
+
+    def _object_key(self, key: str) -> str:
+        return f"{self._prefix}/{key[:2]}/{key}"
+
+    def put(self, key: str, data: bytes, content_type: str | None) -> None:
+        self._storage.put_object(self._object_key(key), data, content_type)
+
+    def get(self, key: str) -> bytes:
+        return b"".join(self.iter_chunks(key, STREAM_CHUNK_SIZE))
+
+    def iter_chunks(
+        self, key: str, chunk_size: int, byte_range: ByteRange | None = None
+    ) -> Iterator[bytes]:
+        chunks = self._storage.iter_object(
+            self._object_key(key), chunk_size, byte_range
+        )
+        if chunks is None:
+            raise BlobNotFoundError(key)
+        return chunks
+
+    def exists(self, key: str) -> bool:
+        return self._storage.object_exists(self._object_key(key))
+
+    def delete(self, key: str) -> None:
+        self._storage.delete_object(self._object_key(key))
+
+
+@lru_cache(maxsize=1)
+def get_blob_store_backend() -> BlobStoreBackend:
+    """Return the configured blob store backend."""
+    if settings.blob_store_backend == "object_storage":
+        return ObjectStorageBlobStoreBackend(
+            get_storage_backend(), settings.blob_store_object_prefix
+        )
+    return LocalBlobStoreBackend(Path(settings.blob_store_dir))
+
+
+def describe_image(data: bytes) -> StoredImage:
+    """Hash an image and read its dimensions."""
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+    return StoredImage(
+        hash=hashlib.sha256(data).hexdigest(),
+        size=len(data),
+        width=width,
+        height=height,
+    )
+
+
+class BlobStore:
+    """
+    Content-addressed store for generated images.
+
+    Blobs are keyed by the SHA-256 of their content, so database rows only
+    keep the hash (plus size and dimensions) and identical images are stored
+    once. Backend calls are blocking and run in worker threads.
+    """
+
+    def __init__(self, backend: BlobStoreBackend | None = None) -> None:
+        """
+        Initialize blob store.
+
+        Args:
+            backend: Backend to use; defaults to the configured backend
+        """
+        self._backend = backend
+
+    @property
+    def backend(self) -> BlobStoreBackend:
+        """Backend used by this store"""
+        if self._backend is None:
+            self._backend = get_blob_store_backend()
+        return self._backend
+
+    async def put_image(self, data: bytes) -> StoredImage:
+        """
+        Store a PNG image.
+
+        Args:
+            data: PNG image bytes
+
+        Returns:
+            Hash, size and dimensions of the stored image
+        """
+        image = await asyncio.to_thread(describe_image, data)
+        if not await asyncio.to_thread(self.backend.exists, image.hash):
+            await asyncio.to_thread(self.backend.put, image.hash, data, "image/png")
+        return image
+
+    async def put_bytes(
+        self, key: str, data: bytes, content_type: str | None = None
+    ) -> None:
+        """
+        Store derived data (e.g. thumbnails) under a caller-chosen key.
+
+        Args:
+            key: Blob key, derived from the hash of the source blob
+            data: Bytes to store
+            content_type: MIME type of the data
+        """
+        await asyncio.to_thread(self.backend.put, key, data, content_type)
+
+    async def get_bytes(self, blob_hash: str) -> bytes:
+        """
+        Read a whole blob.
+
+        Args:
+            blob_hash: Content hash of the blob
+
+        Returns:
+            Blob bytes
+
+        Raises:
+            BlobNotFoundError: If the blob does not exist
+        """
+        return await asyncio.to_thread(self.backend.get, blob_hash)
+
+    async def open_stream(
+        self,
+        blob_hash: str,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        byte_range: ByteRange | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Open a blob for streaming without loading it fully into memory.
+
+        The blob is opened before this returns, so a missing blob is reported
+        here rather than halfway through a response.
+
+        Args:
+            blob_hash: Content hash of the blob
+            chunk_size: Size of each chunk in bytes
+            byte_range: Inclusive (start, end) byte range to read; whole blob
+                if None
+
+        Returns:
+            Async iterator of blob chunks
+
+        Raises:
+            BlobNotFoundError: If the blob does not exist
+        """
+        chunks = await asyncio.to_thread(
+            self.backend.iter_chunks, blob_hash, chunk_size, byte_range
+        )
+
+        async def read_chunks() -> AsyncIterator[bytes]:
+            while chunk := await asyncio.to_thread(next, chunks, b""):
+                yield chunk
+
+        return read_chunks()
+
+    async def delete(self, blob_hash: str) -> None:
+        """
+        Delete a blob.
+
+        Args:
+            blob_hash: Content hash of the blob
+        """
+        await asyncio.to_thread(self.backend.delete, blob_hash)
+
+
+# Global instance
+blob_store = BlobStore()
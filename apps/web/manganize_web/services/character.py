@@ -1,6 +1,6 @@
 """Character management service"""
 
-from datetime import datetime, timezone
+from datetime import UTC, datetime
 
 from fastapi import HTTPException, UploadFile
 from sqlalchemy.orm.attributes import flag_modified
@@ -77,8 +77,8 @@ class CharacterService:
             speech_style=character_data.speech_style.model_dump(),
             reference_images=None,  # Images handled separately
             is_default=False,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
+            created_at=datetime.now(UTC),
+            updated_at=datetime.now(UTC),
         )
 
         await db_session.characters.create(character)
@@ -128,7 +128,7 @@ class CharacterService:
         if character_data.speech_style is not None:
             character.speech_style = character_data.speech_style.model_dump()
 
-        character.updated_at = datetime.now(timezone.utc)
+        character.updated_at = datetime.now(UTC)
 
         await db_session.commit()
         return character
@@ -169,7 +169,7 @@ class CharacterService:
             character.reference_images = {}
 
         character.reference_images[image_type] = relative_path
-        character.updated_at = datetime.now(timezone.utc)
+        character.updated_at = datetime.now(UTC)
 
         # Mark reference_images as modified for SQLAlchemy to detect changes
         flag_modified(character, "reference_images")
@@ -0,0 +1,256 @@
+"""In-process pub/sub event bus for generation progress."""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import Protocol
+
+from manganize_web.config import settings
+from manganize_web.models.generation import GenerationStatusEnum
+from manganize_web.schemas.generation import GenerationStatus
+
+# (event ID, status) pair delivered to subscribers
+ProgressEvent = tuple[int, GenerationStatus]
+
+# Statuses that end a generation
+TERMINAL_STATUSES = frozenset(
+    {GenerationStatusEnum.COMPLETED.value, GenerationStatusEnum.ERROR.value}
+)
+
+
+class EventBusBackend(Protocol):
+    """Interface for progress event bus backends."""
+
+    def open(self, channel: str) -> None:
+        """Create a channel if it does not exist yet."""
+
+    def publish(self, channel: str, status: GenerationStatus) -> int:
+        """Publish a status to a channel and return its event ID."""
+
+    def close(self, channel: str) -> None:
+        """Mark a channel as finished and release its subscribers."""
+
+    def exists(self, channel: str) -> bool:
+        """Return whether the channel is known to the backend."""
+
+    def latest(self, channel: str) -> ProgressEvent | None:
+        """Return the most recent event of a channel."""
+
+    def subscribe(
+        self, channel: str, last_event_id: int | None
+    ) -> AsyncIterator[ProgressEvent]:
+        """Stream buffered events newer than last_event_id, then live ones."""
+
+
+class _Channel:
+    """Ring buffer and subscriber set for a single generation."""
+
+    def __init__(self, buffer_size: int) -> None:
+        self.events: deque[ProgressEvent] = deque(maxlen=buffer_size)
+        self.closed = False
+        self.subscribers: set[asyncio.Queue[ProgressEvent | None]] = set()
+
+
+class InMemoryEventBusBackend:
+    """
+    Single-process backend keeping recent events in per-channel ring buffers.
+
+    Closed channels are retained (up to ``max_closed_channels``) so that late
+    subscribers can still replay the final events.
+
+    Event IDs come from one counter shared by all channels and started from
+    the wall clock (in milliseconds), so they keep increasing when a channel
+    is reopened (a resumed generation), after it was evicted, and across
+    restarts. A ``Last-Event-ID`` from an earlier run therefore never hides
+    the new events.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = settings.event_bus_buffer_size,
+        max_closed_channels: int = settings.event_bus_max_closed_channels,
+    ) -> None:
+        self._buffer_size = buffer_size
+        self._max_closed_channels = max_closed_channels
+        self._channels: dict[str, _Channel] = {}
+        self._closed: OrderedDict[str, None] = OrderedDict()
+        self._event_ids = itertools.count(time.time_ns() // 1_000_000)
+
+    def open(self, channel: str) -> None:
+        if channel not in self._channels or self._channels[channel].closed:
+            self._closed.pop(channel, None)
+            self._channels[channel] = _Channel(self._buffer_size)
+
+    def publish(self, channel: str, status: GenerationStatus) -> int:
+        if channel not in self._channels:
+            self.open(channel)
+
+        state = self._channels[channel]
+        event = (next(self._event_ids), status)
+        state.events.append(event)
+        for queue in state.subscribers:
+            queue.put_nowait(event)
+        return event[0]
+
+    def close(self, channel: str) -> None:
+        state = self._channels.get(channel)
+        if state is None or state.closed:
+            return
+
+        state.closed = True
+        for queue in state.subscribers:
+            queue.put_nowait(None)
+
+        self._closed[channel] = None
+        while len(self._closed) > self._max_closed_channels:
+            expired, _ = self._closed.popitem(last=False)
+            self._channels.pop(expired, None)
+
+    def exists(self, channel: str) -> bool:
+        return channel in self._channels
+
+    def latest(self, channel: str) -> ProgressEvent | None:
+        state = self._channels.get(channel)
+        if state is None or not state.events:
+            return None
+        return state.events[-1]
+
+    async def subscribe(
+        self, channel: str, last_event_id: int | None
+    ) -> AsyncIterator[ProgressEvent]:
+        state = self._channels.get(channel)
+        if state is None:
+            return
+
+        queue: asyncio.Queue[ProgressEvent | None] = asyncio.Queue()
+        # Snapshot the buffer and register atomically (no await in between)
+        backlog = [
+            event
+            for event in state.events
+            if last_event_id is None or event[0] > last_event_id
+        ]
+        if state.closed:
+            queue.put_nowait(None)
+        else:
+            state.subscribers.add(queue)
+
+        try:
+            for event in backlog:
+                yield event
+
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            state.subscribers.discard(queue)
+
+
+@lru_cache(maxsize=1)
+def get_event_bus_backend() -> EventBusBackend:
+    """
+    Return the event bus backend.
+
+    Only the in-memory backend exists so far, so it is not configurable yet.
+    """
+    return InMemoryEventBusBackend()
+
+
+class ProgressEventBus:
+    """
+    Fan-out of generation progress to any number of subscribers.
+
+    Publishers (the generator service) and subscribers (SSE clients, status
+    polling) only share a generation ID, so observing progress never touches
+    the pipeline itself.
+    """
+
+    def __init__(self, backend: EventBusBackend | None = None) -> None:
+        """
+        Initialize event bus.
+
+        Args:
+            backend: Backend to use; defaults to the configured backend
+        """
+        self._backend = backend
+
+    @property
+    def backend(self) -> EventBusBackend:
+        """Backend used by this bus"""
+        if self._backend is None:
+            self._backend = get_event_bus_backend()
+        return self._backend
+
+    def open(self, generation_id: str) -> None:
+        """
+        Open the channel of a generation so subscribers can attach early.
+
+        Args:
+            generation_id: UUID of the generation
+        """
+        self.backend.open(generation_id)
+
+    def publish(self, status: GenerationStatus) -> int:
+        """
+        Publish a status update to the channel of its generation.
+
+        Args:
+            status: Status update to publish
+
+        Returns:
+            Event ID assigned to the status
+        """
+        return self.backend.publish(status.id, status)
+
+    def close(self, generation_id: str) -> None:
+        """
+        Close the channel of a finished generation.
+
+        Args:
+            generation_id: UUID of the generation
+        """
+        self.backend.close(generation_id)
+
+    def has_channel(self, generation_id: str) -> bool:
+        """
+        Check whether progress for a generation is being tracked.
+
+        Args:
+            generation_id: UUID of the generation
+
+        Returns:
+            True if the channel exists (open or recently closed)
+        """
+        return self.backend.exists(generation_id)
+
+    def latest(self, generation_id: str) -> ProgressEvent | None:
+        """
+        Get the most recent event of a generation.
+
+        Args:
+            generation_id: UUID of the generation
+
+        Returns:
+            (event ID, status) pair, or None if nothing was published
+        """
+        return self.backend.latest(generation_id)
+
+    def subscribe(
+        self, generation_id: str, last_event_id: int | None = None
+    ) -> AsyncIterator[ProgressEvent]:
+        """
+        Subscribe to progress of a generation.
+
+        Args:
+            generation_id: UUID of the generation
+            last_event_id: Last event ID the client has already received
+
+        Returns:
+            Async iterator of (event ID, status) pairs
+        """
+        return self.backend.subscribe(generation_id, last_event_id)
+
+
+# Global instance
+event_bus = ProgressEventBus()
@@ -1,23 +1,31 @@
 """Manga generation service that wraps ManganizeAgent with SSE progress callbacks"""
 
 import uuid
-from collections.abc import AsyncGenerator
-from datetime import datetime, timezone
+from collections.abc import AsyncGenerator, Callable
+from datetime import UTC, datetime
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
+from manganize_core.character import BaseCharacter, KurageChan, SpeechStyle
+from manganize_core.instrumentation import instrumentation
+from manganize_core.model_limiter import model_limiter
+
+from manganize_web.config import settings
 from manganize_web.models.generation import (
     GenerationHistory,
     GenerationStatusEnum,
     GenerationTypeEnum,
 )
 from manganize_web.repositories.database_session import DatabaseSession
-from manganize_web.schemas.generation import GenerationStatus
+from manganize_web.schemas.generation import GenerationStatus, StoredImage
+from manganize_web.services.blob_store import blob_store
+from manganize_web.services.event_bus import event_bus
+from manganize_web.services.thumbnail import thumbnail_service
 from manganize_web.services.upload_source import upload_source_service
 
-# Heavy dependencies are lazily imported in methods to speed up server startup
 if TYPE_CHECKING:
-    from manganize_core.character import BaseCharacter
+    from langchain_core.runnables import RunnableConfig
+    from langgraph.graph.state import CompiledStateGraph
 
 
 # Progress milestones for each stage
@@ -65,23 +73,37 @@ class GeneratorService:
         character_name: str,
         upload_id: str | None,
         db_session: DatabaseSession,
+        variants: int = 1,
     ) -> str:
         """
         Create a new initial generation request.
 
+        With several variants, the returned generation is the parent (first
+        variant) and the others are created as VARIANT rows linked to it.
+        All of them are produced by the parent's job from a single research.
+
         Args:
             topic: Topic to generate manga about
             character_name: Character to use
             upload_id: Optional uploaded source ID
             db_session: Database session with repositories
+            variants: Number of images to generate from the same research
 
         Returns:
-            generation_id: UUID of the created generation
+            generation_id: UUID of the created (parent) generation
+
+        Raises:
+            ValueError: If the input is empty or variants is out of range
         """
         normalized_topic = topic.strip()
         if not normalized_topic and not upload_id:
             raise ValueError("Topic or upload_id is required")
 
+        if not 1 <= variants <= settings.generation_max_variants:
+            raise ValueError(
+                f"variants must be between 1 and {settings.generation_max_variants}"
+            )
+
         if upload_id:
             await upload_source_service.ensure_upload_available(upload_id, db_session)
 
@@ -95,11 +117,23 @@ class GeneratorService:
             status=GenerationStatusEnum.PENDING,
             generation_type=GenerationTypeEnum.INITIAL,
             source_upload_id=upload_id,
-            created_at=datetime.now(timezone.utc),
+            variant_index=0 if variants > 1 else None,
+            created_at=datetime.now(UTC),
         )
 
-        await db_session.generations.create(generation)
-        await db_session.commit()
+        # Traced together with the background run of the same generation
+        with (
+            instrumentation.trace(generation_id),
+            instrumentation.stage("request", "create_generation"),
+        ):
+            await db_session.generations.create(generation)
+            for variant_index in range(1, variants):
+                await db_session.generations.create_variant(
+                    parent_generation=generation,
+                    variant_generation_id=str(uuid.uuid4()),
+                    variant_index=variant_index,
+                )
+            await db_session.commit()
 
         return generation_id
 
@@ -130,16 +164,20 @@ class GeneratorService:
         if parent_generation.status != GenerationStatusEnum.COMPLETED:
             raise ValueError("Parent generation is not completed")
 
-        if not parent_generation.image_data:
+        if not parent_generation.image_hash:
             raise ValueError("Parent generation has no image")
 
         revision_id = str(uuid.uuid4())
-        await db_session.generations.create_revision(
-            parent_generation=parent_generation,
-            revision_generation_id=revision_id,
-            revision_payload=revision_payload,
-        )
-        await db_session.commit()
+        with (
+            instrumentation.trace(revision_id),
+            instrumentation.stage("request", "create_revision"),
+        ):
+            await db_session.generations.create_revision(
+                parent_generation=parent_generation,
+                revision_generation_id=revision_id,
+                revision_payload=revision_payload,
+            )
+            await db_session.commit()
 
         return revision_id
 
@@ -160,9 +198,154 @@ class GeneratorService:
         """
         return await db_session.generations.get_by_id(generation_id)
 
+    async def list_variants(
+        self,
+        generation_id: str,
+        db_session: DatabaseSession,
+    ) -> list[GenerationHistory]:
+        """
+        List the other variants generated together with a parent generation.
+
+        Args:
+            generation_id: UUID of the parent generation
+            db_session: Database session with repositories
+
+        Returns:
+            Variant generations ordered by variant_index
+        """
+        return await db_session.generations.list_variants(generation_id)
+
+    def build_status_snapshot(self, generation: GenerationHistory) -> GenerationStatus:
+        """
+        Build a status update from the persisted state of a generation.
+
+        Used when no in-flight job exists for the generation, e.g. when it
+        has already finished.
+
+        Args:
+            generation: Generation record
+
+        Returns:
+            GenerationStatus reflecting the stored status
+        """
+        return self._status_snapshot(
+            generation.id, generation.status, generation.error_message
+        )
+
+    async def get_status_snapshot(
+        self,
+        generation_id: str,
+        db_session: DatabaseSession,
+    ) -> GenerationStatus | None:
+        """
+        Build a status update from the persisted state, loading only status columns.
+
+        Args:
+            generation_id: UUID of the generation
+            db_session: Database session with repositories
+
+        Returns:
+            GenerationStatus reflecting the stored status, None if not found
+        """
+        row = await db_session.generations.get_status(generation_id)
+        if row is None:
+            return None
+        status, error_message = row
+        return self._status_snapshot(generation_id, status, error_message)
+
+    async def is_resumable(
+        self,
+        generation_id: str,
+        db_session: DatabaseSession,
+    ) -> bool:
+        """
+        Check whether a generation waits for a worker to (re)start it.
+
+        True for pending generations and for ones left in flight by a worker
+        that crashed or was stopped, i.e. whose lease has expired.
+
+        Args:
+            generation_id: UUID of the generation
+            db_session: Database session with repositories
+
+        Returns:
+            True if running the generation now would claim it
+        """
+        return await db_session.generations.is_claimable(generation_id)
+
+    @staticmethod
+    def _status_snapshot(
+        generation_id: str,
+        status: GenerationStatusEnum,
+        error_message: str | None,
+    ) -> GenerationStatus:
+        """Map a persisted status to a status update."""
+        if status == GenerationStatusEnum.COMPLETED:
+            return GenerationStatus(
+                id=generation_id,
+                status=GenerationStatusEnum.COMPLETED,
+                message="生成完了！",
+                progress=ProgressMilestone.COMPLETED,
+            )
+
+        if status == GenerationStatusEnum.ERROR:
+            return GenerationStatus(
+                id=generation_id,
+                status=GenerationStatusEnum.ERROR,
+                message=f"エラーが発生しました: {error_message or ''}",
+                progress=ProgressMilestone.COMPLETED,
+            )
+
+        return GenerationStatus(
+            id=generation_id,
+            status=status,
+            message="生成待ちです...",
+            progress=0,
+        )
+
+    async def get_image(
+        self,
+        generation_id: str,
+        db_session: DatabaseSession,
+    ) -> StoredImage | None:
+        """
+        Get the stored image reference of a generation without loading the row.
+
+        Args:
+            generation_id: UUID of the generation
+            db_session: Database session with repositories
+
+        Returns:
+            StoredImage if the generation has an image, None otherwise
+        """
+        return await db_session.generations.get_image(generation_id)
+
+    async def get_image_bytes(
+        self,
+        generation_id: str,
+        db_session: DatabaseSession,
+    ) -> bytes | None:
+        """
+        Read the image bytes of a generation from the blob store.
+
+        Args:
+            generation_id: UUID of the generation
+            db_session: Database session with repositories
+
+        Returns:
+            PNG bytes if the generation has an image, None otherwise
+
+        Raises:
+            BlobNotFoundError: If the referenced blob is missing
+        """
+        image = await self.get_image(generation_id, db_session)
+        if image is None:
+            return None
+        return await blob_store.get_bytes(image.hash)
+
     async def get_character_for_generation(
         self, character_name: str, db_session: DatabaseSession
-    ) -> "BaseCharacter":
+    ) -> BaseCharacter:
         """
         Load character configuration for generation.
 
@@ -173,9 +356,6 @@ class GeneratorService:
         Returns:
             Character instance
         """
-        # Lazy import to speed up server startup
-        from manganize_core.character import BaseCharacter, KurageChan, SpeechStyle
-
         character = await db_session.characters.get_by_name(character_name)
 
         if not character:
@@ -203,6 +383,131 @@ class GeneratorService:
             full_body=Path(character.reference_images["full_body"]),
         )
 
+    def get_graph(self, character: BaseCharacter) -> "CompiledStateGraph":
+        """
+        Get the compiled agent graph for a character.
+
+        Graphs are cached per character, so only the first generation with a
+        character pays for creating the chat models and compiling the graph.
+
+        Args:
+            character: Character to generate with
+
+        Returns:
+            Compiled agent graph
+        """
+        # The agent stack (langchain / langgraph) is imported on first use
+        # to speed up server startup
+        from manganize_core.graph_cache import graph_cache
+
+        # Async nodes keep every stage on the event loop; no checkpointer is
+        # needed since runs are never resumed, and it would grow with every
+        # generation.
+        return graph_cache.get(
+            character,
+            use_async_nodes=True,
+            checkpointer=False,
+        )
+
+    async def run_generation(
+        self,
+        generation_id: str,
+        db_session: DatabaseSession,
+    ) -> None:
+        """
+        Execute a generation and publish its progress to the event bus.
+
+        The row is claimed first (pending, or abandoned in flight by another
+        worker) so that the same generation is never executed twice, even
+        across worker processes. The job runner renews the claim's lease
+        while the generation runs.
+
+        Args:
+            generation_id: Generation ID
+            db_session: Database session
+        """
+        event_bus.open(generation_id)
+        try:
+            # Spans of this run join the trace started by the request
+            with instrumentation.trace(generation_id):
+                claimed = await db_session.generations.claim(
+                    generation_id, settings.generation_lease_seconds
+                )
+                await db_session.commit()
+                if not claimed:
+                    generation = await self.get_generation_by_id(
+                        generation_id, db_session
+                    )
+                    if generation:
+                        event_bus.publish(self.build_status_snapshot(generation))
+                    return
+
+                # Gemini calls of this run report their queue position while
+                # waiting for a per-model slot
+                with model_limiter.listen(self._queue_listener(generation_id)):
+                    async for status in self.generate_for_request(
+                        generation_id, db_session
+                    ):
+                        event_bus.publish(status)
+        except Exception as e:
+            event_bus.publish(
+                GenerationStatus(
+                    id=generation_id,
+                    status=GenerationStatusEnum.ERROR,
+                    message=f"エラーが発生しました: {str(e)}",
+                    progress=ProgressMilestone.COMPLETED,
+                )
+            )
+            raise
+        finally:
+            event_bus.close(generation_id)
+
+    @staticmethod
+    def _queue_listener(generation_id: str) -> Callable[[int], None]:
+        """
+        Build a callback publishing Gemini queue positions of a generation.
+
+        While a model call waits, the current stage status is re-published
+        with the queue position; once it gets a slot the stage status is
+        restored, unless a newer stage has been reported meanwhile.
+
+        Args:
+            generation_id: Generation ID
+
+        Returns:
+            Callback taking the queue position (0 when the wait is over)
+        """
+        waiting_from: GenerationStatus | None = None
+
+        def on_position(position: int) -> None:
+            nonlocal waiting_from
+            latest = event_bus.latest(generation_id)
+            if latest is None:
+                return
+            current = latest[1]
+
+            if position == 0:
+                if waiting_from is not None and current.queue_position is not None:
+                    event_bus.publish(waiting_from)
+                waiting_from = None
+                return
+
+            if waiting_from is None or current.queue_position is None:
+                waiting_from = current
+            event_bus.publish(
+                waiting_from.model_copy(
+                    update={
+                        "message": (
+                            f"{waiting_from.message}"
+                            f"（混み合っています: {position}番目）"
+                        ),
+                        "queue_position": position,
+                    }
+                )
+            )
+
+        return on_position
+
     async def generate_for_request(
         self,
         generation_id: str,
@@ -223,18 +528,46 @@ class GeneratorService:
             raise ValueError("Generation not found")
 
         if generation.generation_type == GenerationTypeEnum.REVISION:
-            async for status in self.generate_revision(generation_id, db_session):
+            statuses = self.generate_revision(generation_id, db_session)
+        else:
+            # The parent of a multi-variant request also produces its
+            # siblings. A variant run on its own (e.g. resumed after a
+            # restart) falls through to a single-image generation.
+            variant_ids: dict[int, str] = {}
+            if generation.variant_index == 0:
+                variant_ids = await self._claim_variants(generation_id, db_session)
+
+            statuses = self.generate_manga(
+                generation_id,
+                generation.input_topic,
+                generation.character_name,
+                generation.source_upload_id,
+                db_session,
+                variant_ids=variant_ids,
+            )
+
+        # Time the whole run; failures are reported as an error status
+        # rather than raised, so they are recorded on the stage explicitly
+        with instrumentation.stage(
+            "generation", generation.generation_type.value
+        ) as stage:
+            async for status in statuses:
+                if status.status == GenerationStatusEnum.ERROR:
+                    stage.fail()
                 yield status
-            return
-
-        async for status in self.generate_manga(
-            generation_id,
-            generation.input_topic,
-            generation.character_name,
-            generation.source_upload_id,
-            db_session,
-        ):
-            yield status
+
+    async def _claim_variants(
+        self, parent_generation_id: str, db_session: DatabaseSession
+    ) -> dict[int, str]:
+        """Claim the unfinished variants of a parent generation, keyed by index."""
+        variant_ids: dict[int, str] = {}
+        for variant in await db_session.generations.list_variants(parent_generation_id):
+            if variant.variant_index and await db_session.generations.claim(
+                variant.id, settings.generation_lease_seconds
+            ):
+                variant_ids[variant.variant_index] = variant.id
+        await db_session.commit()
+        return variant_ids
 
     async def generate_manga(
         self,
@@ -243,20 +576,31 @@ class GeneratorService:
         character_name: str,
         source_upload_id: str | None,
         db_session: DatabaseSession,
+        variant_ids: dict[int, str] | None = None,
     ) -> AsyncGenerator[GenerationStatus, None]:
         """
         Generate initial manga image with SSE progress updates.
 
+        When ``variant_ids`` is given, the research runs once and one image
+        per variant is generated by concurrent graph branches (at most
+        ``generation_variant_concurrency`` at a time). Progress is reported
+        on the parent generation only.
+
         Args:
             generation_id: UUID for this generation
             topic: Topic to generate manga about
             character_name: Character to use
             source_upload_id: Optional uploaded source ID
             db_session: Database session with repositories
+            variant_ids: Claimed variant generation IDs keyed by variant_index
 
         Yields:
             GenerationStatus updates for SSE
         """
+        variant_ids = variant_ids or {}
+        # Row that receives each image, in the order of the graph's branches
+        target_ids = [generation_id, *(variant_ids[i] for i in sorted(variant_ids))]
+        finished_ids: set[str] = set()
         try:
             # Update status: Starting
             yield GenerationStatus(
@@ -271,19 +615,30 @@ class GeneratorService:
                 character_name, db_session
             )
 
-            # Lazy import to speed up server startup
-            from manganize_core.agents import ManganizeAgent, NodeName
+            # The agent stack (langchain / langgraph) is imported on first use
+            # to speed up server startup
+            from manganize_core.agents import NodeName
 
-            # Create ManganizeAgent
-            agent = ManganizeAgent(character=character)
-            graph = agent.compile_graph()
+            graph = self.get_graph(character)
 
             source_url: str | None = None
+            # Key the research cache by the user's topic and the uploaded
+            # content, not by the signed URL that changes on every run
+            run_config: dict[str, Any] = {
+                "thread_id": generation_id,
+                "research_topic": topic,
+            }
             if source_upload_id:
                 source_url = await upload_source_service.resolve_signed_url(
                     source_upload_id,
                     db_session,
                 )
+                run_config["research_source_hash"] = (
+                    await upload_source_service.get_content_hash(
+                        source_upload_id, db_session
+                    )
+                    or f"upload:{source_upload_id}"
+                )
             effective_topic = self._compose_agent_topic(topic, source_url)
 
             # Update status: Researching
@@ -294,30 +649,47 @@ class GeneratorService:
                 progress=ProgressMilestone.RESEARCHING,
             )
 
-            image_data: bytes | None = None
+            graph_input: dict[str, Any] = {"topic": effective_topic}
+            graph_config: RunnableConfig = {"configurable": run_config}
+            if len(target_ids) > 1:
+                graph_input["variant_count"] = len(target_ids)
+                # Bound the scenario writer / image generator branches
+                graph_config["max_concurrency"] = (
+                    settings.generation_variant_concurrency
+                )
+
+            images: dict[int, bytes | None] = {}
             title: str = ""
+            generating_reported = False
             async for chunk in graph.astream(
-                {"topic": effective_topic},
-                {"configurable": {"thread_id": generation_id}},
+                graph_input,
+                graph_config,
                 stream_mode="updates",
             ):
                 # Process researcher node results
                 if results := chunk.get(NodeName.RESEARCHER):
                     # Get title from agent output
                     title = results.get("topic_title", "") or datetime.now(
-                        timezone.utc
+                        UTC
                     ).strftime("%Y%m%d_%H%M%S")
 
                     # Update status: Writing scenario
                     yield GenerationStatus(
                         id=generation_id,
                         status=GenerationStatusEnum.WRITING,
-                        message="シナリオを作成中...",
+                        message=(
+                            "過去のリサーチ結果を使ってシナリオを作成中..."
+                            if results.get("research_cache_hit")
+                            else "シナリオを作成中..."
+                        ),
                         progress=ProgressMilestone.WRITING,
                     )
 
-                # Process scenario writer node results
-                if chunk.get(NodeName.SCENARIO_WRITER):
+                # Process scenario writer node results. Variant branches
+                # hand their scenario on without a state update, so only
+                # the presence of the node is checked.
+                if NodeName.SCENARIO_WRITER in chunk and not generating_reported:
+                    generating_reported = True
                     # Update status: Generating image
                     yield GenerationStatus(
                         id=generation_id,
@@ -328,11 +700,49 @@ class GeneratorService:
 
                 # Process image generator node results
                 if results := chunk.get(NodeName.IMAGE_GENERATOR):
-                    # Image generation is done
-                    image_data = results.get("generated_image")
+                    if "variants" not in results:
+                        # Image generation is done
+                        images[0] = results.get("generated_image")
+                        continue
+
+                    for variant in results["variants"]:
+                        images[variant["variant_index"]] = variant["generated_image"]
+                    yield GenerationStatus(
+                        id=generation_id,
+                        status=GenerationStatusEnum.GENERATING,
+                        message=f"画像を生成中... ({len(images)}/{len(target_ids)})",
+                        progress=ProgressMilestone.GENERATING
+                        + (ProgressMilestone.SAVING - ProgressMilestone.GENERATING)
+                        * len(images)
+                        // len(target_ids),
+                    )
+
+            # Save the other variants first so they are final even if the
+            # parent's image failed
+            stored_images: list[StoredImage] = []
+            for index, variant_id in enumerate(target_ids[1:], start=1):
+                variant_data = images.get(index)
+                if variant_data is None:
+                    await db_session.generations.update_error(
+                        variant_id, "画像生成に失敗しました"
+                    )
+                else:
+                    variant_image = await blob_store.put_image(variant_data)
+                    await db_session.generations.update_with_result(
+                        variant_id, variant_image, f"{title} ({index + 1})"
+                    )
+                    stored_images.append(variant_image)
+                finished_ids.add(variant_id)
+            await db_session.commit()
+
+            image_data = images.get(0)
 
             # Update status: Saving
             if image_data is None:
+                await db_session.generations.update_error(
+                    generation_id, "画像生成に失敗しました"
+                )
+                await db_session.commit()
                 yield GenerationStatus(
                     id=generation_id,
                     status=GenerationStatusEnum.ERROR,
@@ -349,8 +759,9 @@ class GeneratorService:
             )
 
             # Save to database
+            stored_image = await blob_store.put_image(image_data)
             await db_session.generations.update_with_result(
-                generation_id, image_data, title
+                generation_id, stored_image, title
             )
             await db_session.commit()
 
@@ -362,6 +773,10 @@ class GeneratorService:
                 progress=ProgressMilestone.COMPLETED,
             )
 
+            # Thumbnails are ready by the time the history list asks for them
+            for image in [stored_image, *stored_images]:
+                await thumbnail_service.prerender(image.hash)
+
         except Exception as e:
             # Handle errors
             error_msg = str(e)
@@ -373,7 +788,9 @@ class GeneratorService:
             )
 
             # Save error to database
-            await db_session.generations.update_error(generation_id, error_msg)
+            for target_id in target_ids:
+                if target_id not in finished_ids:
+                    await db_session.generations.update_error(target_id, error_msg)
             await db_session.commit()
 
     async def generate_revision(
@@ -408,17 +825,20 @@ class GeneratorService:
             if not parent_generation:
                 raise ValueError("Parent generation not found")
 
-            if not parent_generation.image_data:
+            if not parent_generation.image_hash:
                 raise ValueError("Parent generation has no image")
 
+            base_image = await blob_store.get_bytes(parent_generation.image_hash)
+
             # Load character
             character = await self.get_character_for_generation(
                 generation.character_name,
                 db_session,
             )
 
-            # Lazy import to speed up server startup
-            from manganize_core.tools import edit_manga_image
+            # The agent stack (langchain / langgraph) is imported on first use
+            # to speed up server startup
+            from manganize_core.tools import aedit_manga_image
 
             yield GenerationStatus(
                 id=generation_id,
@@ -427,14 +847,20 @@ class GeneratorService:
                 progress=ProgressMilestone.STARTED,
             )
 
-            image_data = edit_manga_image(
+            # Native async call: keeps the event loop free during the Gemini
+            # round trip, retry backoff and base image compression
+            image_data = await aedit_manga_image(
                 content=generation.input_topic,
-                base_image=parent_generation.image_data,
+                base_image=base_image,
                 revision_payload=generation.revision_payload or {},
                 character=character,
             )
 
             if image_data is None:
+                await db_session.generations.update_error(
+                    generation_id, "画像修正に失敗しました"
+                )
+                await db_session.commit()
                 yield GenerationStatus(
                     id=generation_id,
                     status=GenerationStatusEnum.ERROR,
@@ -455,10 +881,11 @@ class GeneratorService:
                 if not title.endswith(" (rev)"):
                     title = f"{title} (rev)"
             else:
-                title = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+                title = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
 
+            stored_image = await blob_store.put_image(image_data)
             await db_session.generations.update_with_result(
-                generation_id, image_data, title
+                generation_id, stored_image, title
             )
             await db_session.commit()
 
@@ -469,6 +896,9 @@ class GeneratorService:
                 progress=ProgressMilestone.COMPLETED,
             )
 
+            # Thumbnails are ready by the time the history list asks for them
+            await thumbnail_service.prerender(stored_image.hash)
+
         except Exception as e:
             error_msg = str(e)
             yield GenerationStatus(
@@ -2,6 +2,9 @@
 
 from manganize_web.models.generation import GenerationHistory, GenerationStatusEnum
 from manganize_web.repositories.database_session import DatabaseSession
+from manganize_web.services.blob_store import blob_store
+from manganize_web.services.thumbnail import thumbnail_service
+from manganize_web.utils.pagination import decode_cursor, encode_cursor
 
 
 class HistoryService:
@@ -32,6 +35,40 @@ class HistoryService:
             status_filter=status_filter,
         )
 
+    async def list_history_page(
+        self,
+        db_session: DatabaseSession,
+        cursor: str | None = None,
+        limit: int = 10,
+        status_filter: GenerationStatusEnum | None = None,
+    ) -> tuple[list[GenerationHistory], str | None]:
+        """
+        List generation history with cursor-based (keyset) pagination.
+
+        Args:
+            db_session: Database session
+            cursor: Opaque cursor returned with the previous page, or None
+            limit: Number of items per page
+            status_filter: Optional status to filter by
+
+        Returns:
+            Tuple of (list of generations, cursor of the next page or None)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        generations, has_more = await db_session.generations.list_history_after(
+            cursor=decode_cursor(cursor) if cursor else None,
+            limit=limit,
+            status_filter=status_filter,
+        )
+
+        next_cursor = None
+        if has_more and generations:
+            last = generations[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return generations, next_cursor
+
     async def get_by_id(
         self,
         generation_id: str,
@@ -64,10 +101,21 @@ class HistoryService:
         Returns:
             True if deleted, False if not found
         """
-        deleted = await db_session.generations.delete_by_id(generation_id)
-        if deleted:
-            await db_session.commit()
-        return deleted
+        generation = await db_session.generations.get_by_id(generation_id)
+        if not generation:
+            return False
+
+        image_hash = generation.image_hash
+        await db_session.generations.delete_by_id(generation_id)
+        await db_session.commit()
+
+        # Blobs are shared by content, so only drop unreferenced ones
+        if image_hash and not await db_session.generations.count_image_references(
+            image_hash
+        ):
+            await blob_store.delete(image_hash)
+            await thumbnail_service.delete(image_hash)
+        return True
 
 
 # Global instance
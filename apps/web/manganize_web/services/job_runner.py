@@ -0,0 +1,257 @@
+"""Background job runner that executes generations outside of the request cycle"""
+
+import asyncio
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from manganize_web.config import settings
+from manganize_web.models.generation import GenerationStatusEnum
+from manganize_web.repositories.database_session import DatabaseSession
+from manganize_web.schemas.generation import GenerationStatus
+from manganize_web.services.event_bus import event_bus
+from manganize_web.services.generator import generator_service
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the generation queue cannot accept more jobs"""
+
+
+class GenerationJobRunner:
+    """
+    Bounded worker pool executing generation jobs in the background.
+
+    Request handlers enqueue generation IDs; a fixed number of workers pick
+    them up and drive ``GeneratorService.run_generation`` with their own
+    database session, so the pipeline keeps running even if no client is
+    connected. Progress is published to the event bus, not to the caller.
+    Queued jobs are told their position in the queue as it moves.
+
+    While a job runs, the lease on its claimed row is renewed, so that a
+    row left in flight by a crashed or stopped worker can be told apart from
+    one still running and resumed once the lease has expired.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.generation_max_concurrency,
+        queue_size: int = settings.generation_queue_size,
+    ) -> None:
+        """
+        Initialize job runner.
+
+        Args:
+            max_workers: Maximum number of generations executed concurrently
+            queue_size: Maximum number of jobs waiting for a worker
+        """
+        self._max_workers = max_workers
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self._active: set[str] = set()
+        # Queued jobs not yet picked up by a worker, in FIFO order
+        self._waiting: list[str] = []
+        # Queue slots held by requests still creating their generation row
+        self._reserved = 0
+        self._workers: list[asyncio.Task[None]] = []
+        self._lease_renewer: asyncio.Task[None] | None = None
+        self._session_maker: async_sessionmaker[AsyncSession] | None = None
+
+    def start(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Start worker tasks.
+
+        Args:
+            session_maker: Session factory used by workers to open DB sessions
+        """
+        self._session_maker = session_maker
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"generation-worker-{index}")
+            for index in range(self._max_workers)
+        ]
+        self._lease_renewer = asyncio.create_task(
+            self._renew_leases(), name="generation-lease-renewer"
+        )
+
+    async def stop(self) -> None:
+        """
+        Cancel worker tasks and wait for them to exit.
+
+        The leases of cancelled generations are expired, so that they can be
+        resumed as soon as a client reconnects to another worker.
+        """
+        tasks = [*self._workers, *filter(None, [self._lease_renewer])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._lease_renewer = None
+
+    @contextmanager
+    def reserve(self) -> Iterator[None]:
+        """
+        Hold a queue slot while a generation row is being created.
+
+        Submitting inside the block always finds room, so a request that
+        passed the capacity check never leaves a committed row behind that
+        the queue then rejects. The slot is released when the block exits.
+
+        Raises:
+            JobQueueFullError: If the queue has no free slot
+        """
+        if not self._has_room():
+            raise JobQueueFullError("Generation queue is full")
+        self._reserved += 1
+        try:
+            yield
+        finally:
+            self._reserved -= 1
+
+    def submit(self, generation_id: str, reserved: bool = False) -> None:
+        """
+        Enqueue a generation for background execution.
+
+        Idempotent: if the generation is already queued or running in this
+        process, nothing new is started.
+
+        Args:
+            generation_id: UUID of the generation to execute
+            reserved: Whether the caller holds a slot taken with ``reserve``
+
+        Raises:
+            JobQueueFullError: If the queue has no free slot
+        """
+        if generation_id in self._active:
+            return
+
+        if not reserved and not self._has_room():
+            raise JobQueueFullError("Generation queue is full")
+        self._queue.put_nowait(generation_id)
+
+        self._active.add(generation_id)
+        self._waiting.append(generation_id)
+        # Open the progress channel now so subscribers can attach before
+        # a worker picks the job up
+        event_bus.open(generation_id)
+        self._publish_position(generation_id, len(self._waiting))
+
+    def _has_room(self) -> bool:
+        """Whether the queue has a slot that is neither taken nor reserved"""
+        if self._queue.maxsize <= 0:
+            return True
+        return self._queue.qsize() + self._reserved < self._queue.maxsize
+
+    def _running(self) -> list[str]:
+        """Generations picked up by a worker (queued jobs hold no claim)"""
+        return [
+            generation_id
+            for generation_id in self._active
+            if generation_id not in self._waiting
+        ]
+
+    async def _renew_leases(self) -> None:
+        """Periodically extend the leases of the running generations"""
+        interval = settings.generation_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            running = self._running()
+            if not running or self._session_maker is None:
+                continue
+            try:
+                async with (
+                    self._session_maker() as session,
+                    DatabaseSession(session) as db_session,
+                ):
+                    await db_session.generations.renew_leases(
+                        running, settings.generation_lease_seconds
+                    )
+                    await db_session.commit()
+            except SQLAlchemyError:
+                # Missing one renewal is fine; the lease outlasts the interval
+                logger.exception("Failed to renew generation leases")
+
+    def is_active(self, generation_id: str) -> bool:
+        """
+        Check whether a generation is queued or running in this process.
+
+        Args:
+            generation_id: UUID of the generation
+
+        Returns:
+            True if the generation is in flight, False otherwise
+        """
+        return generation_id in self._active
+
+    async def _worker(self) -> None:
+        """Pull generation IDs from the queue and execute them"""
+        while True:
+            generation_id = await self._queue.get()
+            self._dequeued(generation_id)
+            try:
+                await self._run(generation_id)
+            except Exception:
+                logger.exception("Generation job %s failed", generation_id)
+            finally:
+                self._active.discard(generation_id)
+                self._queue.task_done()
+
+    def _dequeued(self, generation_id: str) -> None:
+        """Remove a job picked up by a worker and update the others' positions"""
+        index = self._waiting.index(generation_id)
+        del self._waiting[index]
+        for position, waiting_id in enumerate(self._waiting[index:], start=index + 1):
+            self._publish_position(waiting_id, position)
+
+    @staticmethod
+    def _publish_position(generation_id: str, position: int) -> None:
+        """Tell subscribers of a queued job where it is in the queue"""
+        event_bus.publish(
+            GenerationStatus(
+                id=generation_id,
+                status=GenerationStatusEnum.PENDING,
+                message=f"順番待ち中です（{position}番目）",
+                progress=0,
+                queue_position=position,
+            )
+        )
+
+    async def _run(self, generation_id: str) -> None:
+        """
+        Execute a single generation.
+
+        Args:
+            generation_id: UUID of the generation to execute
+        """
+        if self._session_maker is None:
+            raise RuntimeError("Job runner is not started")
+
+        async with (
+            self._session_maker() as session,
+            DatabaseSession(session) as db_session,
+        ):
+            try:
+                await generator_service.run_generation(generation_id, db_session)
+            except asyncio.CancelledError:
+                await self._release(generation_id)
+                raise
+
+    async def _release(self, generation_id: str) -> None:
+        """Expire the lease of a cancelled generation so it can be resumed"""
+        assert self._session_maker is not None
+        try:
+            async with (
+                self._session_maker() as session,
+                DatabaseSession(session) as db_session,
+            ):
+                await db_session.generations.expire_leases([generation_id])
+                await db_session.commit()
+        except SQLAlchemyError:
+            # The lease still runs out on its own
+            logger.exception("Failed to release generation %s", generation_id)
+
+
+# Global instance
+job_runner = GenerationJobRunner()
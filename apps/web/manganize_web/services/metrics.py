@@ -0,0 +1,68 @@
+"""Prometheus metrics for generation stage timings."""
+
+from typing import TYPE_CHECKING
+
+from prometheus_client import Gauge, Histogram
+
+if TYPE_CHECKING:
+    from manganize_core.instrumentation import StageScope
+
+# Stages range from millisecond repository calls to minutes-long generations
+STAGE_DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    20.0,
+    30.0,
+    60.0,
+    90.0,
+    120.0,
+    180.0,
+    300.0,
+)
+
+
+class PrometheusStageObserver:
+    """
+    Stage observer recording durations and in-flight counts in Prometheus.
+
+    Registered with ``manganize_core.instrumentation`` on startup. Stages
+    are labelled by kind (generation, node, llm, tool, repository), name,
+    model and, for durations, outcome (success, error, cancelled).
+    """
+
+    def __init__(self) -> None:
+        self.duration = Histogram(
+            "manganize_stage_duration_seconds",
+            "Duration of generation pipeline stages",
+            ["kind", "name", "model", "outcome"],
+            buckets=STAGE_DURATION_BUCKETS,
+        )
+        self.in_flight = Gauge(
+            "manganize_stage_in_flight",
+            "Generation pipeline stages currently running",
+            ["kind", "name", "model"],
+        )
+
+    def stage_started(self, scope: "StageScope") -> None:
+        """Count a stage as running."""
+        self.in_flight.labels(scope.kind, scope.name, scope.model).inc()
+
+    def stage_finished(self, scope: "StageScope", duration: float) -> None:
+        """Record the duration of a finished stage."""
+        self.in_flight.labels(scope.kind, scope.name, scope.model).dec()
+        self.duration.labels(
+            scope.kind, scope.name, scope.model, scope.outcome
+        ).observe(duration)
+
+
+# Global instance
+stage_metrics = PrometheusStageObserver()
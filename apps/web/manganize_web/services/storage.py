@@ -1,11 +1,14 @@
 """S3-compatible object storage service."""
 
 import asyncio
+from collections.abc import Iterator
 from functools import lru_cache
 from typing import Protocol
 
 import boto3
 from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+from manganize_core.instrumentation import instrumentation
 
 from manganize_web.config import settings
 
@@ -21,6 +24,20 @@ class StorageBackend(Protocol):
     def generate_presigned_get_url(self, object_key: str, expires_in: int) -> str:
         """Generate a temporary download URL."""
 
+    def iter_object(
+        self,
+        object_key: str,
+        chunk_size: int,
+        byte_range: tuple[int, int] | None = None,
+    ) -> Iterator[bytes] | None:
+        """Read an object or an inclusive byte range in chunks (None if missing)."""
+
+    def object_exists(self, object_key: str) -> bool:
+        """Return whether an object exists."""
+
+    def delete_object(self, object_key: str) -> None:
+        """Delete an object if it exists."""
+
 
 class S3CompatibleStorageBackend:
     """S3-compatible backend for AWS S3 / R2 / MinIO."""
@@ -45,6 +62,7 @@ class S3CompatibleStorageBackend:
             config=boto_config,
         )
 
+    @instrumentation.instrumented("storage", "put_object")
     def put_object(
         self, object_key: str, data: bytes, content_type: str | None
     ) -> None:
@@ -57,6 +75,7 @@ class S3CompatibleStorageBackend:
             params["ContentType"] = content_type
         self._client.put_object(**params)
 
+    @instrumentation.instrumented("storage", "presign")
     def generate_presigned_get_url(self, object_key: str, expires_in: int) -> str:
         return self._client.generate_presigned_url(
             "get_object",
@@ -64,6 +83,36 @@ class S3CompatibleStorageBackend:
             ExpiresIn=expires_in,
         )
 
+    @instrumentation.instrumented("storage", "get_object")
+    def iter_object(
+        self,
+        object_key: str,
+        chunk_size: int,
+        byte_range: tuple[int, int] | None = None,
+    ) -> Iterator[bytes] | None:
+        params: dict[str, object] = {"Bucket": self._bucket, "Key": object_key}
+        if byte_range is not None:
+            params["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        try:
+            response = self._client.get_object(**params)
+        except self._client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].iter_chunks(chunk_size)
+
+    @instrumentation.instrumented("storage", "head_object")
+    def object_exists(self, object_key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=object_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in {"404", "NoSuchKey"}:
+                return False
+            raise
+        return True
+
+    @instrumentation.instrumented("storage", "delete_object")
+    def delete_object(self, object_key: str) -> None:
+        self._client.delete_object(Bucket=self._bucket, Key=object_key)
+
 
 @lru_cache(maxsize=1)
 def get_storage_backend() -> StorageBackend:
@@ -0,0 +1,231 @@
+"""Precomputed thumbnails for generated images"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pydantic import BaseModel
+
+from manganize_web.config import settings
+from manganize_web.services.blob_store import BlobNotFoundError, blob_store
+from manganize_web.utils.http_cache import parse_accept
+from manganize_web.utils.thumbnail import (
+    THUMBNAIL_MEDIA_TYPES,
+    is_format_supported,
+    render_thumbnails,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when encoder settings change so stale thumbnails are not served
+THUMBNAIL_VERSION = 1
+
+
+class Thumbnail(BaseModel):
+    """Encoded thumbnail ready to be served"""
+
+    data: bytes
+    media_type: str
+    etag: str
+
+
+class ThumbnailService:
+    """
+    Renders, persists and serves thumbnails of generated images.
+
+    Every configured size is rendered in every supported format once, either
+    when a generation completes or on first access, and stored in the blob
+    store under a key derived from the source image hash. Rendering runs in a
+    process pool so it never blocks the event loop. Recently served
+    thumbnails are kept in a bounded in-memory LRU cache.
+    """
+
+    def __init__(
+        self,
+        sizes: list[int] = settings.thumbnail_sizes,
+        formats: list[str] = settings.thumbnail_formats,
+        max_workers: int = settings.thumbnail_workers,
+        cache_max_bytes: int = settings.thumbnail_cache_max_mb * 1024 * 1024,
+    ) -> None:
+        """
+        Initialize thumbnail service.
+
+        Args:
+            sizes: Bounding box sizes in pixels to render
+            formats: Preferred formats in order; PNG is always added as fallback
+            max_workers: Number of rendering processes
+            cache_max_bytes: Maximum bytes kept in the in-memory cache
+        """
+        self.sizes = sorted(set(sizes))
+        self.formats = [
+            fmt for fmt in dict.fromkeys([*formats, "png"]) if is_format_supported(fmt)
+        ]
+        self._max_workers = max_workers
+        self._cache_max_bytes = cache_max_bytes
+        self._cache: OrderedDict[str, Thumbnail] = OrderedDict()
+        self._cache_bytes = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._renders: dict[str, asyncio.Task[None]] = {}
+
+    @staticmethod
+    def _key(image_hash: str, size: int, fmt: str) -> str:
+        return f"{image_hash}.thumb-v{THUMBNAIL_VERSION}-{size}.{fmt}"
+
+    def negotiate_format(self, accept: str | None) -> str:
+        """
+        Pick the best thumbnail format the client accepts.
+
+        Only formats whose media type the client lists with a non-zero
+        quality are considered; wildcards do not opt a client into AVIF or
+        WebP. The highest quality wins, ties go to the order of ``formats``.
+
+        Args:
+            accept: Value of the Accept request header
+
+        Returns:
+            Format name, falling back to 'png'
+        """
+        qualities = parse_accept(accept)
+        acceptable = [
+            fmt
+            for fmt in self.formats
+            if qualities.get(THUMBNAIL_MEDIA_TYPES[fmt], 0.0) > 0
+        ]
+        if not acceptable:
+            return "png"
+        return max(acceptable, key=lambda fmt: qualities[THUMBNAIL_MEDIA_TYPES[fmt]])
+
+    async def get(self, image_hash: str, size: int, fmt: str) -> Thumbnail:
+        """
+        Get a thumbnail, rendering all variants on first access.
+
+        Args:
+            image_hash: Content hash of the source image
+            size: Thumbnail size (one of ``sizes``)
+            fmt: Thumbnail format (one of ``formats``)
+
+        Returns:
+            Encoded thumbnail
+
+        Raises:
+            BlobNotFoundError: If the source image does not exist
+        """
+        key = self._key(image_hash, size, fmt)
+        thumbnail = self._cache_get(key)
+        if thumbnail is not None:
+            return thumbnail
+
+        try:
+            data = await blob_store.get_bytes(key)
+        except BlobNotFoundError:
+            await self.ensure(image_hash)
+            data = await blob_store.get_bytes(key)
+
+        thumbnail = Thumbnail(
+            data=data,
+            media_type=THUMBNAIL_MEDIA_TYPES[fmt],
+            etag=f'"{key}"',
+        )
+        self._cache_put(key, thumbnail)
+        return thumbnail
+
+    async def ensure(self, image_hash: str) -> None:
+        """
+        Render and store all thumbnail variants of an image.
+
+        Concurrent calls for the same image share a single render.
+
+        Args:
+            image_hash: Content hash of the source image
+
+        Raises:
+            BlobNotFoundError: If the source image does not exist
+        """
+        task = self._renders.get(image_hash)
+        if task is None:
+            task = asyncio.create_task(self._render(image_hash))
+            self._renders[image_hash] = task
+            task.add_done_callback(lambda _: self._renders.pop(image_hash, None))
+        await asyncio.shield(task)
+
+    async def prerender(self, image_hash: str) -> None:
+        """
+        Render thumbnails ahead of the first request (best effort).
+
+        Failures are logged; thumbnails are rendered again on first access.
+
+        Args:
+            image_hash: Content hash of the source image
+        """
+        try:
+            await self.ensure(image_hash)
+        except Exception:
+            logger.exception("Failed to prerender thumbnails for %s", image_hash)
+
+    async def delete(self, image_hash: str) -> None:
+        """
+        Delete all thumbnail variants of an image.
+
+        Args:
+            image_hash: Content hash of the source image
+        """
+        for size in self.sizes:
+            for fmt in self.formats:
+                key = self._key(image_hash, size, fmt)
+                thumbnail = self._cache.pop(key, None)
+                if thumbnail is not None:
+                    self._cache_bytes -= len(thumbnail.data)
+                await blob_store.delete(key)
+
+    def shutdown(self) -> None:
+        """Stop the rendering processes"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def _render(self, image_hash: str) -> None:
+        image_data = await blob_store.get_bytes(image_hash)
+        if self._executor is None:
+            # Spawn workers so they do not inherit the event loop and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        try:
+            thumbnails = await asyncio.get_running_loop().run_in_executor(
+                self._executor, render_thumbnails, image_data, self.sizes, self.formats
+            )
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next render
+            self.shutdown()
+            raise
+        for (size, fmt), data in thumbnails.items():
+            await blob_store.put_bytes(
+                self._key(image_hash, size, fmt), data, THUMBNAIL_MEDIA_TYPES[fmt]
+            )
+        logger.debug("Rendered %d thumbnails for %s", len(thumbnails), image_hash)
+
+    def _cache_get(self, key: str) -> Thumbnail | None:
+        thumbnail = self._cache.get(key)
+        if thumbnail is not None:
+            self._cache.move_to_end(key)
+        return thumbnail
+
+    def _cache_put(self, key: str, thumbnail: Thumbnail) -> None:
+        if len(thumbnail.data) > self._cache_max_bytes:
+            return
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous.data)
+        self._cache[key] = thumbnail
+        self._cache_bytes += len(thumbnail.data)
+        while self._cache_bytes > self._cache_max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted.data)
+
+
+# Global instance
+thumbnail_service = ThumbnailService()
@@ -0,0 +1,214 @@
+"""OpenTelemetry tracing of generation stages.
+
+Requires the ``tracing`` extra (``uv sync --extra tracing``); the module is
+only imported when ``TRACING_ENABLED`` is set.
+"""
+
+import hashlib
+import os
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
+
+from opentelemetry import context, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.trace import (
+    Link,
+    NonRecordingSpan,
+    SpanContext,
+    Status,
+    StatusCode,
+    TraceFlags,
+)
+
+if TYPE_CHECKING:
+    from manganize_core.instrumentation import StageScope
+
+# Builds a span exporter from the tracing settings
+SpanExporterFactory = Callable[[], SpanExporter]
+
+_SPAN_KEY = "otel_span"
+_TOKEN_KEY = "otel_token"
+
+
+class JsonLinesSpanExporter(ConsoleSpanExporter):
+    """Append finished spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: Path, service_name: str | None = None) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: TextIO = path.open("a", encoding="utf-8")
+        super().__init__(
+            service_name=service_name,
+            out=self._file,
+            formatter=_format_json_line,
+        )
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self._file.close()
+
+
+def _format_json_line(span: ReadableSpan) -> str:
+    return span.to_json(indent=None) + os.linesep
+
+
+def _otlp_exporter() -> SpanExporter:
+    # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+        OTLPSpanExporter,
+    )
+
+    return OTLPSpanExporter()
+
+
+def _generation_trace_id(trace_key: str) -> int:
+    """
+    Derive the trace ID shared by every span of a generation.
+
+    The request that creates a generation, its SSE streams and its
+    background run (even in another process or after a restart) thus end
+    up in the same trace.
+    """
+    try:
+        return uuid.UUID(trace_key).int
+    except ValueError:
+        return int(hashlib.sha256(trace_key.encode()).hexdigest()[:32], 16)
+
+
+def _generation_context(trace_id: int) -> context.Context:
+    """Build a context whose parent is the generation's virtual root span."""
+    root = SpanContext(
+        trace_id=trace_id,
+        span_id=(trace_id & 0xFFFF_FFFF_FFFF_FFFF) or 1,
+        is_remote=True,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED),
+    )
+    return trace.set_span_in_context(NonRecordingSpan(root))
+
+
+class StageTracer:
+    """
+    Stage observer turning instrumented stages into OpenTelemetry spans.
+
+    Spans nest following the call structure (request → graph node → LLM or
+    tool call → browser / storage / database call). Stages run under
+    ``instrumentation.trace(generation_id)`` are grouped into one trace per
+    generation. Exporters are looked up by name; ``console``, ``file`` and
+    ``otlp`` are built in and more can be added with ``register_exporter``.
+    """
+
+    def __init__(self) -> None:
+        self._provider: TracerProvider | None = None
+        self._tracer: trace.Tracer | None = None
+        self._exporters: dict[str, SpanExporterFactory] = {
+            "console": ConsoleSpanExporter,
+            "otlp": _otlp_exporter,
+        }
+
+    def register_exporter(self, name: str, factory: SpanExporterFactory) -> None:
+        """
+        Register a span exporter selectable with ``TRACING_EXPORTER``.
+
+        Args:
+            name: Exporter name
+            factory: Callable building the exporter
+        """
+        self._exporters[name] = factory
+
+    def start(self, *, exporter: str, service_name: str, file_path: str) -> None:
+        """
+        Create the tracer provider and its exporter.
+
+        Args:
+            exporter: Exporter name (console, file, otlp or a registered one)
+            service_name: ``service.name`` resource attribute
+            file_path: Output file of the ``file`` exporter
+
+        Raises:
+            ValueError: If the exporter is unknown
+        """
+        factories = {
+            **self._exporters,
+            "file": lambda: JsonLinesSpanExporter(Path(file_path), service_name),
+        }
+        if exporter not in factories:
+            raise ValueError(
+                f"Unknown tracing exporter {exporter!r}; "
+                f"expected one of {', '.join(sorted(factories))}"
+            )
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name})
+        )
+        provider.add_span_processor(BatchSpanProcessor(factories[exporter]()))
+        self._provider = provider
+        self._tracer = provider.get_tracer("manganize")
+
+    def shutdown(self) -> None:
+        """Flush pending spans and close the exporter."""
+        if self._provider is not None:
+            self._provider.shutdown()
+        self._provider = None
+        self._tracer = None
+
+    def stage_started(self, scope: "StageScope") -> None:
+        """Start a span for the stage and make it the current span."""
+        if self._tracer is None:
+            return
+
+        parent: context.Context | None = None
+        links: list[Link] = []
+        if scope.trace_key is not None:
+            trace_id = _generation_trace_id(scope.trace_key)
+            current = trace.get_current_span().get_span_context()
+            if current.trace_id != trace_id:
+                # Top-level stage of the generation: start under its root and
+                # keep a link to any unrelated span (e.g. an HTTP server span)
+                parent = _generation_context(trace_id)
+                if current.is_valid:
+                    links.append(Link(current))
+
+        attributes = {
+            "manganize.stage.kind": scope.kind,
+            "manganize.stage.name": scope.name,
+        }
+        if scope.model:
+            attributes["gen_ai.request.model"] = scope.model
+        if scope.trace_key is not None:
+            attributes["manganize.generation_id"] = scope.trace_key
+        attributes.update({key: str(value) for key, value in scope.tags.items()})
+
+        span = self._tracer.start_span(
+            f"{scope.kind} {scope.name}",
+            context=parent,
+            links=links,
+            attributes=attributes,
+        )
+        scope.attributes[_SPAN_KEY] = span
+        scope.attributes[_TOKEN_KEY] = context.attach(trace.set_span_in_context(span))
+
+    def stage_finished(self, scope: "StageScope", duration: float) -> None:
+        """End the stage's span, recording its outcome."""
+        span = scope.attributes.pop(_SPAN_KEY, None)
+        token = scope.attributes.pop(_TOKEN_KEY, None)
+        if span is None:
+            return
+
+        span.set_attribute("manganize.stage.outcome", scope.outcome)
+        if scope.outcome == "error" and scope.error is not None:
+            span.record_exception(scope.error)
+            span.set_status(Status(StatusCode.ERROR, str(scope.error)))
+        span.end()
+        if token is not None:
+            context.detach(token)
+
+
+# Global instance
+stage_tracer = StageTracer()
@@ -1,7 +1,8 @@
 """Service for uploaded source document handling."""
 
+import hashlib
 import uuid
-from datetime import datetime, timedelta, timezone
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 from fastapi import HTTPException, UploadFile
@@ -24,8 +25,8 @@ class UploadSourceService:
         SQLite can return naive datetimes even when UTC values were stored.
         """
         if dt.tzinfo is None or dt.utcoffset() is None:
-            return dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
+            return dt.replace(tzinfo=UTC)
+        return dt.astimezone(UTC)
 
     async def create_upload(
         self,
@@ -49,7 +50,7 @@ class UploadSourceService:
         upload_id = str(uuid.uuid4())
 
         suffix = Path(file.filename).suffix.lower()
-        now = datetime.now(timezone.utc)
+        now = datetime.now(UTC)
         object_key = (
             f"{settings.storage_object_prefix}/{now:%Y/%m/%d}/{upload_id}{suffix}"
         )
@@ -72,6 +73,7 @@ class UploadSourceService:
             original_filename=file.filename,
             content_type=file.content_type,
             file_size=len(content),
+            content_hash=hashlib.sha256(content).hexdigest(),
             created_at=now,
             expires_at=now + timedelta(hours=settings.upload_ttl_hours),
         )
@@ -98,7 +100,7 @@ class UploadSourceService:
         if not source:
             raise ValueError("Upload source not found")
 
-        now = datetime.now(timezone.utc)
+        now = datetime.now(UTC)
         expires_at = self._normalize_utc(source.expires_at)
         if expires_at <= now:
             raise ValueError("Upload source has expired")
@@ -111,6 +113,24 @@ class UploadSourceService:
         await db_session.commit()
         return signed_url
 
+    async def get_content_hash(
+        self,
+        upload_id: str,
+        db_session: DatabaseSession,
+    ) -> str | None:
+        """
+        Get the content hash of an uploaded file.
+
+        Args:
+            upload_id: Upload source ID
+            db_session: Database session
+
+        Returns:
+            SHA-256 hex digest, or None for uploads made before hashing
+        """
+        source = await db_session.upload_sources.get_by_id(upload_id)
+        return source.content_hash if source else None
+
     async def ensure_upload_available(
         self,
         upload_id: str,
@@ -128,7 +148,7 @@ class UploadSourceService:
             raise ValueError("Upload source not found")
 
         expires_at = self._normalize_utc(source.expires_at)
-        if expires_at <= datetime.now(timezone.utc):
+        if expires_at <= datetime.now(UTC):
             raise ValueError("Upload source has expired")
 
 
@@ -0,0 +1,163 @@
+"""Background warm-up of a fresh worker before it receives traffic"""
+
+import asyncio
+import importlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Literal
+
+from manganize_core.character import KurageChan
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from manganize_web.repositories.database_session import DatabaseSession
+from manganize_web.services.generator import generator_service
+
+logger = logging.getLogger(__name__)
+
+WarmupStepStatus = Literal["pending", "running", "ok", "failed", "skipped"]
+
+# Modules the generation pipeline imports on first use
+WARMUP_MODULES = (
+    "manganize_core.agents",
+    "manganize_core.graph_cache",
+    "manganize_core.tools",
+    "google.genai",
+    "markitdown",
+)
+
+
+class WarmupService:
+    """
+    Warms up a fresh worker in the background.
+
+    Without it, the first generation in a new worker pays for importing the
+    agent stack, creating the chat models and compiling the default
+    character's graph, launching Chromium and opening Gemini connections.
+    The warm-up runs these steps while the worker already serves requests,
+    and ``ready`` tells a load balancer (through ``/ready``) when it is done.
+
+    A failed step is logged and reported but does not keep the worker out of
+    rotation: every step is retried lazily by the first generation that
+    needs it, exactly as without the warm-up.
+    """
+
+    def __init__(self) -> None:
+        """Initialize warm-up service."""
+        self._task: asyncio.Task[None] | None = None
+        self._steps: dict[str, WarmupStepStatus] = {}
+
+    def start(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Start the warm-up task.
+
+        Args:
+            session_maker: Session factory used to load the default character
+        """
+        self._steps = dict.fromkeys(("imports", "graph", "browser", "genai"), "pending")
+        self._task = asyncio.create_task(self._run(session_maker), name="warmup")
+
+    async def stop(self) -> None:
+        """Cancel the warm-up if it is still running"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the warm-up has finished (always True when it is not used)"""
+        return self._task is None or self._task.done()
+
+    def status(self) -> dict[str, Any]:
+        """
+        Build the readiness report.
+
+        Returns:
+            Overall status (``ready`` / ``warming``) and the status of each step
+        """
+        return {
+            "status": "ready" if self.ready else "warming",
+            "steps": dict(self._steps),
+        }
+
+    async def _run(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        started = time.perf_counter()
+
+        async def imports_then_clients() -> None:
+            # Importing on the event loop would block it, so the steps that
+            # need the imported modules wait for the import step
+            if not await self._step("imports", self._import_modules):
+                self._steps["graph"] = self._steps["genai"] = "skipped"
+                return
+            await asyncio.gather(
+                self._step("graph", lambda: self._build_graph(session_maker)),
+                self._step("genai", self._open_genai_client),
+            )
+
+        await asyncio.gather(
+            imports_then_clients(),
+            self._step("browser", self._launch_browsers),
+        )
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - started)
+
+    async def _step(self, name: str, action: Callable[[], Awaitable[None]]) -> bool:
+        self._steps[name] = "running"
+        started = time.perf_counter()
+        try:
+            await action()
+        except Exception:
+            # Any failure is retried lazily by the first generation, so the
+            # warm-up only records it
+            self._steps[name] = "failed"
+            logger.exception("Warm-up step %s failed", name)
+            return False
+        self._steps[name] = "ok"
+        logger.info(
+            "Warm-up step %s finished in %.2fs", name, time.perf_counter() - started
+        )
+        return True
+
+    async def _import_modules(self) -> None:
+        # Imports hold the GIL for long stretches, but a thread keeps the
+        # event loop responsive in between
+        for module in WARMUP_MODULES:
+            await asyncio.to_thread(importlib.import_module, module)
+
+    async def _build_graph(
+        self, session_maker: async_sessionmaker[AsyncSession]
+    ) -> None:
+        # Resolve the default character (preselected in the UI) the way
+        # generations do, so the compiled graph lands under the same cache key
+        async with (
+            session_maker() as session,
+            DatabaseSession(session) as db_session,
+        ):
+            default = await db_session.characters.get_default()
+            character = (
+                await generator_service.get_character_for_generation(
+                    default.name, db_session
+                )
+                if default
+                else KurageChan()
+            )
+        await asyncio.to_thread(generator_service.get_graph, character)
+
+    async def _launch_browsers(self) -> None:
+        from manganize_core.browser_pool import browser_pool
+
+        await asyncio.to_thread(browser_pool.start)
+
+    async def _open_genai_client(self) -> None:
+        from manganize_core.genai_client import get_async_genai_client
+        from manganize_core.tools import IMAGE_GENERATION_MODEL
+
+        # The async client belongs to this event loop; a metadata request opens
+        # a keep-alive connection in its pool
+        client = get_async_genai_client()
+        await client.models.get(model=IMAGE_GENERATION_MODEL)
+
+
+# Global instance
+warmup_service = WarmupService()
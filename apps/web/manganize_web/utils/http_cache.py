@@ -0,0 +1,140 @@
+"""Conditional request (ETag), byte range and Accept helpers for HTTP responses"""
+
+# (start, end) byte offsets, both inclusive as in the Content-Range header
+ByteRange = tuple[int, int]
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Raised when a Range header does not overlap the resource"""
+
+
+def make_etag(content_hash: str) -> str:
+    """
+    Build a strong ETag from a content hash.
+
+    Args:
+        content_hash: Hash identifying the exact bytes of the representation
+
+    Returns:
+        Quoted ETag value
+    """
+    return f'"{content_hash}"'
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """
+    Check whether an If-None-Match header matches an ETag.
+
+    Uses weak comparison as required for If-None-Match.
+
+    Args:
+        header: Value of the If-None-Match request header
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client's cached copy is current (respond with 304)
+    """
+    if not header:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def if_range(header: str | None, etag: str) -> bool:
+    """
+    Check whether a Range request may be honored given its If-Range header.
+
+    Only strong ETag validators are supported; an If-Range date never matches
+    because these responses carry no Last-Modified.
+
+    Args:
+        header: Value of the If-Range request header
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the range should be served, False to send the full body
+    """
+    if not header:
+        return True
+    return not etag.startswith("W/") and header.strip() == etag
+
+
+def parse_range(header: str | None, size: int) -> ByteRange | None:
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+
+    Multiple ranges and unknown units are ignored (the full body is sent),
+    which RFC 9110 allows.
+
+    Args:
+        header: Value of the Range request header
+        size: Size of the resource in bytes
+
+    Returns:
+        Inclusive (start, end) byte range, or None to send the full body
+
+    Raises:
+        RangeNotSatisfiableError: If the range lies outside the resource
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last):
+        return None
+    if any(part and not part.isdigit() for part in (first, last)):
+        return None
+
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiableError(header)
+        start, end = max(size - suffix, 0), size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiableError(header)
+    return start, min(end, size - 1)
+
+
+def parse_accept(header: str | None) -> dict[str, float]:
+    """
+    Parse an Accept header into the quality value of each media range.
+
+    Media ranges without a valid ``q`` parameter get 1.0; ``q=0`` marks a
+    type as not acceptable. If a range is listed twice, the highest value
+    wins.
+
+    Args:
+        header: Value of the Accept request header
+
+    Returns:
+        Quality value keyed by lowercase media range (e.g. 'image/avif')
+    """
+    qualities: dict[str, float] = {}
+    for item in (header or "").lower().split(","):
+        media_range, *params = (part.strip() for part in item.split(";"))
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    pass
+        qualities[media_range] = max(quality, qualities.get(media_range, 0.0))
+    return qualities
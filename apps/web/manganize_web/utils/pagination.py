@@ -0,0 +1,50 @@
+"""Opaque cursor helpers for keyset pagination"""
+
+import base64
+from datetime import datetime
+
+# (created_at, id) of the last item on the previous page
+HistoryCursor = tuple[datetime, str]
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    """
+    Encode a keyset position into an opaque, URL-safe cursor.
+
+    Args:
+        created_at: Creation timestamp of the last item returned
+        item_id: ID of the last item returned
+
+    Returns:
+        URL-safe cursor string
+
+    Examples:
+        >>> from datetime import datetime
+        >>> cursor = encode_cursor(datetime(2025, 12, 28, 14, 30, 15), "abc")
+        >>> decode_cursor(cursor)
+        (datetime.datetime(2025, 12, 28, 14, 30, 15), 'abc')
+    """
+    raw = f"{created_at.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> HistoryCursor:
+    """
+    Decode a cursor created by ``encode_cursor``.
+
+    Args:
+        cursor: Cursor string
+
+    Returns:
+        Tuple of (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), item_id
+    except (UnicodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
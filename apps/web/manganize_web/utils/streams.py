@@ -0,0 +1,38 @@
+"""Async stream utilities"""
+
+import asyncio
+import contextvars
+from collections.abc import AsyncGenerator, AsyncIterator
+
+
+async def iterate_in_context[T](stream: AsyncGenerator[T]) -> AsyncIterator[T]:
+    """
+    Run every step of an async generator in one dedicated context.
+
+    Streaming responses may advance their body iterator from different
+    tasks, each with its own copy of the context. A generator that sets a
+    context variable (the instrumentation trace key, the current tracing
+    span) and resets it in a later step would then raise ``ValueError`` or
+    leak the value into the caller. Driving each step in the same private
+    context keeps the set and the reset together and the caller untouched.
+
+    Args:
+        stream: Async generator to iterate
+
+    Returns:
+        Async iterator over the items of the stream
+    """
+    step_context = contextvars.copy_context()
+
+    async def step() -> T:
+        return await anext(stream)
+
+    try:
+        while True:
+            try:
+                item = await asyncio.create_task(step(), context=step_context)
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await asyncio.create_task(stream.aclose(), context=step_context)
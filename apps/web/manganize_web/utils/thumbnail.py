@@ -0,0 +1,72 @@
+"""Thumbnail rendering utilities
+
+These functions run in worker processes, so this module only depends on
+Pillow to keep worker start-up cheap.
+"""
+
+import io
+from typing import Any
+
+from PIL import Image, features
+
+# Media type for each supported thumbnail format
+THUMBNAIL_MEDIA_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "png": "image/png",
+}
+
+# Encoder options per format
+_SAVE_OPTIONS: dict[str, dict[str, Any]] = {
+    "avif": {"format": "AVIF", "quality": 60, "speed": 6},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "png": {"format": "PNG", "optimize": True},
+}
+
+
+def is_format_supported(fmt: str) -> bool:
+    """
+    Check whether Pillow can encode a thumbnail format.
+
+    Args:
+        fmt: Format name ('avif', 'webp' or 'png')
+
+    Returns:
+        True if the format can be encoded
+    """
+    if fmt == "png":
+        return True
+    return fmt in THUMBNAIL_MEDIA_TYPES and bool(features.check(fmt))
+
+
+def render_thumbnails(
+    image_data: bytes,
+    sizes: list[int],
+    formats: list[str],
+) -> dict[tuple[int, str], bytes]:
+    """
+    Render every thumbnail variant of an image.
+
+    The source image is decoded once; each size is scaled down from the
+    next larger thumbnail to avoid resampling the full image repeatedly.
+
+    Args:
+        image_data: Source image bytes
+        sizes: Bounding box sizes in pixels (aspect ratio is kept)
+        formats: Formats to encode each size in
+
+    Returns:
+        Encoded thumbnails keyed by (size, format)
+    """
+    thumbnails: dict[tuple[int, str], bytes] = {}
+    with Image.open(io.BytesIO(image_data)) as source:
+        image = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+
+    for size in sorted(set(sizes), reverse=True):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            buffer = io.BytesIO()
+            image.save(buffer, **_SAVE_OPTIONS[fmt])
+            thumbnails[(size, fmt)] = buffer.getvalue()
+
+    return thumbnails
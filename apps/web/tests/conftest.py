@@ -0,0 +1,31 @@
+"""Shared fixtures for the web app tests"""
+
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from manganize_web.models import character, generation, upload_source  # noqa: F401
+from manganize_web.models.database import Base, create_session_maker
+from manganize_web.repositories.database_session import DatabaseSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+@pytest.fixture
+async def session_maker(
+    tmp_path: Path,
+) -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    """Session factory bound to a fresh SQLite database with the full schema"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield create_session_maker(engine)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db_session(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> AsyncIterator[DatabaseSession]:
+    """Database session with repositories"""
+    async with session_maker() as session, DatabaseSession(session) as db_session:
+        yield db_session
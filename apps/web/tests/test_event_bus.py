@@ -0,0 +1,52 @@
+from manganize_web.models.generation import GenerationStatusEnum
+from manganize_web.schemas.generation import GenerationStatus
+from manganize_web.services.event_bus import InMemoryEventBusBackend
+
+
+def _status(status: GenerationStatusEnum, message: str) -> GenerationStatus:
+    return GenerationStatus(id="g", status=status, message=message, progress=0)
+
+
+async def _drain(
+    backend: InMemoryEventBusBackend, last_event_id: int | None
+) -> list[str]:
+    return [status.message async for _, status in backend.subscribe("g", last_event_id)]
+
+
+async def test_subscribers_replay_events_after_last_event_id() -> None:
+    backend = InMemoryEventBusBackend(buffer_size=8, max_closed_channels=8)
+    backend.open("g")
+    first = backend.publish("g", _status(GenerationStatusEnum.RESEARCHING, "a"))
+    backend.publish("g", _status(GenerationStatusEnum.COMPLETED, "b"))
+    backend.close("g")
+
+    assert await _drain(backend, None) == ["a", "b"]
+    assert await _drain(backend, first) == ["b"]
+
+
+async def test_event_ids_keep_increasing_when_a_channel_is_reopened() -> None:
+    backend = InMemoryEventBusBackend(buffer_size=8, max_closed_channels=8)
+    backend.open("g")
+    backend.publish("g", _status(GenerationStatusEnum.RESEARCHING, "first run"))
+    stale = backend.publish("g", _status(GenerationStatusEnum.ERROR, "failed"))
+    backend.close("g")
+
+    # A resumed generation reopens its channel; a client still holding the
+    # last ID of the first run must see the new events
+    backend.open("g")
+    resumed = backend.publish("g", _status(GenerationStatusEnum.WRITING, "resumed"))
+    backend.close("g")
+
+    assert resumed > stale
+    assert await _drain(backend, stale) == ["resumed"]
+
+
+async def test_event_ids_keep_increasing_after_a_channel_is_evicted() -> None:
+    backend = InMemoryEventBusBackend(buffer_size=8, max_closed_channels=0)
+    backend.open("g")
+    stale = backend.publish("g", _status(GenerationStatusEnum.ERROR, "failed"))
+    backend.close("g")
+    assert not backend.exists("g")
+
+    backend.open("g")
+    assert backend.publish("g", _status(GenerationStatusEnum.WRITING, "x")) > stale
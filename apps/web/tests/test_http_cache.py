@@ -0,0 +1,63 @@
+import pytest
+from manganize_web.utils.http_cache import (
+    RangeNotSatisfiableError,
+    if_none_match,
+    parse_accept,
+    parse_range,
+)
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=900-5000", (900, 999)),
+        (" Bytes = 10-20", (10, 20)),
+    ],
+)
+def test_parse_range_returns_inclusive_bounds(
+    header: str, expected: tuple[int, int]
+) -> None:
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [None, "", "items=0-9", "bytes=0-9,20-29", "bytes=-", "bytes=a-9", "bytes=9-0"],
+)
+def test_parse_range_ignores_unsupported_headers(header: str | None) -> None:
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=-0"])
+def test_parse_range_rejects_unsatisfiable_ranges(header: str) -> None:
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, 1000)
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc"', True),
+        ("*", True),
+        ('"abcd"', False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_if_none_match_uses_weak_comparison(header: str | None, expected: bool) -> None:
+    assert if_none_match(header, '"abc"') is expected
+
+
+def test_parse_accept_reads_quality_values() -> None:
+    assert parse_accept("image/avif;q=0, image/webp; q=0.5,image/*,*/*;q=x") == {
+        "image/avif": 0.0,
+        "image/webp": 0.5,
+        "image/*": 1.0,
+        "*/*": 1.0,
+    }
@@ -0,0 +1,207 @@
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from manganize_web.models.generation import GenerationHistory, GenerationStatusEnum
+from manganize_web.repositories.database_session import DatabaseSession
+from manganize_web.schemas.generation import GenerationStatus
+from manganize_web.services.event_bus import event_bus
+from manganize_web.services.generator import generator_service
+from manganize_web.services.job_runner import GenerationJobRunner, JobQueueFullError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+GENERATION_ID = "6f1c1f0e-8d39-4a34-9a6c-1c0a5b9b3c11"
+
+# Stand-in for the generation pipeline: (generation ID, session) -> statuses
+Pipeline = Callable[[str, DatabaseSession], AsyncGenerator[GenerationStatus]]
+
+
+async def _add_generation(
+    db_session: DatabaseSession,
+    status: GenerationStatusEnum = GenerationStatusEnum.PENDING,
+    lease_expires_at: datetime | None = None,
+) -> None:
+    await db_session.generations.create(
+        GenerationHistory(
+            id=GENERATION_ID,
+            character_name="kurage",
+            input_topic="topic",
+            generated_title="",
+            status=status,
+            lease_expires_at=lease_expires_at,
+        )
+    )
+    await db_session.commit()
+
+
+async def _is_claimable(session_maker: async_sessionmaker[AsyncSession]) -> bool:
+    async with session_maker() as session, DatabaseSession(session) as db_session:
+        return await db_session.generations.is_claimable(GENERATION_ID)
+
+
+@pytest.fixture
+def pipeline(monkeypatch: pytest.MonkeyPatch) -> Callable[[Pipeline], list[str]]:
+    """Replace the generation pipeline run after the claim; returns run IDs"""
+
+    def install(fake: Pipeline) -> list[str]:
+        runs: list[str] = []
+
+        async def generate_for_request(
+            generation_id: str, db_session: DatabaseSession
+        ) -> AsyncGenerator[GenerationStatus]:
+            runs.append(generation_id)
+            async for status in fake(generation_id, db_session):
+                yield status
+
+        monkeypatch.setattr(
+            generator_service, "generate_for_request", generate_for_request
+        )
+        return runs
+
+    return install
+
+
+async def _complete(
+    generation_id: str, db_session: DatabaseSession
+) -> AsyncGenerator[GenerationStatus]:
+    await db_session.generations.update_error(generation_id, "done")
+    await db_session.commit()
+    yield GenerationStatus(
+        id=generation_id,
+        status=GenerationStatusEnum.ERROR,
+        message="done",
+        progress=100,
+    )
+
+
+async def _hang(
+    generation_id: str, db_session: DatabaseSession
+) -> AsyncGenerator[GenerationStatus]:
+    yield GenerationStatus(
+        id=generation_id,
+        status=GenerationStatusEnum.RESEARCHING,
+        message="running",
+        progress=10,
+    )
+    await asyncio.Event().wait()
+
+
+async def _wait_until(condition: Callable[[], bool]) -> None:
+    async with asyncio.timeout(5):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_claim_is_exclusive_while_the_lease_is_held(
+    db_session: DatabaseSession,
+) -> None:
+    await _add_generation(db_session)
+    generations = db_session.generations
+
+    assert await generations.claim(GENERATION_ID, lease_seconds=60)
+    assert not await generations.claim(GENERATION_ID, lease_seconds=60)
+    assert not await generations.is_claimable(GENERATION_ID)
+
+    await generations.expire_leases([GENERATION_ID])
+    assert await generations.is_claimable(GENERATION_ID)
+    assert await generations.claim(GENERATION_ID, lease_seconds=60)
+
+
+async def test_rows_left_in_flight_without_a_lease_are_claimable(
+    db_session: DatabaseSession,
+) -> None:
+    # Rows from before leases existed, or whose worker died long ago
+    await _add_generation(db_session, GenerationStatusEnum.WRITING)
+
+    assert await db_session.generations.is_claimable(GENERATION_ID)
+
+
+async def test_rows_with_an_expired_lease_are_claimable(
+    db_session: DatabaseSession,
+) -> None:
+    expired = datetime.now(UTC) - timedelta(seconds=1)
+    await _add_generation(db_session, GenerationStatusEnum.GENERATING, expired)
+
+    assert await db_session.generations.is_claimable(GENERATION_ID)
+
+
+async def test_finished_rows_are_never_claimable(db_session: DatabaseSession) -> None:
+    await _add_generation(db_session)
+    await db_session.generations.update_error(GENERATION_ID, "failed")
+    await db_session.commit()
+
+    assert not await db_session.generations.is_claimable(GENERATION_ID)
+    assert not await db_session.generations.claim(GENERATION_ID, lease_seconds=60)
+
+
+async def test_runner_executes_a_generation_once(
+    session_maker: async_sessionmaker[AsyncSession],
+    db_session: DatabaseSession,
+    pipeline: Callable[[Pipeline], list[str]],
+) -> None:
+    await _add_generation(db_session)
+    runs = pipeline(_complete)
+    runner = GenerationJobRunner(max_workers=1, queue_size=4)
+    runner.start(session_maker)
+    try:
+        runner.submit(GENERATION_ID)
+        runner.submit(GENERATION_ID)
+        await _wait_until(lambda: not runner.is_active(GENERATION_ID))
+        # A late resubmit finds the row finished and does not run it again
+        runner.submit(GENERATION_ID)
+        await _wait_until(lambda: not runner.is_active(GENERATION_ID))
+    finally:
+        await runner.stop()
+
+    assert runs == [GENERATION_ID]
+    latest = event_bus.latest(GENERATION_ID)
+    assert latest is not None
+    assert latest[1].status == GenerationStatusEnum.ERROR
+
+
+async def test_stopped_generation_is_resumed_by_the_next_runner(
+    session_maker: async_sessionmaker[AsyncSession],
+    db_session: DatabaseSession,
+    pipeline: Callable[[Pipeline], list[str]],
+) -> None:
+    await _add_generation(db_session)
+    runs = pipeline(_hang)
+    runner = GenerationJobRunner(max_workers=1, queue_size=4)
+    runner.start(session_maker)
+    runner.submit(GENERATION_ID)
+    await _wait_until(lambda: len(runs) == 1)
+
+    # Held by a live worker: not resumable
+    assert not await _is_claimable(session_maker)
+
+    # Shutting down releases the lease instead of leaving the row stuck
+    await runner.stop()
+    assert await _is_claimable(session_maker)
+
+    runs = pipeline(_complete)
+    resumed = GenerationJobRunner(max_workers=1, queue_size=4)
+    resumed.start(session_maker)
+    try:
+        resumed.submit(GENERATION_ID)
+        await _wait_until(lambda: not resumed.is_active(GENERATION_ID))
+    finally:
+        await resumed.stop()
+
+    assert runs == [GENERATION_ID]
+    assert not await _is_claimable(session_maker)
+
+
+def test_reserved_slots_count_against_the_queue() -> None:
+    runner = GenerationJobRunner(max_workers=1, queue_size=1)
+
+    with runner.reserve():
+        with pytest.raises(JobQueueFullError):
+            runner.submit("other")
+        with pytest.raises(JobQueueFullError), runner.reserve():
+            pass
+        runner.submit(GENERATION_ID, reserved=True)
+
+    assert runner.is_active(GENERATION_ID)
+    with pytest.raises(JobQueueFullError), runner.reserve():
+        pass
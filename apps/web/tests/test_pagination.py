@@ -0,0 +1,75 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from manganize_web.models.generation import GenerationHistory, GenerationStatusEnum
+from manganize_web.repositories.database_session import DatabaseSession
+from manganize_web.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips() -> None:
+    created_at = datetime(2025, 12, 28, 14, 30, 15, 123456, tzinfo=UTC)
+
+    assert decode_cursor(encode_cursor(created_at, "a|b")) == (created_at, "a|b")
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm8tc2VwYXJhdG9y", "eHw="])
+def test_decode_cursor_rejects_malformed_cursors(cursor: str) -> None:
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+async def _add_generations(db_session: DatabaseSession) -> list[GenerationHistory]:
+    # Two rows share a timestamp so the ID has to break the tie
+    base = datetime(2026, 1, 1)
+    generations = [
+        GenerationHistory(
+            id=f"00000000-0000-0000-0000-00000000000{index}",
+            character_name="kurage",
+            input_topic=f"topic {index}",
+            generated_title=f"title {index}",
+            status=(
+                GenerationStatusEnum.ERROR
+                if index == 3
+                else GenerationStatusEnum.COMPLETED
+            ),
+            created_at=base + timedelta(minutes=min(index, 4)),
+        )
+        for index in range(6)
+    ]
+    for generation in generations:
+        await db_session.generations.create(generation)
+    await db_session.commit()
+    # Newest first, ties by descending ID
+    return sorted(generations, key=lambda g: (g.created_at, g.id), reverse=True)
+
+
+async def test_list_history_after_walks_every_row_once(
+    db_session: DatabaseSession,
+) -> None:
+    expected = await _add_generations(db_session)
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        page, has_more = await db_session.generations.list_history_after(
+            cursor, limit=2
+        )
+        seen.extend(generation.id for generation in page)
+        if not has_more:
+            break
+        cursor = decode_cursor(encode_cursor(page[-1].created_at, page[-1].id))
+
+    assert seen == [generation.id for generation in expected]
+
+
+async def test_list_history_after_applies_the_status_filter(
+    db_session: DatabaseSession,
+) -> None:
+    await _add_generations(db_session)
+
+    page, has_more = await db_session.generations.list_history_after(
+        None, limit=10, status_filter=GenerationStatusEnum.ERROR
+    )
+
+    assert [generation.input_topic for generation in page] == ["topic 3"]
+    assert not has_more
@@ -0,0 +1,27 @@
+import pytest
+from manganize_web.services.thumbnail import ThumbnailService
+from manganize_web.utils.thumbnail import is_format_supported
+
+pytestmark = pytest.mark.skipif(
+    not (is_format_supported("avif") and is_format_supported("webp")),
+    reason="Pillow cannot encode AVIF and WebP",
+)
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("image/avif,image/webp,image/apng,image/*,*/*;q=0.8", "avif"),
+        ("image/avif;q=0,image/webp", "webp"),
+        ("image/avif;q=0.5,image/webp;q=0.9", "webp"),
+        ("image/avif;q=0,image/webp;q=0", "png"),
+        ("image/*,*/*", "png"),
+        (None, "png"),
+    ],
+)
+def test_negotiate_format_honors_quality_values(
+    accept: str | None, expected: str
+) -> None:
+    service = ThumbnailService(formats=["avif", "webp"])
+
+    assert service.negotiate_format(accept) == expected
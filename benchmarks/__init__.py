@@ -0,0 +1,8 @@
+"""オフラインのベンチマーク
+
+外部サービス（Gemini、Web 検索、Web ページ、S3）の代わりにローカルの
+スタンドインを使い、ManganizeAgent と Web アプリをエンドツーエンドで実行して
+スループット、ステージごとのレイテンシ、ピーク RSS を計測します。
+
+使い方は `uv run python -m benchmarks --help` を参照してください。
+"""
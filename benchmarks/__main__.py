@@ -0,0 +1,355 @@
+"""ベンチマークの CLI
+
+使い方:
+    uv run python -m benchmarks agent --requests 20 --concurrency 4
+    uv run python -m benchmarks web --requests 20 --concurrency 4 --upload
+    uv run python -m benchmarks load --generations 5000 --baseline baseline.json
+    uv run python -m benchmarks imports
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from benchmarks.environment import BenchmarkOptions, offline_environment
+
+
+def _image_size(value: str) -> tuple[int, int]:
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"画像サイズは WIDTHxHEIGHT の形式で指定してください: {value}"
+        ) from None
+    return width, height
+
+
+def _backend_options() -> argparse.ArgumentParser:
+    # すべてのシナリオに共通の、スタンドインの外部サービスの設定
+    defaults = BenchmarkOptions()
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_argument_group("スタンドインの外部サービス")
+    group.add_argument(
+        "--concurrency",
+        type=int,
+        default=defaults.concurrency,
+        help="同時に実行する生成の数（load では仮想ユーザーの数）",
+    )
+    group.add_argument(
+        "--variants",
+        type=int,
+        default=defaults.variants,
+        help="1 回の生成で作るバリエーションの数",
+    )
+    group.add_argument(
+        "--llm-latency",
+        type=float,
+        default=defaults.llm_latency,
+        help="チャットモデル 1 回の呼び出しにかかる秒数",
+    )
+    group.add_argument(
+        "--search-latency",
+        type=float,
+        default=defaults.search_latency,
+        help="Web 検索 1 回にかかる秒数",
+    )
+    group.add_argument(
+        "--image-latency",
+        type=float,
+        default=defaults.image_latency,
+        help="画像生成 1 回にかかる秒数",
+    )
+    group.add_argument(
+        "--image-size",
+        type=_image_size,
+        default=defaults.image_size,
+        metavar="WIDTHxHEIGHT",
+        help="生成する画像のサイズ（デフォルト: 1024x1024）",
+    )
+    group.add_argument(
+        "--page-latency",
+        type=float,
+        default=defaults.page_latency,
+        help="Web ページ 1 件の取得にかかる秒数",
+    )
+    group.add_argument(
+        "--pages",
+        type=int,
+        default=defaults.pages,
+        help="リサーチャーが取得する Web ページの数",
+    )
+    group.add_argument(
+        "--page-bytes",
+        type=int,
+        default=defaults.page_bytes,
+        help="Web ページの本文のサイズ（バイト）",
+    )
+    group.add_argument(
+        "--caches",
+        action="store_true",
+        help="ページキャッシュとリサーチキャッシュを有効にする（一時ディレクトリ）",
+    )
+    group.add_argument(
+        "--json",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="結果を JSON で保存するファイル",
+    )
+    return parser
+
+
+def _app_options() -> argparse.ArgumentParser:
+    # Web アプリを起動するシナリオ（web / load）に共通の設定
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_argument_group("Web アプリ")
+    group.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="アプリの生成ジョブの同時実行数（デフォルト: --concurrency）",
+    )
+    group.add_argument(
+        "--no-model-limits",
+        dest="model_limits",
+        action="store_false",
+        help="モデルごとの呼び出し制限（GEMINI_MODEL_LIMITS）を無効にする",
+    )
+    return parser
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析する"""
+    from benchmarks.load import SCENARIOS, LoadTestOptions
+
+    defaults = BenchmarkOptions()
+    load_defaults = LoadTestOptions(scenarios=list(SCENARIOS))
+    backend, app = _backend_options(), _app_options()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="外部サービスをスタンドインに置き換えて生成パイプラインを計測します",
+    )
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    for name, help_text, parents in (
+        ("agent", "ManganizeAgent を直接実行する", [backend]),
+        ("web", "Web アプリを HTTP で実行する", [backend, app]),
+    ):
+        subparser = subparsers.add_parser(name, parents=parents, help=help_text)
+        subparser.add_argument(
+            "--requests", type=int, default=defaults.requests, help="生成の数"
+        )
+    subparsers.choices["web"].add_argument(
+        "--upload",
+        action="store_true",
+        help="生成ごとにドキュメントをアップロードして添付する",
+    )
+
+    load = subparsers.add_parser(
+        "load",
+        parents=[backend, app],
+        help="合成データを登録した Web アプリの主要なエンドポイントに負荷をかける",
+    )
+    load.add_argument(
+        "--scenarios",
+        type=lambda value: [name.strip() for name in value.split(",") if name],
+        default=load_defaults.scenarios,
+        metavar="NAME[,NAME...]",
+        help=f"実行するシナリオ（{', '.join(SCENARIOS)}）",
+    )
+    load.add_argument(
+        "--duration",
+        type=float,
+        default=load_defaults.duration,
+        help="シナリオごとの計測時間（秒）",
+    )
+    load.add_argument(
+        "--warmup",
+        type=float,
+        default=load_defaults.warmup,
+        help="計測前の準備運転の時間（秒）",
+    )
+    load.add_argument(
+        "--generations",
+        type=int,
+        default=load_defaults.generations,
+        help="登録する生成の数",
+    )
+    load.add_argument(
+        "--characters",
+        type=int,
+        default=load_defaults.characters,
+        help="登録するキャラクターの数",
+    )
+    load.add_argument(
+        "--seed-images",
+        type=int,
+        default=load_defaults.images,
+        help="生成に割り当てる画像の数",
+    )
+    load.add_argument(
+        "--seed-image-size",
+        type=_image_size,
+        default=load_defaults.image_size,
+        metavar="WIDTHxHEIGHT",
+        help="生成に割り当てる画像のサイズ（デフォルト: 512x512）",
+    )
+    load.add_argument(
+        "--cold-thumbnails",
+        action="store_true",
+        help="サムネイルを事前に作らない（初回アクセス時の生成を計測する）",
+    )
+    load.add_argument(
+        "--scroll-pages",
+        type=int,
+        default=load_defaults.scroll_pages,
+        help="履歴の無限スクロールで読み込むページ数",
+    )
+    load.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="比較するベースライン（load の --json で保存した結果）",
+    )
+    load.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="比較せずに、今回の結果を --baseline に保存する",
+    )
+    load.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="ベースラインから許容する悪化の割合（デフォルト: 0.2）",
+    )
+
+    imports = subparsers.add_parser(
+        "imports",
+        help="コアパッケージのインポート時間を計測し、予算と比較する",
+    )
+    imports.add_argument(
+        "--repeat", type=int, default=3, help="モジュールごとの計測の回数"
+    )
+    imports.add_argument(
+        "--budget-scale",
+        type=float,
+        default=1.0,
+        help="予算の時間に掛ける倍率（遅いマシンで実行する場合など）",
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> int:
+    """ベンチマークを実行して結果を出力する
+
+    Returns:
+        終了コード（ベースラインや予算より悪化した場合は 1）
+    """
+    if args.scenario == "imports":
+        return _run_imports(args)
+
+    options = BenchmarkOptions(
+        requests=getattr(args, "requests", BenchmarkOptions().requests),
+        concurrency=args.concurrency,
+        variants=args.variants,
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency,
+        image_latency=args.image_latency,
+        image_size=args.image_size,
+        page_latency=args.page_latency,
+        pages=args.pages,
+        page_bytes=args.page_bytes,
+        caches=args.caches,
+    )
+    if args.scenario == "load":
+        return await _run_load(args, options)
+
+    with offline_environment(options) as env:
+        if args.scenario == "agent":
+            from benchmarks.agent import run_agent_benchmark
+
+            report = await run_agent_benchmark(env)
+        else:
+            from benchmarks.web import run_web_benchmark
+
+            report = await run_web_benchmark(
+                env,
+                workers=args.workers or options.concurrency,
+                upload=args.upload,
+                model_limits=args.model_limits,
+            )
+
+    print(report.format_table())
+    if args.json is not None:
+        report.write_json(args.json)
+    return 0
+
+
+async def _run_load(args: argparse.Namespace, options: BenchmarkOptions) -> int:
+    from benchmarks.load import LoadTestOptions, LoadTestReport, run_load_test
+
+    load_options = LoadTestOptions(
+        scenarios=args.scenarios,
+        duration=args.duration,
+        warmup=args.warmup,
+        generations=args.generations,
+        characters=args.characters,
+        images=args.seed_images,
+        image_size=args.seed_image_size,
+        cold_thumbnails=args.cold_thumbnails,
+        scroll_pages=args.scroll_pages,
+    )
+    with offline_environment(options) as env:
+        report = await run_load_test(
+            env,
+            load_options,
+            workers=args.workers or options.concurrency,
+            model_limits=args.model_limits,
+        )
+
+    print(report.format_table())
+    if args.json is not None:
+        report.write_json(args.json)
+    if args.baseline is None:
+        return 0
+
+    if args.update_baseline or not args.baseline.exists():
+        report.write_json(args.baseline)
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+
+    baseline = LoadTestReport.model_validate_json(
+        args.baseline.read_text(encoding="utf-8")
+    )
+    regressions = report.compare(baseline, args.tolerance)
+    print(f"\ncompared with {args.baseline} (tolerance {args.tolerance:.0%})")
+    if not regressions:
+        print("no regressions")
+        return 0
+    for regression in regressions:
+        print(f"REGRESSION {regression.describe()}")
+    return 1
+
+
+def _run_imports(args: argparse.Namespace) -> int:
+    from benchmarks.imports import BUDGETS, check_budget, format_results
+
+    results = [
+        check_budget(budget, repeat=args.repeat, scale=args.budget_scale)
+        for budget in BUDGETS
+    ]
+    print(format_results(results))
+    return 0 if all(result.passed for result in results) else 1
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(run(parse_args())))
+
+
+if __name__ == "__main__":
+    main()
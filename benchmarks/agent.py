@@ -0,0 +1,103 @@
+"""ManganizeAgent のベンチマーク
+
+Web アプリを介さずに、非同期ノードで構築したグラフを直接実行します。
+"""
+
+import asyncio
+import logging
+import time
+
+from manganize_core.agents import (
+    DEFAULT_RESEARCHER_MODEL,
+    DEFAULT_SCENARIO_WRITER_MODEL,
+    ManganizeAgent,
+)
+from manganize_core.browser_pool import browser_pool
+from manganize_core.genai_client import genai_client_manager
+from manganize_core.instrumentation import instrumentation
+from manganize_core.page_cache import page_cache
+from manganize_core.research_cache import research_cache
+
+from benchmarks.environment import OfflineEnvironment
+from benchmarks.report import (
+    BenchmarkReport,
+    StageRecorder,
+    build_report,
+    current_rss_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _has_images(result: dict, variants: int) -> bool:
+    if variants > 1:
+        images = [v["generated_image"] for v in result.get("variants") or []]
+        return len(images) == variants and all(images)
+    return bool(result.get("generated_image"))
+
+
+async def run_agent_benchmark(env: OfflineEnvironment) -> BenchmarkReport:
+    """ManganizeAgent をスタンドインのモデルで実行して計測する
+
+    Args:
+        env: スタンドインの実行環境
+
+    Returns:
+        ベンチマークの結果
+    """
+    options = env.options
+    page_cache.configure(directory=env.root / "pages", enabled=options.caches)
+    research_cache.configure(directory=env.root / "research", enabled=options.caches)
+
+    graph = ManganizeAgent(
+        researcher_llm=env.chat_model(DEFAULT_RESEARCHER_MODEL),
+        scenario_writer_llm=env.chat_model(DEFAULT_SCENARIO_WRITER_MODEL),
+        use_async_nodes=True,
+    ).compile_graph(checkpointer=False)
+
+    recorder = StageRecorder()
+    semaphore = asyncio.Semaphore(options.concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def run_one(index: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await graph.ainvoke(
+                    {
+                        "topic": f"ベンチマーク {index}: クラゲの生態について",
+                        "variant_count": options.variants,
+                    }
+                )
+            except Exception:
+                # グラフはどの例外でも失敗しうるため、原因の追跡用にトレースバックを残す
+                logger.exception("Request %d failed", index)
+                failures += 1
+                return
+            if _has_images(result, options.variants):
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    rss_before = current_rss_bytes()
+    instrumentation.add_observer(recorder)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_one(index) for index in range(options.requests)))
+        wall_seconds = time.perf_counter() - started
+    finally:
+        instrumentation.remove_observer(recorder)
+        await asyncio.to_thread(browser_pool.close)
+        await genai_client_manager.aclose()
+
+    return build_report(
+        "agent",
+        options.model_dump(),
+        latencies,
+        failures,
+        wall_seconds,
+        recorder,
+        rss_before,
+    )
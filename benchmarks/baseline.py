@@ -0,0 +1,98 @@
+"""保存したベースラインとの比較"""
+
+from pydantic import BaseModel
+
+from benchmarks.report import LatencyStats
+
+# これより小さいレイテンシの差は誤差として扱う（秒）
+MIN_LATENCY_DELTA = 0.005
+# これより小さいエラー率の差は誤差として扱う
+MIN_ERROR_RATE_DELTA = 0.01
+
+
+class Regression(BaseModel):
+    """ベースラインより悪化した指標"""
+
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    def describe(self) -> str:
+        """人が読むための説明"""
+        if self.metric == "error_rate":
+            return f"{self.name}: error rate {self.baseline:.1%} -> {self.current:.1%}"
+        if self.metric == "throughput":
+            return (
+                f"{self.name}: throughput {self.baseline:.1f} -> "
+                f"{self.current:.1f} req/s"
+            )
+        return (
+            f"{self.name}: {self.metric} {self.baseline * 1000:.1f} -> "
+            f"{self.current * 1000:.1f} ms "
+            f"({(self.current / self.baseline - 1) if self.baseline else 0:+.0%})"
+        )
+
+
+def error_rate(stats: LatencyStats) -> float:
+    """失敗したリクエストの割合"""
+    return stats.errors / stats.count if stats.count else 0.0
+
+
+def compare_latency(
+    name: str,
+    baseline: LatencyStats,
+    current: LatencyStats,
+    tolerance: float,
+) -> list[Regression]:
+    """レイテンシの分布とエラー率をベースラインと比較する
+
+    p50 / p95 / p99 がベースラインの (1 + tolerance) 倍を超えた場合、
+    またはエラー率が増えた場合を悪化とみなします。
+
+    Args:
+        name: 比較する対象の名前
+        baseline: ベースラインの統計
+        current: 今回の統計
+        tolerance: 許容する悪化の割合（0.2 なら 20%）
+
+    Returns:
+        悪化した指標
+    """
+    regressions = []
+    for metric in ("p50", "p95", "p99"):
+        before, after = getattr(baseline, metric), getattr(current, metric)
+        if after > before * (1 + tolerance) and after - before > MIN_LATENCY_DELTA:
+            regressions.append(
+                Regression(name=name, metric=metric, baseline=before, current=after)
+            )
+
+    before, after = error_rate(baseline), error_rate(current)
+    if after - before > MIN_ERROR_RATE_DELTA:
+        regressions.append(
+            Regression(name=name, metric="error_rate", baseline=before, current=after)
+        )
+    return regressions
+
+
+def compare_throughput(
+    name: str, baseline: float, current: float, tolerance: float
+) -> list[Regression]:
+    """スループットをベースラインと比較する
+
+    Args:
+        name: 比較する対象の名前
+        baseline: ベースラインのスループット（req/s）
+        current: 今回のスループット（req/s）
+        tolerance: 許容する悪化の割合
+
+    Returns:
+        悪化した指標
+    """
+    if current < baseline * (1 - tolerance):
+        return [
+            Regression(
+                name=name, metric="throughput", baseline=baseline, current=current
+            )
+        ]
+    return []
@@ -0,0 +1,113 @@
+"""ベンチマークの設定と、外部サービスをスタンドインに置き換えた実行環境"""
+
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from benchmarks.fakes import ScriptedChatModel, fake_web_search
+from benchmarks.fixtures import FixtureServer
+
+
+class BenchmarkOptions(BaseModel):
+    """ベンチマークの設定"""
+
+    # 実行するリクエスト（生成）の数
+    requests: int = 20
+    # 同時に実行するリクエストの数
+    concurrency: int = 4
+    # 1 回の生成で作るバリエーションの数
+    variants: int = 1
+    # チャットモデル 1 回の呼び出しにかかる秒数
+    llm_latency: float = 0.2
+    # Web 検索 1 回にかかる秒数
+    search_latency: float = 0.05
+    # 画像生成 1 回にかかる秒数
+    image_latency: float = 1.0
+    # 生成する画像のサイズ（幅, 高さ）
+    image_size: tuple[int, int] = (1024, 1024)
+    # Web ページ 1 件の取得にかかる秒数
+    page_latency: float = 0.05
+    # リサーチャーが取得する Web ページの数
+    pages: int = 3
+    # Web ページの本文のサイズ（バイト）
+    page_bytes: int = 20_000
+    # ページキャッシュとリサーチキャッシュを有効にするかどうか
+    caches: bool = False
+
+
+class OfflineEnvironment:
+    """スタンドインの外部サービスと一時ディレクトリ"""
+
+    def __init__(self, options: BenchmarkOptions, fixtures: FixtureServer, root: Path):
+        self.options = options
+        self.fixtures = fixtures
+        self.root = root
+
+    def chat_model(self, model: str) -> ScriptedChatModel:
+        """モデル名に対応するスタンドインのチャットモデルを作る
+
+        `graph_cache.configure(chat_model_factory=...)` にも渡せます。
+
+        Args:
+            model: モデル名（呼び出し制限と計測のキーになる）
+
+        Returns:
+            チャットモデル
+        """
+        return ScriptedChatModel(
+            model=model,
+            latency=self.options.llm_latency,
+            page_urls=self.fixtures.page_urls,
+        )
+
+
+@contextmanager
+def offline_environment(options: BenchmarkOptions) -> Iterator[OfflineEnvironment]:
+    """外部サービスをスタンドインに置き換えた環境を用意する
+
+    フィクスチャサーバーを起動し、genai クライアントの向け先を環境変数で
+    フィクスチャサーバーに変え、Web 検索を固定の結果に置き換えます。
+
+    Args:
+        options: ベンチマークの設定
+
+    Yields:
+        実行環境
+    """
+    fixtures = FixtureServer(
+        image_latency=options.image_latency,
+        image_size=options.image_size,
+        page_latency=options.page_latency,
+        page_count=options.pages,
+        page_bytes=options.page_bytes,
+    )
+    environ = {
+        "GOOGLE_GEMINI_BASE_URL": fixtures.url,
+        "GOOGLE_API_KEY": "benchmark",
+        # ローカルの通信にプロキシを使わない
+        "NO_PROXY": ",".join(
+            filter(None, [os.environ.get("NO_PROXY"), "127.0.0.1", "localhost"])
+        ),
+        # aws-chunked の送信やチェックサムの検証を必要な場合に限る
+        "AWS_REQUEST_CHECKSUM_CALCULATION": "when_required",
+        "AWS_RESPONSE_CHECKSUM_VALIDATION": "when_required",
+    }
+    saved = {name: os.environ.get(name) for name in environ}
+    os.environ.update(environ)
+    try:
+        with (
+            tempfile.TemporaryDirectory(prefix="manganize-bench-") as root,
+            fixtures,
+            fake_web_search(fixtures.search_results(), options.search_latency),
+        ):
+            yield OfflineEnvironment(options, fixtures, Path(root))
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
@@ -0,0 +1,167 @@
+"""LLM と Web 検索のスタンドイン"""
+
+import asyncio
+import re
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+_URL_PATTERN = re.compile(r"https?://\S+")
+
+RESEARCHER_OUTPUT_TOOL = "ResearcherAgentOutput"
+SEARCH_TOOL = "duckduckgo_search"
+
+SCENARIO_TEMPLATE = """\
+# {title}
+
+## 1コマ目
+くらげちゃん「今日は {title} について解説するよ！」
+
+## 2コマ目
+くらげちゃん「ポイントは次の 3 つ」
+- 調べた資料: {sources} 件
+
+## 3コマ目
+くらげちゃん「まとめると、とても便利ってこと！」
+"""
+
+
+def _tool_name(tool: Any) -> str | None:
+    if isinstance(tool, dict):
+        return tool.get("name") or tool.get("function", {}).get("name")
+    return getattr(tool, "name", None) or getattr(tool, "__name__", None)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """決まった手順で応答するチャットモデル
+
+    `ManganizeAgent` の `researcher_llm` / `scenario_writer_llm` に渡して使います。
+    バインドされたツールに `ResearcherAgentOutput` が含まれる場合はリサーチャーとして、
+    Web 検索 → 資料ページとトピック中の URL の取得（並列のツール呼び出し）→
+    構造化出力の順にツールを呼び出し、それ以外の場合はシナリオを返します。
+    """
+
+    # 実際のモデル名（呼び出し制限や計測のキーとして使われる）
+    model: str = "scripted"
+    # 1 回の呼び出しにかかる秒数
+    latency: float = 0.0
+    # リサーチャーが retrieve_webpage で取得するページの URL
+    page_urls: list[str] = Field(default_factory=list)
+    # 出力する関連度
+    relevance: float = 0.9
+    # bind_tools でバインドされたツールの名前
+    tool_names: list[str] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        return self.model_copy(
+            update={"tool_names": [name for name in map(_tool_name, tools) if name]}
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        if RESEARCHER_OUTPUT_TOOL in self.tool_names:
+            message = self._research_step(messages)
+        else:
+            message = AIMessage(content=self._scenario(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _research_step(self, messages: list[BaseMessage]) -> AIMessage:
+        topic = next(
+            (m.text for m in messages if isinstance(m, HumanMessage)),
+            "",
+        )
+        turns = [
+            [(SEARCH_TOOL, {"query": topic.splitlines()[0][:100] if topic else ""})],
+            [("retrieve_webpage", {"url": url}) for url in self.page_urls]
+            + [
+                ("read_document_file", {"source": url})
+                for url in _URL_PATTERN.findall(topic)
+            ],
+        ]
+        # ツールを呼び出した回数で手順を進める
+        step = sum(1 for m in messages if isinstance(m, AIMessage) and m.tool_calls)
+        turns = [turn for turn in turns if turn]
+        if step < len(turns):
+            calls = turns[step]
+        else:
+            tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+            calls = [
+                (
+                    RESEARCHER_OUTPUT_TOOL,
+                    {
+                        "topic_title": topic.splitlines()[0][:40] if topic else "",
+                        "output": "\n\n".join(m.text[:2000] for m in tool_results),
+                        "relevance": self.relevance,
+                    },
+                )
+            ]
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": name, "args": args, "id": f"call_{step}_{index}"}
+                for index, (name, args) in enumerate(calls)
+            ],
+        )
+
+    @staticmethod
+    def _scenario(messages: list[BaseMessage]) -> str:
+        research = next(
+            (m.text for m in messages if isinstance(m, HumanMessage)),
+            "",
+        )
+        title = research.strip().splitlines()[0][:40] if research.strip() else ""
+        return SCENARIO_TEMPLATE.format(title=title, sources=research.count("\n\n") + 1)
+
+
+@contextmanager
+def fake_web_search(results: str, latency: float = 0.0) -> Iterator[None]:
+    """DuckDuckGo の検索を固定の結果に置き換える
+
+    Args:
+        results: 検索結果として返す文字列
+        latency: 1 回の検索にかかる秒数
+    """
+
+    def run(self: DuckDuckGoSearchAPIWrapper, query: str) -> str:
+        if latency > 0:
+            time.sleep(latency)
+        return results
+
+    original = DuckDuckGoSearchAPIWrapper.run
+    DuckDuckGoSearchAPIWrapper.run = run  # ty: ignore[invalid-assignment]
+    try:
+        yield
+    finally:
+        DuckDuckGoSearchAPIWrapper.run = original
@@ -0,0 +1,292 @@
+"""ローカルの HTTP フィクスチャサーバー
+
+1 つのサーバーで次のスタンドインを提供します。
+
+- Web ページ: `GET /pages/{n}.html`（retrieve_webpage の取得先）
+- Gemini API: `POST /v1beta/models/{model}:generateContent`
+  （`GOOGLE_GEMINI_BASE_URL` で向け先を変えた genai クライアントから呼ばれ、
+  指定したサイズのノイズ画像を指定した遅延の後に返す）
+- S3 互換ストレージ: パス形式の `PUT` / `GET`（Range 対応）/ `HEAD` / `DELETE`
+  （署名は検証せず、署名付き URL のクエリも無視する）
+"""
+
+import base64
+import io
+import json
+import re
+import threading
+import time
+from functools import cached_property
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Self
+from urllib.parse import unquote, urlsplit
+
+from PIL import Image
+
+_GENERATE_CONTENT_PATH = re.compile(
+    r"^/v1(?:beta|alpha)?/models/([^/:]+):generateContent$"
+)
+_PAGE_PATH = re.compile(r"^/pages/(\d+)\.html$")
+_RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_PARAGRAPH = (
+    "クラゲは刺胞動物門に属する動物の総称で、体の大部分が水でできています。"
+    "傘を開閉させて水中を漂うように泳ぎ、触手の刺胞で獲物を捕らえます。"
+    "種類によっては発光するものや、ほぼ不老とされるものも知られています。"
+)
+
+
+def render_page(index: int, size_bytes: int) -> bytes:
+    """フィクスチャの Web ページを作る
+
+    Args:
+        index: ページ番号
+        size_bytes: 本文のおおよそのサイズ（バイト）
+
+    Returns:
+        HTML
+    """
+    paragraph = f"<p>{_PARAGRAPH}</p>\n".encode()
+    count = max(size_bytes // len(paragraph), 1)
+    head = (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>フィクスチャページ {index}</title></head><body>"
+        f"<article><h1>フィクスチャページ {index}</h1>\n"
+    ).encode()
+    return head + paragraph * count + b"</article></body></html>"
+
+
+def render_image(width: int, height: int) -> bytes:
+    """圧縮の効きにくいノイズ画像（PNG）を作る
+
+    Args:
+        width: 幅（ピクセル）
+        height: 高さ（ピクセル）
+
+    Returns:
+        PNG 画像のバイト列
+    """
+    channels = [Image.effect_noise((width, height), 64) for _ in range(3)]
+    buffer = io.BytesIO()
+    Image.merge("RGB", channels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _decode_aws_chunked(body: bytes) -> bytes:
+    # `Content-Encoding: aws-chunked` の本文（チャンクごとの署名付き）を復元する
+    data = bytearray()
+    position = 0
+    while position < len(body):
+        line_end = body.index(b"\r\n", position)
+        size = int(body[position:line_end].split(b";", 1)[0], 16)
+        if size == 0:
+            break
+        start = line_end + 2
+        data += body[start : start + size]
+        position = start + size + 2
+    return bytes(data)
+
+
+class _StoredObject:
+    def __init__(self, data: bytes, content_type: str):
+        self.data = data
+        self.content_type = content_type
+        self.etag = f'"{len(data):x}-{hash(data) & 0xFFFFFFFF:08x}"'
+
+
+class FixtureServer:
+    """ベンチマーク用のフィクスチャサーバー（別スレッドで動作）
+
+    `with FixtureServer(...) as server:` で起動・停止します。
+    """
+
+    def __init__(
+        self,
+        *,
+        image_latency: float = 0.0,
+        image_size: tuple[int, int] = (1024, 1024),
+        page_latency: float = 0.0,
+        page_count: int = 3,
+        page_bytes: int = 20_000,
+        host: str = "127.0.0.1",
+    ):
+        self.image_latency = image_latency
+        self.image_size = image_size
+        self.page_latency = page_latency
+        self.page_count = page_count
+        self.page_bytes = page_bytes
+        self.objects: dict[str, _StoredObject] = {}
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="benchmark-fixtures", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """サーバーのベース URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def page_urls(self) -> list[str]:
+        """フィクスチャの Web ページの URL"""
+        return [f"{self.url}/pages/{index}.html" for index in range(self.page_count)]
+
+    @cached_property
+    def image_response(self) -> bytes:
+        """generateContent のレスポンス（画像は一度だけ作って使い回す）"""
+        image = render_image(*self.image_size)
+        return json.dumps(
+            {
+                "candidates": [
+                    {
+                        "content": {
+                            "role": "model",
+                            "parts": [
+                                {
+                                    "inlineData": {
+                                        "mimeType": "image/png",
+                                        "data": base64.b64encode(image).decode(),
+                                    }
+                                }
+                            ],
+                        },
+                        "finishReason": "STOP",
+                    }
+                ]
+            }
+        ).encode()
+
+    def search_results(self) -> str:
+        """Web 検索のスタンドインが返す結果"""
+        return "\n".join(
+            f"フィクスチャページ {index}: {_PARAGRAPH[:40]} ({url})"
+            for index, url in enumerate(self.page_urls)
+        )
+
+    def start(self) -> None:
+        """サーバーを起動する"""
+        # 最初のリクエストで画像の生成時間を計測しないよう、先に作っておく
+        _ = self.image_response
+        self._thread.start()
+
+    def stop(self) -> None:
+        """サーバーを停止する"""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def _make_handler(fixtures: FixtureServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+        def _path(self) -> str:
+            return unquote(urlsplit(self.path).path)
+
+        def _send(
+            self,
+            status: int,
+            body: bytes = b"",
+            content_type: str = "application/octet-stream",
+            headers: dict[str, str] | None = None,
+        ) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if "aws-chunked" in (self.headers.get("Content-Encoding") or ""):
+                body = _decode_aws_chunked(body)
+            return body
+
+        def _no_such_key(self) -> None:
+            self._send(
+                404,
+                b'<?xml version="1.0" encoding="UTF-8"?>'
+                b"<Error><Code>NoSuchKey</Code>"
+                b"<Message>The specified key does not exist.</Message></Error>",
+                "application/xml",
+            )
+
+        def do_GET(self) -> None:
+            path = self._path()
+            if match := _PAGE_PATH.match(path):
+                if fixtures.page_latency > 0:
+                    time.sleep(fixtures.page_latency)
+                self._send(
+                    200,
+                    render_page(int(match.group(1)), fixtures.page_bytes),
+                    "text/html; charset=utf-8",
+                )
+                return
+            self._get_object(path)
+
+        def do_HEAD(self) -> None:
+            self._get_object(self._path())
+
+        def _get_object(self, key: str) -> None:
+            with fixtures.lock:
+                stored = fixtures.objects.get(key)
+            if stored is None:
+                self._no_such_key()
+                return
+
+            headers = {"ETag": stored.etag, "Accept-Ranges": "bytes"}
+            data = stored.data
+            range_match = _RANGE_HEADER.match(self.headers.get("Range") or "")
+            if range_match and any(range_match.groups()):
+                first, last = range_match.groups()
+                if first:
+                    start = int(first)
+                    end = min(int(last), len(data) - 1) if last else len(data) - 1
+                else:
+                    start, end = max(len(data) - int(last), 0), len(data) - 1
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+                self._send(206, data[start : end + 1], stored.content_type, headers)
+                return
+            self._send(200, data, stored.content_type, headers)
+
+        def do_PUT(self) -> None:
+            stored = _StoredObject(
+                self._read_body(),
+                self.headers.get("Content-Type") or "application/octet-stream",
+            )
+            with fixtures.lock:
+                fixtures.objects[self._path()] = stored
+            self._send(200, headers={"ETag": stored.etag})
+
+        def do_DELETE(self) -> None:
+            with fixtures.lock:
+                fixtures.objects.pop(self._path(), None)
+            self._send(204)
+
+        def do_POST(self) -> None:
+            self._read_body()
+            if not _GENERATE_CONTENT_PATH.match(self._path()):
+                self._send(404, b'{"error": {"code": 404}}', "application/json")
+                return
+            if fixtures.image_latency > 0:
+                time.sleep(fixtures.image_latency)
+            self._send(200, fixtures.image_response, "application/json")
+
+    return Handler
@@ -0,0 +1,200 @@
+"""インポート時間の計測と予算のチェック
+
+`python -X importtime` で新しいプロセスにモジュールをインポートさせ、
+インタープリターの起動分を除いたインポート時間を計測します。
+モジュールごとに時間の予算と、初回の使用まで読み込まないはずの
+重い依存（インポートしてはいけないパッケージ）を決めておき、
+起動時間の悪化を検出します。
+"""
+
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from pydantic import BaseModel
+
+# 遅延インポートしている重い依存
+_LAZY_DEPENDENCIES = ["google.genai", "markitdown", "PIL", "playwright"]
+
+
+class ImportBudget(BaseModel):
+    """1 つのモジュールのインポートの予算"""
+
+    module: str
+    # インポート時間の上限（ミリ秒）
+    max_ms: float
+    # インポートしてはいけないパッケージ
+    forbidden: list[str] = []
+
+
+# 予算は一般的な開発マシンでの計測値に余裕を持たせた値
+BUDGETS = [
+    # ツールの定義に @tool デコレーターを使うため、langchain_core（と、それが
+    # langsmith 経由で読み込む requests と httpx）のインポートは予算に含めている
+    ImportBudget(
+        module="manganize_core.tools", max_ms=1500, forbidden=_LAZY_DEPENDENCIES
+    ),
+    ImportBudget(
+        module="manganize_core.agents", max_ms=1800, forbidden=_LAZY_DEPENDENCIES
+    ),
+    ImportBudget(
+        module="manganize_core.graph_cache", max_ms=1800, forbidden=_LAZY_DEPENDENCIES
+    ),
+    ImportBudget(
+        module="manganize_core.retry",
+        max_ms=600,
+        forbidden=[*_LAZY_DEPENDENCIES, "httpx"],
+    ),
+    ImportBudget(
+        module="manganize_core.genai_client",
+        max_ms=600,
+        forbidden=[*_LAZY_DEPENDENCIES, "httpx"],
+    ),
+    ImportBudget(
+        module="manganize_core.browser_pool",
+        max_ms=400,
+        forbidden=[*_LAZY_DEPENDENCIES, "httpx"],
+    ),
+]
+
+
+class ImportProfile(BaseModel):
+    """1 回のインポートの計測結果"""
+
+    # インタープリターの起動分を除いたインポート時間（秒）
+    seconds: float
+    # インポートされたモジュール
+    modules: list[str]
+    # トップレベルのパッケージごとのインポート時間（秒、自身の分のみ）
+    packages: dict[str, float]
+
+
+class ImportResult(BaseModel):
+    """1 つのモジュールの計測結果と予算との比較"""
+
+    module: str
+    # 計測ごとのインポート時間の中央値（秒）
+    seconds: float
+    budget_ms: float
+    # インポートされた、インポートしてはいけないパッケージ
+    forbidden_imports: list[str]
+    # インポート時間の大きいパッケージ（秒）
+    top_packages: dict[str, float]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.seconds * 1000 > self.budget_ms
+
+    @property
+    def passed(self) -> bool:
+        return not self.over_budget and not self.forbidden_imports
+
+
+def _parse_importtime(stderr: str) -> dict[str, int]:
+    # "import time: self [us] | cumulative | imported package" の行を読む
+    self_times: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_times[fields[2].strip()] = int(fields[0])
+    return self_times
+
+
+def _run_importtime(code: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed: {code}\n{result.stderr.strip()}")
+    return _parse_importtime(result.stderr)
+
+
+def profile_import(module: str) -> ImportProfile:
+    """新しいプロセスでモジュールをインポートして計測する
+
+    何もしないプロセスでも読み込まれるモジュール（site など）は除きます。
+
+    Args:
+        module: インポートするモジュール
+
+    Returns:
+        計測結果
+    """
+    startup = _run_importtime("pass")
+    self_times = {
+        name: micros
+        for name, micros in _run_importtime(f"import {module}").items()
+        if name not in startup
+    }
+    packages: Counter[str] = Counter()
+    for name, micros in self_times.items():
+        packages[name.split(".")[0]] += micros
+    return ImportProfile(
+        seconds=sum(self_times.values()) / 1_000_000,
+        modules=sorted(self_times),
+        packages={name: micros / 1_000_000 for name, micros in packages.items()},
+    )
+
+
+def check_budget(
+    budget: ImportBudget, repeat: int = 3, scale: float = 1.0
+) -> ImportResult:
+    """モジュールのインポート時間と読み込まれた依存を予算と比較する
+
+    Args:
+        budget: モジュールの予算
+        repeat: 計測の回数（中央値を使う）
+        scale: 予算の時間に掛ける倍率（遅いマシンで実行する場合など）
+
+    Returns:
+        計測結果と予算との比較
+    """
+    profiles = [profile_import(budget.module) for _ in range(repeat)]
+    modules = set(profiles[0].modules)
+    forbidden = [
+        package
+        for package in budget.forbidden
+        if any(name == package or name.startswith(f"{package}.") for name in modules)
+    ]
+    packages: Counter[str] = Counter()
+    for profile in profiles:
+        packages.update(profile.packages)
+    return ImportResult(
+        module=budget.module,
+        seconds=statistics.median(profile.seconds for profile in profiles),
+        budget_ms=budget.max_ms * scale,
+        forbidden_imports=forbidden,
+        top_packages={
+            name: seconds / repeat for name, seconds in packages.most_common(5)
+        },
+    )
+
+
+def format_results(results: list[ImportResult]) -> str:
+    """計測結果を表形式の文字列にする"""
+    width = max((len(result.module) for result in results), default=10)
+    header = f"{'module':<{width}}  {'ms':>8} {'budget':>8}  result"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        status = "ok" if result.passed else "FAIL"
+        lines.append(
+            f"{result.module:<{width}}  {result.seconds * 1000:>8.0f} "
+            f"{result.budget_ms:>8.0f}  {status}"
+        )
+        top = ", ".join(
+            f"{name} {seconds * 1000:.0f}"
+            for name, seconds in result.top_packages.items()
+        )
+        lines.append(f"{'':<{width}}  top: {top}")
+        if result.forbidden_imports:
+            lines.append(
+                f"{'':<{width}}  imports {', '.join(result.forbidden_imports)} eagerly"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,388 @@
+"""Web アプリの主要なエンドポイントの負荷試験
+
+合成データ（数千件の生成履歴）を登録したデータベースとスタンドインの
+外部サービスで Web アプリを起動し、シナリオごとに仮想ユーザーが
+リクエストを繰り返します（クローズドループ）。エンドポイントごとの
+レイテンシの分布とエラー率を計測し、保存したベースラインと比較します。
+"""
+
+import asyncio
+import html
+import logging
+import random
+import re
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+from pydantic import BaseModel
+
+from benchmarks.baseline import (
+    Regression,
+    compare_latency,
+    compare_throughput,
+    error_rate,
+)
+from benchmarks.environment import OfflineEnvironment
+from benchmarks.report import LatencyStats, StageRecorder, peak_rss_bytes
+from benchmarks.seed import (
+    SeededData,
+    prerender_thumbnails,
+    seed_database,
+    seed_images,
+)
+from benchmarks.web import (
+    GENERATION_ID,
+    AppServer,
+    configure_app,
+    timed_request,
+    wait_for_result,
+)
+
+logger = logging.getLogger(__name__)
+
+_NEXT_CURSOR = re.compile(r"/api/history\?cursor=([^&\"]+)")
+_THUMBNAIL_ACCEPT = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+
+
+class LoadTestOptions(BaseModel):
+    """負荷試験の設定"""
+
+    # 実行するシナリオ
+    scenarios: list[str]
+    # シナリオごとの計測時間（秒）
+    duration: float = 10.0
+    # 計測前の準備運転の時間（秒、結果には含めない）
+    warmup: float = 2.0
+    # 登録する生成の数
+    generations: int = 5000
+    # 登録するキャラクターの数（デフォルトのキャラクターを除く）
+    characters: int = 20
+    # 生成に割り当てる画像の数
+    images: int = 50
+    # 画像のサイズ（幅, 高さ）
+    image_size: tuple[int, int] = (512, 512)
+    # サムネイルを事前に作らない（初回アクセス時の生成を計測する）
+    cold_thumbnails: bool = False
+    # 履歴の無限スクロールで読み込むページ数
+    scroll_pages: int = 5
+    # 履歴の 1 ページの件数
+    page_size: int = 10
+    # 乱数のシード
+    seed: int = 0
+
+
+class _User:
+    """1 人の仮想ユーザー"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: StageRecorder,
+        data: SeededData,
+        options: LoadTestOptions,
+        variants: int,
+        rng: random.Random,
+    ):
+        self.client = client
+        self.recorder = recorder
+        self.data = data
+        self.options = options
+        self.variants = variants
+        self.rng = rng
+
+    def generation_id(self) -> str:
+        return self.rng.choice(self.data.image_generation_ids)
+
+
+async def _scroll_history(user: _User) -> None:
+    # 履歴ページを開き、無限スクロールで続きのページを読み込む
+    limit = user.options.page_size
+    response = await timed_request(
+        user.recorder,
+        "GET /api/history",
+        user.client.get("/api/history", params={"limit": limit}),
+    )
+    for _ in range(user.options.scroll_pages - 1):
+        match = _NEXT_CURSOR.search(response.text)
+        if match is None:
+            return
+        response = await timed_request(
+            user.recorder,
+            "GET /api/history?cursor",
+            user.client.get(
+                "/api/history",
+                params={"cursor": html.unescape(match.group(1)), "limit": limit},
+            ),
+        )
+
+
+async def _view_image(user: _User) -> None:
+    await timed_request(
+        user.recorder,
+        "GET /api/images/{id}",
+        user.client.get(f"/api/images/{user.generation_id()}"),
+    )
+
+
+async def _view_thumbnail(user: _User) -> None:
+    await timed_request(
+        user.recorder,
+        "GET /api/images/{id}/thumbnail",
+        user.client.get(
+            f"/api/images/{user.generation_id()}/thumbnail",
+            params={"size": user.rng.choice((200, 400))},
+            headers={"Accept": _THUMBNAIL_ACCEPT},
+        ),
+    )
+
+
+async def _list_characters(user: _User) -> None:
+    await timed_request(
+        user.recorder,
+        "GET /api/characters",
+        user.client.get("/api/characters"),
+    )
+
+
+async def _generate(user: _User) -> None:
+    response = await timed_request(
+        user.recorder,
+        "POST /api/generate",
+        user.client.post(
+            "/api/generate",
+            data={
+                "topic": f"負荷試験: クラゲの生態 {user.rng.random()}",
+                "character": user.rng.choice(user.data.character_names),
+                "variants": str(user.variants),
+            },
+        ),
+    )
+    match = GENERATION_ID.search(response.text)
+    if response.is_error or match is None:
+        return
+    await wait_for_result(
+        user.client,
+        user.recorder,
+        match.group(0),
+        name="GET /api/generate/{id}/stream",
+    )
+
+
+# シナリオ名と、仮想ユーザーが繰り返す 1 回分の操作
+SCENARIOS: dict[str, Callable[[_User], Awaitable[None]]] = {
+    "history": _scroll_history,
+    "image": _view_image,
+    "thumbnail": _view_thumbnail,
+    "characters": _list_characters,
+    "generate": _generate,
+}
+
+
+class ScenarioResult(BaseModel):
+    """1 つのシナリオの結果"""
+
+    users: int
+    duration_seconds: float
+    requests: int
+    errors: int
+    throughput: float
+    endpoints: dict[str, LatencyStats]
+
+
+class LoadTestReport(BaseModel):
+    """負荷試験の結果"""
+
+    parameters: dict
+    scenarios: dict[str, ScenarioResult]
+    peak_rss_bytes: int
+
+    def write_json(self, path: Path) -> None:
+        """結果を JSON で保存する"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.model_dump_json(indent=2) + "\n", encoding="utf-8")
+
+    def format_table(self) -> str:
+        """結果を表形式の文字列にする"""
+        rows = [
+            (f"{scenario} / {endpoint}", stats)
+            for scenario, result in self.scenarios.items()
+            for endpoint, stats in sorted(result.endpoints.items())
+        ]
+        width = max((len(name) for name, _ in rows), default=10)
+        header = f"{'endpoint':<{width}}  {'count':>7} {'err %':>6}" + "".join(
+            f" {name:>9}" for name in ("p50 ms", "p95 ms", "p99 ms", "max ms")
+        )
+        lines = [
+            f"{name}: {result.requests} requests, {result.throughput:.1f} req/s, "
+            f"{result.errors} errors ({result.users} users, "
+            f"{result.duration_seconds:.1f}s)"
+            for name, result in self.scenarios.items()
+        ]
+        lines += [
+            f"peak RSS: {self.peak_rss_bytes / 1024 / 1024:.1f} MiB",
+            "",
+            header,
+            "-" * len(header),
+        ]
+        for name, stats in rows:
+            lines.append(
+                f"{name:<{width}}  {stats.count:>7} {error_rate(stats):>6.1%}"
+                + "".join(
+                    f" {value * 1000:>9.1f}"
+                    for value in (stats.p50, stats.p95, stats.p99, stats.max)
+                )
+            )
+        return "\n".join(lines)
+
+    def compare(self, baseline: "LoadTestReport", tolerance: float) -> list[Regression]:
+        """ベースラインと比較して悪化した指標を返す
+
+        ベースラインにないシナリオやエンドポイントは比較しません。
+
+        Args:
+            baseline: 保存したベースライン
+            tolerance: 許容する悪化の割合（0.2 なら 20%）
+
+        Returns:
+            悪化した指標
+        """
+        regressions = []
+        for scenario, result in self.scenarios.items():
+            before = baseline.scenarios.get(scenario)
+            if before is None:
+                continue
+            regressions += compare_throughput(
+                scenario, before.throughput, result.throughput, tolerance
+            )
+            for endpoint, stats in result.endpoints.items():
+                if endpoint in before.endpoints:
+                    regressions += compare_latency(
+                        f"{scenario} / {endpoint}",
+                        before.endpoints[endpoint],
+                        stats,
+                        tolerance,
+                    )
+        return regressions
+
+
+async def _run_scenario(
+    scenario: str,
+    client: httpx.AsyncClient,
+    data: SeededData,
+    options: LoadTestOptions,
+    users: int,
+    variants: int,
+) -> ScenarioResult:
+    action = SCENARIOS[scenario]
+
+    async def run_users(recorder: StageRecorder, seconds: float) -> float:
+        deadline = time.perf_counter() + seconds
+
+        async def run_user(index: int) -> None:
+            user = _User(
+                client,
+                recorder,
+                data,
+                options,
+                variants,
+                random.Random(f"{options.seed}-{scenario}-{index}"),
+            )
+            while time.perf_counter() < deadline:
+                try:
+                    await action(user)
+                except httpx.HTTPError as e:
+                    # 失敗は timed_request が記録済み
+                    logger.debug("%s request failed: %s", scenario, e)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(index) for index in range(users)))
+        return time.perf_counter() - started
+
+    if options.warmup > 0:
+        await run_users(StageRecorder(), options.warmup)
+    recorder = StageRecorder()
+    elapsed = await run_users(recorder, options.duration)
+
+    endpoints = recorder.stats()
+    requests = sum(stats.count for stats in endpoints.values())
+    return ScenarioResult(
+        users=users,
+        duration_seconds=elapsed,
+        requests=requests,
+        errors=sum(stats.errors for stats in endpoints.values()),
+        throughput=requests / elapsed if elapsed > 0 else 0.0,
+        endpoints=endpoints,
+    )
+
+
+async def run_load_test(
+    env: OfflineEnvironment,
+    load_options: LoadTestOptions,
+    *,
+    workers: int,
+    model_limits: bool = True,
+) -> LoadTestReport:
+    """合成データを登録した Web アプリに負荷をかけて計測する
+
+    Args:
+        env: スタンドインの実行環境（`env.options.concurrency` が仮想ユーザー数）
+        load_options: 負荷試験の設定
+        workers: アプリの生成ジョブの同時実行数
+        model_limits: モデルごとの呼び出し制限を適用するかどうか
+
+    Returns:
+        負荷試験の結果
+    """
+    unknown = set(load_options.scenarios) - SCENARIOS.keys()
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if load_options.images < 1:
+        raise ValueError("At least one seed image is required")
+
+    # Alembic の env.py は自前のイベントループでマイグレーションを実行する
+    await asyncio.to_thread(configure_app, env, workers, model_limits)
+
+    images = await seed_images(load_options.images, load_options.image_size)
+    if not load_options.cold_thumbnails:
+        await prerender_thumbnails(images)
+    data = await seed_database(
+        generations=load_options.generations,
+        characters=load_options.characters,
+        images=images,
+        seed=load_options.seed,
+    )
+
+    server = AppServer()
+    server.start()
+    results: dict[str, ScenarioResult] = {}
+    try:
+        limits = httpx.Limits(max_connections=env.options.concurrency)
+        async with httpx.AsyncClient(
+            base_url=server.url, timeout=60.0, limits=limits
+        ) as client:
+            for scenario in load_options.scenarios:
+                results[scenario] = await _run_scenario(
+                    scenario,
+                    client,
+                    data,
+                    load_options,
+                    env.options.concurrency,
+                    env.options.variants,
+                )
+    finally:
+        server.stop()
+
+    return LoadTestReport(
+        parameters={
+            **load_options.model_dump(),
+            "users": env.options.concurrency,
+            "workers": workers,
+            "model_limits": model_limits,
+            "llm_latency": env.options.llm_latency,
+            "image_latency": env.options.image_latency,
+        },
+        scenarios=results,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
@@ -0,0 +1,211 @@
+"""計測結果の集計と出力"""
+
+import math
+import resource
+import sys
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from manganize_core.instrumentation import StageScope
+
+
+def percentile(values: list[float], p: float) -> float:
+    """線形補間でパーセンタイルを求める
+
+    Args:
+        values: 値のリスト
+        p: パーセンタイル（0〜100）
+
+    Returns:
+        パーセンタイル値（値がない場合は NaN）
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_bytes() -> int:
+    """このプロセスのピーク RSS（バイト）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS はバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> int | None:
+    """このプロセスの現在の RSS（バイト、取得できない場合は None）"""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize()
+
+
+class LatencyStats(BaseModel):
+    """1 つのステージ（またはリクエスト全体）のレイテンシの統計（秒）"""
+
+    count: int
+    errors: int
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_samples(cls, durations: list[float], errors: int) -> "LatencyStats":
+        return cls(
+            count=len(durations),
+            errors=errors,
+            mean=sum(durations) / len(durations) if durations else math.nan,
+            p50=percentile(durations, 50),
+            p95=percentile(durations, 95),
+            p99=percentile(durations, 99),
+            max=max(durations, default=math.nan),
+        )
+
+
+class BenchmarkReport(BaseModel):
+    """ベンチマークの結果"""
+
+    scenario: str
+    parameters: dict[str, Any]
+    requests: int
+    succeeded: int
+    failed: int
+    wall_seconds: float
+    throughput: float
+    latency: LatencyStats
+    stages: dict[str, LatencyStats]
+    rss_before_bytes: int | None
+    peak_rss_bytes: int
+
+    def write_json(self, path: Path) -> None:
+        """結果を JSON で保存する"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.model_dump_json(indent=2) + "\n", encoding="utf-8")
+
+    def format_table(self) -> str:
+        """結果を表形式の文字列にする"""
+        parameters = ", ".join(f"{k}={v}" for k, v in self.parameters.items())
+        lines = [
+            f"scenario: {self.scenario} ({parameters})",
+            (
+                f"requests: {self.requests} (succeeded {self.succeeded}, "
+                f"failed {self.failed}) in {self.wall_seconds:.2f}s"
+            ),
+            f"throughput: {self.throughput:.2f} req/s",
+            f"peak RSS: {_megabytes(self.peak_rss_bytes)}"
+            + (
+                f" (before run: {_megabytes(self.rss_before_bytes)})"
+                if self.rss_before_bytes is not None
+                else ""
+            ),
+            "",
+        ]
+        rows = [("request", self.latency), *sorted(self.stages.items())]
+        width = max(len(name) for name, _ in rows)
+        header = f"{'stage':<{width}}  {'count':>6} {'errors':>6}" + "".join(
+            f" {name:>9}" for name in ("p50 ms", "p95 ms", "p99 ms", "max ms")
+        )
+        lines += [header, "-" * len(header)]
+        for name, stats in rows:
+            lines.append(
+                f"{name:<{width}}  {stats.count:>6} {stats.errors:>6}"
+                + "".join(
+                    f" {value * 1000:>9.1f}"
+                    for value in (stats.p50, stats.p95, stats.p99, stats.max)
+                )
+            )
+        return "\n".join(lines)
+
+
+def _megabytes(value: int) -> str:
+    return f"{value / 1024 / 1024:.1f} MiB"
+
+
+class StageRecorder:
+    """計測されたステージの所要時間を記録するオブザーバー
+
+    `manganize_core.instrumentation` に登録して使います。ステージは
+    `kind name` の形式の名前でまとめます。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._durations: defaultdict[str, list[float]] = defaultdict(list)
+        self._errors: defaultdict[str, int] = defaultdict(int)
+
+    def stage_started(self, scope: "StageScope") -> None:
+        """ステージの開始（何もしない）"""
+
+    def stage_finished(self, scope: "StageScope", duration: float) -> None:
+        """ステージの所要時間を記録する"""
+        self.record(f"{scope.kind} {scope.name}", duration, scope.outcome == "error")
+
+    def record(self, name: str, duration: float, failed: bool = False) -> None:
+        """所要時間を記録する
+
+        Args:
+            name: ステージ名
+            duration: 所要時間（秒）
+            failed: 失敗したかどうか
+        """
+        with self._lock:
+            self._durations[name].append(duration)
+            if failed:
+                self._errors[name] += 1
+
+    def stats(self) -> dict[str, LatencyStats]:
+        """ステージごとの統計"""
+        with self._lock:
+            return {
+                name: LatencyStats.from_samples(durations, self._errors[name])
+                for name, durations in self._durations.items()
+            }
+
+
+def build_report(
+    scenario: str,
+    parameters: dict[str, Any],
+    latencies: list[float],
+    failures: int,
+    wall_seconds: float,
+    recorder: StageRecorder,
+    rss_before: int | None,
+) -> BenchmarkReport:
+    """計測結果から結果をまとめる
+
+    Args:
+        scenario: シナリオ名（agent / web）
+        parameters: ベンチマークの設定
+        latencies: 成功したリクエストのレイテンシ（秒）
+        failures: 失敗したリクエストの数
+        wall_seconds: 全体の所要時間（秒）
+        recorder: ステージの記録
+        rss_before: 実行前の RSS（バイト）
+
+    Returns:
+        ベンチマークの結果
+    """
+    return BenchmarkReport(
+        scenario=scenario,
+        parameters=parameters,
+        requests=len(latencies) + failures,
+        succeeded=len(latencies),
+        failed=failures,
+        wall_seconds=wall_seconds,
+        throughput=len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+        latency=LatencyStats.from_samples(latencies, failures),
+        stages=recorder.stats(),
+        rss_before_bytes=rss_before,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
@@ -0,0 +1,197 @@
+"""負荷試験用の合成データ
+
+生成履歴とキャラクターをデータベースに一括で登録し、画像をブロブストアに保存します。
+manganize_web をインポートするため、`configure_app` の後に使います。
+"""
+
+import random
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from pydantic import BaseModel
+from sqlalchemy import insert
+
+from benchmarks.fixtures import render_image
+
+_BATCH_SIZE = 1000
+
+_TOPICS = (
+    "クラゲの生態",
+    "量子コンピューターの仕組み",
+    "Transformer のアテンション",
+    "光合成のしくみ",
+    "ブラックホールの蒸発",
+    "発酵食品の科学",
+    "TCP の輻輳制御",
+    "円周率の計算方法",
+)
+
+
+class SeededData(BaseModel):
+    """登録した合成データ"""
+
+    # 画像のある（完了した）生成の ID
+    image_generation_ids: list[str]
+    # 登録したキャラクターの名前
+    character_names: list[str]
+
+
+async def seed_images(count: int, size: tuple[int, int]) -> list[dict]:
+    """ノイズ画像をブロブストアに保存する
+
+    Args:
+        count: 画像の数
+        size: 画像のサイズ（幅, 高さ）
+
+    Returns:
+        画像ごとの `image_hash` / `image_size` / `image_width` / `image_height`
+    """
+    from manganize_web.services.blob_store import blob_store
+
+    images = []
+    for _ in range(count):
+        stored = await blob_store.put_image(render_image(*size))
+        images.append(
+            {
+                "image_hash": stored.hash,
+                "image_size": stored.size,
+                "image_width": stored.width,
+                "image_height": stored.height,
+            }
+        )
+    return images
+
+
+async def prerender_thumbnails(images: list[dict]) -> None:
+    """画像のサムネイルを事前に作っておく（生成完了時と同じ状態にする）"""
+    from manganize_web.services.thumbnail import thumbnail_service
+
+    for image in images:
+        await thumbnail_service.ensure(image["image_hash"])
+
+
+def _character_rows(count: int) -> list[dict]:
+    now = datetime.now(UTC)
+    rows = [
+        {
+            "name": "kurage",
+            "display_name": "くらげちゃん",
+            "nickname": "くらげ",
+            "attributes": ["クラゲ", "解説好き"],
+            "personality": "明るく好奇心旺盛で、難しいことをやさしく解説する",
+            "speech_style": {"tone": "カジュアル", "examples": ["〜だよ！"]},
+            "is_default": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+    ]
+    rows += [
+        {
+            "name": f"bench_{index}",
+            "display_name": f"ベンチキャラ {index}",
+            "nickname": None,
+            "attributes": ["合成データ"],
+            "personality": "負荷試験用のキャラクター",
+            "speech_style": {"tone": "丁寧", "examples": ["〜です。"]},
+            "is_default": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(count)
+    ]
+    return rows
+
+
+def _generation_rows(
+    count: int, images: list[dict], character_names: list[str], rng: random.Random
+) -> list[dict]:
+    from manganize_web.models.generation import (
+        GenerationStatusEnum,
+        GenerationTypeEnum,
+    )
+
+    now = datetime.now(UTC)
+    rows: list[dict] = []
+    for index in range(count):
+        # 新しいものから順に、数分おきに作られたことにする
+        created_at = now - timedelta(minutes=index * 7 + rng.random())
+        topic = f"{rng.choice(_TOPICS)} #{index}"
+        row = {
+            "id": str(uuid.uuid4()),
+            "character_name": rng.choice(character_names),
+            "input_topic": topic,
+            "generated_title": topic,
+            "generation_type": GenerationTypeEnum.INITIAL,
+            "parent_generation_id": None,
+            "variant_index": None,
+            "status": GenerationStatusEnum.COMPLETED,
+            "error_message": None,
+            "created_at": created_at,
+            "completed_at": created_at + timedelta(seconds=rng.uniform(30, 120)),
+            "image_hash": None,
+            "image_size": None,
+            "image_width": None,
+            "image_height": None,
+        }
+        roll = rng.random()
+        if roll < 0.03:
+            row["status"] = GenerationStatusEnum.ERROR
+            row["error_message"] = "合成データのエラー"
+        else:
+            row.update(rng.choice(images))
+            if roll < 0.15 and rows:
+                # 直前の生成のリビジョン
+                row["generation_type"] = GenerationTypeEnum.REVISION
+                row["parent_generation_id"] = rows[-1]["id"]
+        rows.append(row)
+    return rows
+
+
+async def seed_database(
+    *,
+    generations: int,
+    characters: int,
+    images: list[dict],
+    seed: int = 0,
+) -> SeededData:
+    """生成履歴とキャラクターを一括で登録する
+
+    生成は約 3% がエラー、約 12% がリビジョンで、それ以外は完了した生成です。
+
+    Args:
+        generations: 登録する生成の数
+        characters: デフォルトのキャラクター以外に登録するキャラクターの数
+        images: 生成に割り当てる画像（`seed_images` の戻り値）
+        seed: 乱数のシード
+
+    Returns:
+        登録した合成データ
+    """
+    from manganize_web.models.character import Character
+    from manganize_web.models.database import create_engine, create_session_maker
+    from manganize_web.models.generation import GenerationHistory
+
+    rng = random.Random(seed)
+    character_rows = _character_rows(characters)
+    character_names = [row["name"] for row in character_rows]
+    generation_rows = _generation_rows(generations, images, character_names, rng)
+
+    engine = create_engine()
+    try:
+        async with create_session_maker(engine)() as session:
+            await session.execute(insert(Character), character_rows)
+            for start in range(0, len(generation_rows), _BATCH_SIZE):
+                await session.execute(
+                    insert(GenerationHistory),
+                    generation_rows[start : start + _BATCH_SIZE],
+                )
+            await session.commit()
+    finally:
+        await engine.dispose()
+
+    return SeededData(
+        image_generation_ids=[
+            row["id"] for row in generation_rows if row["image_hash"]
+        ],
+        character_names=character_names,
+    )
@@ -0,0 +1,295 @@
+"""Web アプリのベンチマーク
+
+一時的な SQLite データベースとフィクスチャサーバーの S3 を使って
+FastAPI アプリを uvicorn で起動し、HTTP クライアントから
+アップロード → 生成 → SSE での進捗の購読 → 画像の取得を実行します。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Awaitable
+from pathlib import Path
+
+import httpx
+
+from benchmarks.environment import OfflineEnvironment
+from benchmarks.report import (
+    BenchmarkReport,
+    StageRecorder,
+    build_report,
+    current_rss_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+GENERATION_ID = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+_TERMINAL_STATUSES = {"completed", "error"}
+
+UPLOAD_DOCUMENT = (
+    "# クラゲの基礎知識\n\n"
+    + "クラゲは刺胞動物の仲間で、体の 95% 以上が水でできています。\n" * 50
+)
+
+
+def configure_app(env: OfflineEnvironment, workers: int, model_limits: bool) -> None:
+    """Web アプリをスタンドインの外部サービスと一時ディレクトリに向ける
+
+    設定はインポート時に読み込まれるため、manganize_web より先に呼び出します。
+    データベースのマイグレーションも実行します。
+
+    Args:
+        env: スタンドインの実行環境
+        workers: アプリの生成ジョブの同時実行数
+        model_limits: モデルごとの呼び出し制限（GEMINI_MODEL_LIMITS）を
+            適用するかどうか
+    """
+    bucket = "manganize-bench"
+    os.environ.update(
+        {
+            "DATABASE_URL": f"sqlite+aiosqlite:///{env.root / 'manganize.db'}",
+            "RATE_LIMIT_PER_MINUTE": "1000000",
+            "GENERATION_MAX_CONCURRENCY": str(workers),
+            "GENERATION_QUEUE_SIZE": str(
+                max(env.options.requests, env.options.concurrency)
+            ),
+            "GENERATION_MAX_VARIANTS": str(max(env.options.variants, 1)),
+            "PAGE_CACHE_ENABLED": str(env.options.caches).lower(),
+            "PAGE_CACHE_DIR": str(env.root / "pages"),
+            "RESEARCH_CACHE_ENABLED": str(env.options.caches).lower(),
+            "RESEARCH_CACHE_DIR": str(env.root / "research"),
+            "TRACING_ENABLED": "false",
+            "STORAGE_BUCKET": bucket,
+            "STORAGE_REGION": "us-east-1",
+            "STORAGE_ENDPOINT_URL": env.fixtures.url,
+            "STORAGE_ACCESS_KEY_ID": "benchmark",
+            "STORAGE_SECRET_ACCESS_KEY": "benchmark",
+            "STORAGE_FORCE_PATH_STYLE": "true",
+            "BLOB_STORE_BACKEND": "object_storage",
+        }
+    )
+    if not model_limits:
+        os.environ["GEMINI_MODEL_LIMITS"] = "{}"
+
+    from alembic.config import Config
+
+    from alembic import command
+
+    command.upgrade(Config(str(ROOT_DIR / "alembic.ini")), "head")
+
+    from manganize_core.graph_cache import graph_cache
+
+    graph_cache.configure(chat_model_factory=env.chat_model)
+
+
+class AppServer:
+    """Web アプリを uvicorn で別スレッドのイベントループで動かす"""
+
+    def __init__(self) -> None:
+        import uvicorn
+        from manganize_web.main import app
+
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+        )
+        self.thread = threading.Thread(
+            target=self.server.run, name="benchmark-web", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """起動したアプリのベース URL"""
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def start(self) -> None:
+        """アプリを起動し、起動処理（lifespan）の完了まで待つ"""
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Web アプリの起動に失敗しました")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        """アプリを停止する"""
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def timed_request(
+    recorder: StageRecorder, name: str, request: Awaitable[httpx.Response]
+) -> httpx.Response:
+    """HTTP リクエストの所要時間を記録する
+
+    例外が発生した場合やエラーのステータスが返った場合は失敗として記録します。
+
+    Args:
+        recorder: 記録先
+        name: 記録する名前（`GET /api/history` など）
+        request: リクエストのコルーチン
+
+    Returns:
+        レスポンス
+    """
+    started = time.perf_counter()
+    failed = True
+    try:
+        response = await request
+        failed = response.is_error
+        return response
+    finally:
+        recorder.record(name, time.perf_counter() - started, failed)
+
+
+async def wait_for_result(
+    client: httpx.AsyncClient,
+    recorder: StageRecorder,
+    generation_id: str,
+    name: str = "client GET /api/generate/{id}/stream",
+) -> str | None:
+    """SSE で生成の進捗を購読し、終了時のステータスを返す
+
+    Args:
+        client: HTTP クライアント
+        recorder: 記録先
+        generation_id: 生成 ID
+        name: 購読の所要時間を記録する名前
+
+    Returns:
+        終了時のステータス（completed / error、ストリームが途切れた場合は
+        最後に受け取ったステータス）
+    """
+    started = time.perf_counter()
+    status: str | None = None
+    async with client.stream("GET", f"/api/generate/{generation_id}/stream") as stream:
+        async for line in stream.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            status = json.loads(line.removeprefix("data:").strip()).get("status")
+            if status in _TERMINAL_STATUSES:
+                break
+    recorder.record(name, time.perf_counter() - started, status != "completed")
+    return status
+
+
+async def run_web_benchmark(
+    env: OfflineEnvironment, *, workers: int, upload: bool, model_limits: bool = True
+) -> BenchmarkReport:
+    """Web アプリをスタンドインの外部サービスで起動して計測する
+
+    Args:
+        env: スタンドインの実行環境
+        workers: アプリのバックグラウンドジョブの同時実行数
+        upload: 生成ごとにドキュメントをアップロードして添付するかどうか
+        model_limits: アプリのモデルごとの呼び出し制限（GEMINI_MODEL_LIMITS）を
+            適用するかどうか
+
+    Returns:
+        ベンチマークの結果
+    """
+    options = env.options
+    # Alembic の env.py は自前のイベントループでマイグレーションを実行する
+    await asyncio.to_thread(configure_app, env, workers, model_limits)
+
+    from manganize_core.instrumentation import instrumentation
+
+    recorder = StageRecorder()
+    semaphore = asyncio.Semaphore(options.concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def run_one(client: httpx.AsyncClient, index: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                form = {
+                    "topic": f"ベンチマーク {index}: クラゲの生態について",
+                    "character": "kurage",
+                    "variants": str(options.variants),
+                }
+                if upload:
+                    response = await timed_request(
+                        recorder,
+                        "client POST /api/upload",
+                        client.post(
+                            "/api/upload",
+                            files={
+                                "file": (
+                                    f"notes-{index}.md",
+                                    UPLOAD_DOCUMENT.encode(),
+                                    "text/markdown",
+                                )
+                            },
+                        ),
+                    )
+                    response.raise_for_status()
+                    form["upload_id"] = response.json()["upload_id"]
+
+                response = await timed_request(
+                    recorder,
+                    "client POST /api/generate",
+                    client.post("/api/generate", data=form),
+                )
+                response.raise_for_status()
+                match = GENERATION_ID.search(response.text)
+                if match is None:
+                    raise RuntimeError("生成 ID がレスポンスに含まれていません")
+                generation_id = match.group(0)
+
+                if await wait_for_result(client, recorder, generation_id) != (
+                    "completed"
+                ):
+                    failures += 1
+                    return
+
+                response = await timed_request(
+                    recorder,
+                    "client GET /api/images/{id}",
+                    client.get(f"/api/images/{generation_id}"),
+                )
+                response.raise_for_status()
+            except (httpx.HTTPError, RuntimeError, ValueError, KeyError) as e:
+                # HTTP のエラー、ID や結果の欠けたレスポンス、壊れたイベント
+                logger.warning("Request %d failed: %s", index, e)
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    server = AppServer()
+    rss_before = current_rss_bytes()
+    instrumentation.add_observer(recorder)
+    server.start()
+    try:
+        async with httpx.AsyncClient(base_url=server.url, timeout=None) as client:
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(run_one(client, index) for index in range(options.requests))
+            )
+            wall_seconds = time.perf_counter() - started
+    finally:
+        server.stop()
+        instrumentation.remove_observer(recorder)
+
+    return build_report(
+        "web",
+        {
+            **options.model_dump(),
+            "workers": workers,
+            "upload": upload,
+            "model_limits": model_limits,
+        },
+        latencies,
+        failures,
+        wall_seconds,
+        recorder,
+        rss_before,
+    )
@@ -1,24 +1,37 @@
-from datetime import datetime
+import asyncio
+import hashlib
+import operator
+from datetime import date, datetime
 from enum import StrEnum
-from typing import Literal, Optional, TypedDict
+from typing import Annotated, Literal, NotRequired, Optional, TypedDict
 
 from langchain.agents import create_agent
 from langchain.chat_models import BaseChatModel, init_chat_model
 from langchain.messages import SystemMessage
 from langchain_community.tools import DuckDuckGoSearchRun
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.types import Command
+from langgraph.types import Command, Send
 from pydantic import BaseModel, Field
 
 from manganize_core.character import BaseCharacter, KurageChan
+from manganize_core.instrumentation import instrumentation
+from manganize_core.middleware import InstrumentationMiddleware, ModelLimitMiddleware
+from manganize_core.page_cache import page_cache
 from manganize_core.prompts import (
     get_researcher_system_prompt,
     get_scenario_writer_system_prompt,
 )
+from manganize_core.research_cache import (
+    CachedResearch,
+    extract_urls,
+    research_cache,
+)
 from manganize_core.tools import (
+    agenerate_manga_image,
     generate_manga_image,
     read_document_file,
     retrieve_webpage,
@@ -36,20 +49,43 @@ class NodeName(StrEnum):
 # Number of processing nodes (excluding START/END)
 PROCESSING_NODE_COUNT = 3
 
+# Default chat models for each agent
+DEFAULT_RESEARCHER_MODEL = "google_genai:gemini-2.5-pro"
+DEFAULT_SCENARIO_WRITER_MODEL = "google_genai:gemini-2.5-flash"
+
 
 class ManganizeInput(TypedDict):
     topic: str
+    # 1 より大きい場合、リサーチを 1 回だけ行い、シナリオ作成と画像生成を
+    # この数だけ並列に実行する
+    variant_count: NotRequired[int]
 
 
 class ManganizeState(TypedDict):
     research_results: str
     research_results_relevance: float
+    research_cache_hit: bool
+    scenario: str
+
+
+class ManganizeVariant(TypedDict):
+    variant_index: int
     scenario: str
+    generated_image: Optional[bytes]
 
 
 class ManganizeOutput(TypedDict):
     topic_title: str
     generated_image: Optional[bytes]
+    # variant_count > 1 の場合の各バリエーションの結果（完了した順）
+    variants: Annotated[list[ManganizeVariant], operator.add]
+
+
+class VariantBranchState(TypedDict):
+    # Send で各バリエーションのブランチに渡す状態
+    variant_index: int
+    research_results: str
+    scenario: NotRequired[str]
 
 
 class ManganizeAgentState(
@@ -57,7 +93,8 @@ class ManganizeAgentState(
     ManganizeState,
     ManganizeOutput,
 ):
-    pass
+    # バリエーションのブランチとして Send で実行されたノードにだけ渡される
+    variant_index: NotRequired[int]
 
 
 class ResearcherAgentOutput(BaseModel):
@@ -75,42 +112,138 @@ class ManganizeAgent:
         researcher_llm: BaseChatModel | None = None,
         scenario_writer_llm: BaseChatModel | None = None,
         relevance_threshold: float = 0.5,
+        use_async_nodes: bool = False,
     ):
         # キャラクターの設定（デフォルトはくらげちゃん）
         self.character = character or KurageChan()
 
-        today_date = datetime.now().strftime("%Y-%m-%d")
-
-        self.today_prompt = f"""
-        # 今日の日付
-        今日は{today_date}です。
-        """
-
         self.researcher = create_agent(
-            model=researcher_llm
-            or init_chat_model(model="google_genai:gemini-2.5-pro"),
+            model=researcher_llm or init_chat_model(model=DEFAULT_RESEARCHER_MODEL),
             tools=[retrieve_webpage, DuckDuckGoSearchRun(), read_document_file],
             system_prompt=SystemMessage(content=get_researcher_system_prompt()),
             response_format=ResearcherAgentOutput,
+            # モデルごとの同時実行数・レートの制限は LLM の呼び出し単位で適用する
+            # （計測は制限の内側で行い、待ち行列での待ち時間を含めない）
+            middleware=[ModelLimitMiddleware(), InstrumentationMiddleware()],
         )
         self.scenario_writer = create_agent(
             model=scenario_writer_llm
-            or init_chat_model(model="google_genai:gemini-2.5-flash"),
+            or init_chat_model(model=DEFAULT_SCENARIO_WRITER_MODEL),
             system_prompt=SystemMessage(
                 content=get_scenario_writer_system_prompt(self.character)
             ),
+            middleware=[ModelLimitMiddleware(), InstrumentationMiddleware()],
         )
 
         self.relevance_threshold = relevance_threshold
+        # True の場合は ainvoke と非同期の画像生成を使うノードでグラフを構築する
+        # （astream / ainvoke 専用。同期の stream / invoke では使えない）
+        self.use_async_nodes = use_async_nodes
+
+    @staticmethod
+    def _today(config: RunnableConfig) -> str:
+        # グラフはキャッシュされて使い回されるため、日付は実行ごとに決める
+        # （config の configurable.today で上書き可能）
+        return (config.get("configurable") or {}).get(
+            "today"
+        ) or datetime.now().strftime("%Y-%m-%d")
+
+    @classmethod
+    def _today_prompt(cls, config: RunnableConfig) -> str:
+        today_date = cls._today(config)
+
+        return f"""
+        # 今日の日付
+        今日は{today_date}です。
+        """
 
-    def _researcher_node(self, state: ManganizeAgentState) -> Command:
-        result = self.researcher.invoke(
-            {
-                "messages": [
-                    {"role": "user", "content": state["topic"] + self.today_prompt}
-                ]
-            }
+    def _researcher_input(
+        self, state: ManganizeAgentState, config: RunnableConfig
+    ) -> dict:
+        return {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": state["topic"] + self._today_prompt(config),
+                }
+            ]
+        }
+
+    @staticmethod
+    def _source_pages_hash(topic: str) -> str | None:
+        # トピック中の URL のうち、取得済みのページの内容をハッシュにまとめる
+        urls = extract_urls(topic)
+        if not urls:
+            return None
+        digest = hashlib.sha256()
+        for url in urls:
+            digest.update(url.encode("utf-8"))
+            page = page_cache.get(url)
+            if page is not None:
+                digest.update((page.markdown or page.html or "").encode("utf-8"))
+        return digest.hexdigest()
+
+    def _research_cache_key(
+        self, state: ManganizeAgentState, config: RunnableConfig
+    ) -> str:
+        # 添付ドキュメントの署名付き URL のように実行ごとに変わる値がキーに
+        # 入らないよう、呼び出し側は configurable.research_topic と
+        # configurable.research_source_hash でキーの材料を指定できる
+        configurable = config.get("configurable") or {}
+        topic = configurable.get("research_topic") or state["topic"]
+        source_hash = configurable.get(
+            "research_source_hash"
+        ) or self._source_pages_hash(topic)
+        try:
+            today = date.fromisoformat(self._today(config))
+        except ValueError:
+            today = None
+        return research_cache.make_key(topic, source_hash=source_hash, today=today)
+
+    def _lookup_research(
+        self, state: ManganizeAgentState, config: RunnableConfig
+    ) -> CachedResearch | None:
+        if not research_cache.enabled:
+            return None
+        return research_cache.get(self._research_cache_key(state, config))
+
+    def _store_research(
+        self, state: ManganizeAgentState, config: RunnableConfig, result: dict
+    ) -> None:
+        response = result["structured_response"]
+        # 関連度が低い結果は一時的な失敗の可能性があるため保存しない
+        if not research_cache.enabled or response.relevance < self.relevance_threshold:
+            return
+        # リサーチ中に取得したページの内容もキーに含めるため、キーは作り直す
+        research_cache.put(
+            self._research_cache_key(state, config),
+            topic_title=response.topic_title,
+            output=response.output,
+            relevance=response.relevance,
         )
+
+    @instrumentation.instrumented("node", NodeName.RESEARCHER)
+    def _researcher_node(
+        self, state: ManganizeAgentState, config: RunnableConfig
+    ) -> Command:
+        if cached := self._lookup_research(state, config):
+            return self._cached_researcher_command(cached)
+        result = self.researcher.invoke(self._researcher_input(state, config))
+        self._store_research(state, config, result)
+        return self._researcher_command(result)
+
+    @instrumentation.instrumented("node", NodeName.RESEARCHER)
+    async def _aresearcher_node(
+        self, state: ManganizeAgentState, config: RunnableConfig
+    ) -> Command:
+        # キャッシュはディスクを読み書きするため、イベントループを塞がないようにする
+        if cached := await asyncio.to_thread(self._lookup_research, state, config):
+            return self._cached_researcher_command(cached)
+        result = await self.researcher.ainvoke(self._researcher_input(state, config))
+        await asyncio.to_thread(self._store_research, state, config, result)
+        return self._researcher_command(result)
+
+    def _researcher_command(self, result: dict) -> Command:
         response = result["structured_response"]
 
         topic_title = response.topic_title
@@ -122,27 +255,66 @@ class ManganizeAgent:
                 "topic_title": topic_title,
                 "research_results": content,
                 "research_results_relevance": relevance,
+                "research_cache_hit": False,
             },
         )
 
-    def _scenario_writer_node(self, state: ManganizeAgentState) -> Command:
-        result = self.scenario_writer.invoke(
-            {
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": state["research_results"] + self.today_prompt,
-                    }
-                ]
-            }
+    def _cached_researcher_command(self, cached: CachedResearch) -> Command:
+        return Command(
+            update={
+                "topic_title": cached.topic_title,
+                "research_results": cached.output,
+                "research_results_relevance": cached.relevance,
+                "research_cache_hit": True,
+            },
         )
 
+    def _scenario_writer_input(
+        self, state: ManganizeAgentState | VariantBranchState, config: RunnableConfig
+    ) -> dict:
+        return {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": state["research_results"] + self._today_prompt(config),
+                }
+            ]
+        }
+
+    @instrumentation.instrumented("node", NodeName.SCENARIO_WRITER)
+    def _scenario_writer_node(
+        self, state: ManganizeAgentState | VariantBranchState, config: RunnableConfig
+    ) -> Command:
+        result = self.scenario_writer.invoke(self._scenario_writer_input(state, config))
+        return self._scenario_writer_command(state, result)
+
+    @instrumentation.instrumented("node", NodeName.SCENARIO_WRITER)
+    async def _ascenario_writer_node(
+        self, state: ManganizeAgentState | VariantBranchState, config: RunnableConfig
+    ) -> Command:
+        result = await self.scenario_writer.ainvoke(
+            self._scenario_writer_input(state, config)
+        )
+        return self._scenario_writer_command(state, result)
+
+    def _scenario_writer_command(
+        self, state: ManganizeAgentState | VariantBranchState, result: dict
+    ) -> Command:
         last_message = result["messages"][-1]
         content = (
             last_message.content
             if isinstance(last_message.content, str)
             else str(last_message.content)
         )
+        if "variant_index" in state:
+            # バリエーションのブランチでは共有の状態を書き換えず、
+            # シナリオを自分のブランチの画像生成にだけ渡す
+            return Command(
+                goto=Send(
+                    NodeName.IMAGE_GENERATOR,
+                    {**state, "scenario": content},
+                )
+            )
         return Command(
             update={
                 "scenario": content,
@@ -150,21 +322,59 @@ class ManganizeAgent:
             goto=NodeName.IMAGE_GENERATOR,
         )
 
-    def _image_generator_node(self, state: ManganizeAgentState) -> Command:
+    @instrumentation.instrumented("node", NodeName.IMAGE_GENERATOR)
+    def _image_generator_node(
+        self, state: ManganizeAgentState | VariantBranchState
+    ) -> Command:
         result = generate_manga_image(state["scenario"], self.character)
+        return self._image_generator_command(state, result)
+
+    @instrumentation.instrumented("node", NodeName.IMAGE_GENERATOR)
+    async def _aimage_generator_node(
+        self, state: ManganizeAgentState | VariantBranchState
+    ) -> Command:
+        result = await agenerate_manga_image(state["scenario"], self.character)
+        return self._image_generator_command(state, result)
+
+    def _image_generator_command(
+        self, state: ManganizeAgentState | VariantBranchState, result: bytes | None
+    ) -> Command:
+        if "variant_index" in state:
+            variant: ManganizeVariant = {
+                "variant_index": state["variant_index"],
+                "scenario": state["scenario"],
+                "generated_image": result,
+            }
+            return Command(update={"variants": [variant]}, goto=END)
         return Command(update={"generated_image": result}, goto=END)
 
-    def _check_relevance(
+    def _route_after_research(
         self, state: ManganizeAgentState
-    ) -> Literal["researcher_is_not_relevant", "researcher_is_relevant"]:
+    ) -> Literal["researcher_is_not_relevant", "researcher_is_relevant"] | list[Send]:
         if state["research_results_relevance"] < self.relevance_threshold:
             return "researcher_is_not_relevant"
-        else:
+
+        variant_count = state.get("variant_count") or 1
+        if variant_count <= 1:
             return "researcher_is_relevant"
 
+        # リサーチ結果を共有して、バリエーションごとのブランチに分岐する
+        # （同時実行数は実行時の config の max_concurrency で制限できる）
+        return [
+            Send(
+                NodeName.SCENARIO_WRITER,
+                VariantBranchState(
+                    variant_index=index,
+                    research_results=state["research_results"],
+                ),
+            )
+            for index in range(variant_count)
+        ]
+
     def compile_graph(
-        self, checkpointer: BaseCheckpointSaver | None = None
+        self, checkpointer: BaseCheckpointSaver | Literal[False] | None = None
     ) -> CompiledStateGraph:
+        # None の場合は InMemorySaver、False の場合はチェックポイントなしでコンパイルする
         if checkpointer is None:
             checkpointer = InMemorySaver()
 
@@ -174,19 +384,25 @@ class ManganizeAgent:
             output_schema=ManganizeOutput,  # type: ignore
         )
 
-        builder.add_node(NodeName.RESEARCHER, self._researcher_node)
-        builder.add_node(NodeName.SCENARIO_WRITER, self._scenario_writer_node)
-        builder.add_node(NodeName.IMAGE_GENERATOR, self._image_generator_node)
+        if self.use_async_nodes:
+            builder.add_node(NodeName.RESEARCHER, self._aresearcher_node)
+            builder.add_node(NodeName.SCENARIO_WRITER, self._ascenario_writer_node)
+            builder.add_node(NodeName.IMAGE_GENERATOR, self._aimage_generator_node)
+        else:
+            builder.add_node(NodeName.RESEARCHER, self._researcher_node)
+            builder.add_node(NodeName.SCENARIO_WRITER, self._scenario_writer_node)
+            builder.add_node(NodeName.IMAGE_GENERATOR, self._image_generator_node)
 
         builder.add_edge(START, NodeName.RESEARCHER)
         builder.add_conditional_edges(
             NodeName.RESEARCHER,
-            self._check_relevance,
+            self._route_after_research,
             path_map={
                 "researcher_is_not_relevant": END,
                 "researcher_is_relevant": NodeName.SCENARIO_WRITER,
             },
         )
-        builder.add_edge(NodeName.SCENARIO_WRITER, NodeName.IMAGE_GENERATOR)
+        # シナリオ作成から画像生成への遷移はノードが返す Command で行う
+        # （バリエーションのブランチでは Send で自分のシナリオを渡すため）
 
         return builder.compile(checkpointer=checkpointer)
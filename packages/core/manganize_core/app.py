@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import UTC, datetime
 from enum import Enum
 from typing import AsyncGenerator, Optional
 
@@ -6,8 +6,9 @@ from bedrock_agentcore import BedrockAgentCoreApp
 from langgraph_checkpoint_aws import AgentCoreMemorySaver
 from pydantic import BaseModel
 
-from manganize_core.agents import ManganizeAgent, NodeName
+from manganize_core.agents import NodeName
 from manganize_core.character import BaseCharacter
+from manganize_core.graph_cache import graph_cache
 
 app = BedrockAgentCoreApp()
 
@@ -47,8 +48,11 @@ async def stream_manganize(payload: dict) -> AsyncGenerator[dict, None]:
     if not character:
         raise ValueError("Character is invalid")
 
-    agent = ManganizeAgent(character)
-    graph = agent.compile_graph(checkpointer=checkpoint_saver)
+    graph = graph_cache.get(
+        character,
+        use_async_nodes=True,
+        checkpointer=checkpoint_saver,
+    )
 
     topic: None | str = payload.get("topic")
     if not topic:
@@ -69,9 +73,9 @@ async def stream_manganize(payload: dict) -> AsyncGenerator[dict, None]:
         # Process researcher node results
         if results := chunk.get(NodeName.RESEARCHER):
             # Get title from agent output
-            title = results.get("topic_title", "") or datetime.now(
-                timezone.utc
-            ).strftime("%Y%m%d_%H%M%S")
+            title = results.get("topic_title", "") or datetime.now(UTC).strftime(
+                "%Y%m%d_%H%M%S"
+            )
 
             # Update status: Writing scenario
             yield GenerationStatus(
@@ -0,0 +1,342 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Literal
+
+from manganize_core.instrumentation import instrumentation, url_tag
+
+# Playwright はブラウザの起動時にインポートする
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Playwright
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+DEFAULT_NUM_BROWSERS = 1
+DEFAULT_CONTEXTS_PER_BROWSER = 2
+DEFAULT_MAX_PAGES_PER_BROWSER = 50
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+DEFAULT_LAUNCH_RETRY_INTERVAL = 60.0
+
+# ページ遷移の完了とみなすイベント（Playwright の `page.goto` の wait_until）
+WaitUntil = Literal["commit", "domcontentloaded", "load", "networkidle"]
+
+
+class BrowserLaunchError(RuntimeError):
+    """ブラウザの起動に失敗した直後で、起動を再試行しなかった場合に送出される"""
+
+
+class RenderedPage:
+    """レンダリング後のページと、再検証に使うレスポンスヘッダー"""
+
+    def __init__(
+        self, html: str, etag: str | None = None, last_modified: str | None = None
+    ):
+        self.html = html
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class _BrowserSlot:
+    """プール内の1つのブラウザと、そのブラウザ上のコンテキスト群"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser: Browser | None = None
+        self.contexts: list[BrowserContext] = []
+        self.pages_served = 0
+        self.in_use = 0
+        self.lock = asyncio.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class BrowserPool:
+    """常駐する Playwright ブラウザのプール
+
+    ヘッドレス Chromium をあらかじめ起動しておき、ブラウザコンテキストを
+    貸し出すことで、取得のたびにブラウザを起動するコストを削減します。
+
+    - ブラウザごとに複数のコンテキストを保持し、同時に取得できるページ数は
+      「ブラウザ数 × コンテキスト数」までに制限されます
+    - ページは取得ごとに作成・破棄し、コンテキストは使い回します
+    - 1つのブラウザで処理したページ数が上限に達すると、使用中のページが
+      なくなった時点でブラウザを再起動します（メモリリーク対策）
+    - ウォッチドッグがブラウザのクラッシュ（切断）を検知して再起動します
+    - 起動に失敗した後は一定時間起動を再試行せず、すぐに `BrowserLaunchError`
+      を送出します（ブラウザが使えない環境で、取得のたびに起動を待たない）
+
+    Playwright の sync API はスレッドをまたいで使えないため、プールは専用の
+    スレッド上のイベントループで async API を使って動作します。呼び出し側は
+    どのスレッドからでも `fetch_page` で利用できます。
+    """
+
+    def __init__(
+        self,
+        num_browsers: int = DEFAULT_NUM_BROWSERS,
+        contexts_per_browser: int = DEFAULT_CONTEXTS_PER_BROWSER,
+        max_pages_per_browser: int = DEFAULT_MAX_PAGES_PER_BROWSER,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+        launch_retry_interval: float = DEFAULT_LAUNCH_RETRY_INTERVAL,
+        user_agent: str = DEFAULT_USER_AGENT,
+    ):
+        self._num_browsers = num_browsers
+        self._contexts_per_browser = contexts_per_browser
+        self._max_pages_per_browser = max_pages_per_browser
+        self._health_check_interval = health_check_interval
+        self._launch_retry_interval = launch_retry_interval
+        self._user_agent = user_agent
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._ready: Future[None] | None = None
+        # 最後に起動に失敗した時刻（time.monotonic）とそのエラー
+        self._launch_failure: tuple[float, BaseException] | None = None
+
+        self._playwright: Playwright | None = None
+        self._slots: list[_BrowserSlot] = []
+        self._leases: asyncio.Queue[tuple[_BrowserSlot, int]] | None = None
+        self._watchdog: asyncio.Task[None] | None = None
+
+    def configure(
+        self,
+        *,
+        num_browsers: int = DEFAULT_NUM_BROWSERS,
+        contexts_per_browser: int = DEFAULT_CONTEXTS_PER_BROWSER,
+        max_pages_per_browser: int = DEFAULT_MAX_PAGES_PER_BROWSER,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+        launch_retry_interval: float = DEFAULT_LAUNCH_RETRY_INTERVAL,
+    ) -> None:
+        """プールの設定を変更する
+
+        プールの起動後に呼び出した場合は、次に起動したときから反映されます。
+
+        Args:
+            num_browsers: 起動しておくブラウザの数
+            contexts_per_browser: ブラウザごとのコンテキスト数
+            max_pages_per_browser: ブラウザを再起動するまでに処理するページ数
+            health_check_interval: ウォッチドッグがブラウザを確認する間隔（秒）
+            launch_retry_interval: 起動に失敗した後、再試行しない時間（秒）
+        """
+        self._num_browsers = num_browsers
+        self._contexts_per_browser = contexts_per_browser
+        self._max_pages_per_browser = max_pages_per_browser
+        self._health_check_interval = health_check_interval
+        self._launch_retry_interval = launch_retry_interval
+
+    def start(self) -> None:
+        """プールを起動し、ブラウザの起動完了まで待つ
+
+        起動済みの場合は何もしません。最初の取得時にも自動で呼び出されます。
+
+        Raises:
+            BrowserLaunchError: 直前の起動の失敗から再試行までの時間が経っていない場合
+        """
+        with self._start_lock:
+            if self._ready is None:
+                failure = self._launch_failure
+                if failure is not None:
+                    failed_at, error = failure
+                    if time.monotonic() - failed_at < self._launch_retry_interval:
+                        raise BrowserLaunchError(
+                            f"Browser launch failed recently: {error}"
+                        ) from error
+                loop = asyncio.new_event_loop()
+                self._loop = loop
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="browser-pool", daemon=True
+                )
+                self._thread.start()
+                self._ready = asyncio.run_coroutine_threadsafe(self._launch(), loop)
+            ready = self._ready
+
+        # 起動を待つ呼び出し（コールドスタート）だけを計測する
+        launching = (
+            nullcontext()
+            if ready.done()
+            else instrumentation.stage("browser", "launch")
+        )
+        try:
+            with launching:
+                ready.result()
+        except Exception as e:
+            # 起動に失敗した場合は、再試行までの時間が経った後の呼び出しで再試行する
+            with self._start_lock:
+                if self._ready is ready:
+                    self._launch_failure = (time.monotonic(), e)
+            self.close()
+            raise
+        self._launch_failure = None
+
+    def fetch_page(
+        self,
+        url: str,
+        *,
+        timeout_ms: int = 30000,
+        wait_until: WaitUntil = "networkidle",
+    ) -> RenderedPage:
+        """プールのブラウザでページを開き、レンダリング後の HTML を取得する
+
+        Args:
+            url: 取得するページの URL
+            timeout_ms: ページ遷移のタイムアウト（ミリ秒）
+            wait_until: ページ遷移の完了とみなすイベント
+
+        Returns:
+            JavaScript レンダリング後の HTML と、最初のレスポンスの
+            ETag / Last-Modified
+
+        Raises:
+            BrowserLaunchError: 直前の起動の失敗から再試行までの時間が経っていない場合
+        """
+        self.start()
+        assert self._loop is not None
+        # 取得はプールのループで実行されるため、呼び出し側で計測する
+        with instrumentation.stage("browser", "fetch", tags={"url": url_tag(url)}):
+            return asyncio.run_coroutine_threadsafe(
+                self._fetch(url, timeout_ms, wait_until), self._loop
+            ).result()
+
+    def close(self) -> None:
+        """すべてのブラウザを終了し、プールのスレッドを停止する"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = self._ready = None
+        if loop is None or thread is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception:
+            logger.exception("Failed to shut down browser pool cleanly")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            if not thread.is_alive():
+                loop.close()
+
+    async def _launch(self) -> None:
+        """Playwright を起動し、すべてのブラウザとコンテキストを準備する"""
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._slots = [_BrowserSlot(index) for index in range(self._num_browsers)]
+        self._leases = asyncio.Queue()
+        for slot in self._slots:
+            await self._restart(slot)
+            for context_index in range(self._contexts_per_browser):
+                self._leases.put_nowait((slot, context_index))
+        self._watchdog = asyncio.create_task(self._watch())
+
+    async def _shutdown(self) -> None:
+        """ウォッチドッグを止め、ブラウザと Playwright を終了する"""
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            await asyncio.gather(self._watchdog, return_exceptions=True)
+        for slot in self._slots:
+            await self._close_browser(slot)
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = None
+        self._slots = []
+        self._leases = None
+        self._watchdog = None
+
+    async def _fetch(
+        self, url: str, timeout_ms: int, wait_until: WaitUntil
+    ) -> RenderedPage:
+        """コンテキストを借りてページを取得する（プールのループ上で実行）"""
+        assert self._leases is not None
+        slot, context_index = await self._leases.get()
+        slot.in_use += 1
+        try:
+            # 再起動中のブラウザでページを開かないようにロックを取る
+            async with slot.lock:
+                if not slot.healthy:
+                    await self._restart(slot)
+                page = await slot.contexts[context_index].new_page()
+
+            try:
+                response = await page.goto(
+                    url, wait_until=wait_until, timeout=timeout_ms
+                )
+                headers = response.headers if response is not None else {}
+                return RenderedPage(
+                    await page.content(),
+                    etag=headers.get("etag"),
+                    last_modified=headers.get("last-modified"),
+                )
+            finally:
+                await page.close()
+        finally:
+            slot.in_use -= 1
+            slot.pages_served += 1
+            if slot.pages_served >= self._max_pages_per_browser and not slot.in_use:
+                async with slot.lock:
+                    if (
+                        slot.pages_served >= self._max_pages_per_browser
+                        and not slot.in_use
+                    ):
+                        try:
+                            await self._restart(slot)
+                        except Exception:
+                            # 次に借りられたときに再起動を再試行する
+                            logger.exception("Failed to restart browser %d", slot.index)
+            if self._leases is not None:
+                self._leases.put_nowait((slot, context_index))
+
+    async def _watch(self) -> None:
+        """クラッシュしたブラウザを定期的に検知して再起動する"""
+        while True:
+            await asyncio.sleep(self._health_check_interval)
+            for slot in self._slots:
+                if slot.healthy or slot.in_use:
+                    continue
+                async with slot.lock:
+                    if slot.healthy or slot.in_use:
+                        continue
+                    logger.warning("Browser %d is disconnected; restarting", slot.index)
+                    try:
+                        await self._restart(slot)
+                    except Exception:
+                        logger.exception("Failed to restart browser %d", slot.index)
+
+    async def _restart(self, slot: _BrowserSlot) -> None:
+        """ブラウザを（再）起動し、コンテキストを作り直す"""
+        assert self._playwright is not None
+        await self._close_browser(slot)
+        browser = await self._playwright.chromium.launch(headless=True)
+        slot.contexts = [
+            await browser.new_context(user_agent=self._user_agent)
+            for _ in range(self._contexts_per_browser)
+        ]
+        slot.browser = browser
+        slot.pages_served = 0
+
+    async def _close_browser(self, slot: _BrowserSlot) -> None:
+        """ブラウザを終了する（クラッシュ済みの場合のエラーは無視する）"""
+        browser, slot.browser = slot.browser, None
+        slot.contexts = []
+        if browser is None:
+            return
+        try:
+            await browser.close()
+        except Exception:
+            logger.debug("Ignoring error while closing browser %d", slot.index)
+
+
+# プロセス全体で共有するブラウザプール
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
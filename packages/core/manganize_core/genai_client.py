@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+# google.genai と httpx は読み込みが重いため、クライアントの生成時にインポートする
+if TYPE_CHECKING:
+    import httpx
+    from google import genai
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+
+class GenaiClientManager:
+    """プロセス全体で共有する genai クライアントを管理するクラス
+
+    呼び出しごとに `genai.Client()` を生成すると、クライアントの構築と
+    TLS/HTTP 接続の確立が毎回発生します。このクラスは keep-alive の
+    コネクションプールを持つクライアントを使い回すことで、画像生成・修正の
+    レイテンシと接続のチャーンを削減します。
+
+    非同期クライアントのコネクションはイベントループに紐づくため、
+    イベントループごとに別のクライアントを保持します。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    ):
+        self._limits = (max_connections, max_keepalive_connections, keepalive_expiry)
+        self._client: genai.Client | None = None
+        self._http_client: httpx.Client | None = None
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, tuple[genai.Client, httpx.AsyncClient]
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        *,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    ) -> None:
+        """コネクションプールの設定を変更する
+
+        以降に生成されるクライアントから新しい設定が適用されます。
+        既存のクライアントは破棄されずに使われ続けるため、
+        アプリケーションの起動時に呼び出してください。
+
+        Args:
+            max_connections: 同時に開くことのできる最大接続数
+            max_keepalive_connections: keep-alive で保持する最大接続数
+            keepalive_expiry: アイドル状態の接続を保持する秒数
+        """
+        with self._lock:
+            self._limits = (
+                max_connections,
+                max_keepalive_connections,
+                keepalive_expiry,
+            )
+
+    def _make_limits(self) -> "httpx.Limits":
+        import httpx
+
+        max_connections, max_keepalive_connections, keepalive_expiry = self._limits
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+
+    def get_client(self) -> "genai.Client":
+        """同期リクエスト用の共有クライアントを取得する
+
+        Returns:
+            共有の genai クライアント
+        """
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        with self._lock:
+            if self._client is None:
+                self._http_client = httpx.Client(
+                    transport=httpx.HTTPTransport(limits=self._make_limits())
+                )
+                self._client = genai.Client(
+                    http_options=types.HttpOptions(httpx_client=self._http_client)
+                )
+            return self._client
+
+    def get_async_client(self) -> "genai.client.AsyncClient":
+        """実行中のイベントループ用の共有非同期クライアントを取得する
+
+        Returns:
+            共有の genai 非同期クライアント（`genai.Client().aio`）
+
+        Raises:
+            RuntimeError: イベントループの外から呼び出された場合
+        """
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                # httpx のクライアントを明示すると aiohttp ではなく httpx が使われ、
+                # コネクションプールの設定が効くようになる
+                http_client = httpx.AsyncClient(
+                    transport=httpx.AsyncHTTPTransport(limits=self._make_limits())
+                )
+                client = genai.Client(
+                    http_options=types.HttpOptions(httpx_async_client=http_client)
+                )
+                entry = self._async_clients[loop] = (client, http_client)
+            return entry[0].aio
+
+    def close(self) -> None:
+        """同期クライアントのコネクションを閉じる"""
+        with self._lock:
+            http_client = self._http_client
+            self._client = self._http_client = None
+        if http_client is not None:
+            http_client.close()
+
+    async def aclose(self) -> None:
+        """実行中のイベントループの非同期クライアントのコネクションを閉じる"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.pop(loop, None)
+        if entry is not None:
+            await entry[1].aclose()
+
+
+# プロセス全体で共有するクライアントマネージャー
+genai_client_manager = GenaiClientManager()
+
+
+def get_genai_client() -> "genai.Client":
+    """同期リクエスト用の共有 genai クライアントを取得する
+
+    Returns:
+        共有の genai クライアント
+    """
+    return genai_client_manager.get_client()
+
+
+def get_async_genai_client() -> "genai.client.AsyncClient":
+    """非同期リクエスト用の共有 genai クライアントを取得する
+
+    Returns:
+        共有の genai 非同期クライアント
+    """
+    return genai_client_manager.get_async_client()
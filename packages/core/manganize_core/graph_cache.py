@@ -0,0 +1,152 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Literal
+
+from langchain.chat_models import BaseChatModel, init_chat_model
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph.state import CompiledStateGraph
+
+from manganize_core.agents import (
+    DEFAULT_RESEARCHER_MODEL,
+    DEFAULT_SCENARIO_WRITER_MODEL,
+    ManganizeAgent,
+)
+from manganize_core.character import BaseCharacter, KurageChan
+
+# モデル名（`init_chat_model` 形式）からチャットモデルを作る関数
+ChatModelFactory = Callable[[str], BaseChatModel]
+
+
+def _init_chat_model(model: str) -> BaseChatModel:
+    return init_chat_model(model=model)
+
+
+def character_fingerprint(character: BaseCharacter) -> str:
+    """キャラクターの同一性を表すハッシュ値を計算する
+
+    プロンプトに影響する項目と参照画像（パスまたは画像バイト列のハッシュ）から
+    計算するため、キャラクターの設定が変われば別の値になります。
+
+    Args:
+        character: 対象のキャラクター
+
+    Returns:
+        SHA-256 の16進文字列
+    """
+    payload = character.model_dump(mode="json", exclude={"portrait", "full_body"})
+    for field in ("portrait", "full_body"):
+        image = getattr(character, field)
+        if isinstance(image, Path):
+            payload[field] = str(image.resolve())
+        else:
+            payload[field] = hashlib.sha256(image).hexdigest()
+
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CompiledGraphCache:
+    """コンパイル済みの ManganizeAgent グラフを使い回すための LRU キャッシュ
+
+    `ManganizeAgent` の構築（チャットモデルの初期化、エージェントの作成、
+    キャラクタープロンプトの生成）とグラフのコンパイルは、キャラクターと
+    モデル設定が同じであれば毎回同じ結果になるため、それらをキーにして
+    キャッシュします。日付やスレッドIDなどの実行ごとの値は、グラフ実行時の
+    config（`configurable`）から渡します。
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self._maxsize = maxsize
+        self._graphs: OrderedDict[tuple, CompiledStateGraph] = OrderedDict()
+        self._lock = threading.Lock()
+        self._chat_model_factory: ChatModelFactory = _init_chat_model
+
+    def configure(self, *, chat_model_factory: ChatModelFactory | None = None) -> None:
+        """グラフの構築方法を設定し直す
+
+        キャッシュ済みのグラフはすべて破棄します。
+
+        Args:
+            chat_model_factory: モデル名からチャットモデルを作る関数。
+                ベンチマークなどで実際のモデルの代わりを使う場合に指定します
+                （None の場合は `init_chat_model`）
+        """
+        with self._lock:
+            self._chat_model_factory = chat_model_factory or _init_chat_model
+            self._graphs.clear()
+
+    def get(
+        self,
+        character: BaseCharacter | None = None,
+        *,
+        researcher_model: str = DEFAULT_RESEARCHER_MODEL,
+        scenario_writer_model: str = DEFAULT_SCENARIO_WRITER_MODEL,
+        relevance_threshold: float = 0.5,
+        use_async_nodes: bool = False,
+        checkpointer: BaseCheckpointSaver | Literal[False] | None = None,
+    ) -> CompiledStateGraph:
+        """キャッシュ済みのグラフを取得し、なければ構築してキャッシュする
+
+        Args:
+            character: 使用するキャラクター（デフォルトはくらげちゃん）
+            researcher_model: リサーチャーのモデル名（`init_chat_model` 形式）
+            scenario_writer_model: シナリオライターのモデル名
+            relevance_threshold: リサーチ結果の関連度の閾値
+            use_async_nodes: 非同期ノードでグラフを構築するかどうか
+            checkpointer: `ManganizeAgent.compile_graph` に渡すチェックポインター。
+                同じインスタンスを渡した呼び出し同士でのみグラフを共有します。
+                None の場合はキャッシュされたグラフの InMemorySaver に全実行の
+                チェックポイントが蓄積されるため、常駐プロセスでは False を推奨します。
+
+        Returns:
+            コンパイル済みのグラフ
+        """
+        character = character or KurageChan()
+        key = (
+            character_fingerprint(character),
+            researcher_model,
+            scenario_writer_model,
+            relevance_threshold,
+            use_async_nodes,
+            id(checkpointer)
+            if isinstance(checkpointer, BaseCheckpointSaver)
+            else checkpointer,
+        )
+
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                return graph
+
+            chat_model_factory = self._chat_model_factory
+
+        # 構築は重いのでロックの外で行う（競合時は後勝ちで問題ない）
+        graph = ManganizeAgent(
+            character=character,
+            researcher_llm=chat_model_factory(researcher_model),
+            scenario_writer_llm=chat_model_factory(scenario_writer_model),
+            relevance_threshold=relevance_threshold,
+            use_async_nodes=use_async_nodes,
+        ).compile_graph(checkpointer=checkpointer)
+
+        with self._lock:
+            self._graphs[key] = graph
+            self._graphs.move_to_end(key)
+            while len(self._graphs) > self._maxsize:
+                self._graphs.popitem(last=False)
+
+        return graph
+
+    def clear(self) -> None:
+        """キャッシュをすべて破棄する"""
+        with self._lock:
+            self._graphs.clear()
+
+
+# プロセス全体で共有するキャッシュ
+graph_cache = CompiledGraphCache()
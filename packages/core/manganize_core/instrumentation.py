@@ -0,0 +1,240 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Literal, ParamSpec, Protocol, TypeVar
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# 計測するステージの種類
+StageKind = Literal[
+    "request",
+    "generation",
+    "node",
+    "llm",
+    "tool",
+    "browser",
+    "convert",
+    "storage",
+    "repository",
+    "database",
+]
+
+_trace_key: ContextVar[str | None] = ContextVar("manganize_trace_key", default=None)
+
+
+def url_tag(url: str) -> str:
+    """URL をステージの付加情報に載せられる形にする
+
+    タグはトレースの出力先にそのまま送られるため、署名付き URL の署名や
+    トークンを含みうるクエリとフラグメント、認証情報を取り除きます。
+
+    Args:
+        url: 記録する URL
+
+    Returns:
+        スキーム・ホスト・パスだけの URL
+    """
+    parts = urlsplit(url)
+    netloc = parts.netloc.rpartition("@")[2]
+    return parts._replace(netloc=netloc, query="", fragment="").geturl()
+
+
+class StageScope:
+    """計測中の 1 つのステージ
+
+    オブザーバーは `attributes` に自分用の状態を保存できます。
+    """
+
+    def __init__(
+        self,
+        kind: StageKind,
+        name: str,
+        model: str = "",
+        tags: Mapping[str, Any] | None = None,
+    ):
+        self.kind = kind
+        self.name = name
+        self.model = model
+        # ステージの付加情報（SQL 文など。メトリクスのラベルには使わない）
+        self.tags: dict[str, Any] = dict(tags or {})
+        # ステージが属する処理の単位（生成 ID など）
+        self.trace_key = _trace_key.get()
+        self.error: BaseException | None = None
+        self.attributes: dict[str, Any] = {}
+
+    @property
+    def outcome(self) -> Literal["success", "error", "cancelled"]:
+        """ステージの結果"""
+        if self.error is None:
+            return "success"
+        if isinstance(self.error, Exception):
+            return "error"
+        return "cancelled"
+
+    def fail(self, error: BaseException | None = None) -> None:
+        """例外を送出せずに失敗したステージを失敗として記録する
+
+        Args:
+            error: 失敗の原因（省略時は汎用のエラー）
+        """
+        self.error = error or RuntimeError(f"{self.kind} {self.name} failed")
+
+
+class StageObserver(Protocol):
+    """ステージの開始・終了を受け取るオブザーバー（メトリクスやトレースの出力先）"""
+
+    def stage_started(self, scope: StageScope) -> None:
+        """ステージの開始時に呼ばれる"""
+
+    def stage_finished(self, scope: StageScope, duration: float) -> None:
+        """ステージの終了時に所要時間（秒、単調時計）とともに呼ばれる"""
+
+
+class Instrumentation:
+    """生成パイプラインの各ステージの計測フック
+
+    生成全体、グラフのノード、LLM の呼び出し、ツール、ブラウザでの取得、
+    ドキュメントの変換、ストレージやデータベースの呼び出しなどを単調時計で
+    計測し、登録されたオブザーバーに通知します。このパッケージはメトリクスや
+    トレースのライブラリに依存せず、Prometheus や OpenTelemetry への出力は
+    オブザーバーを登録する側（Web アプリなど）が行います。
+
+    オブザーバーが登録されていない場合、計測はほとんどコストがかかりません。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._observers: tuple[StageObserver, ...] = ()
+
+    def add_observer(self, observer: StageObserver) -> None:
+        """オブザーバーを登録する
+
+        Args:
+            observer: 登録するオブザーバー
+        """
+        with self._lock:
+            if observer not in self._observers:
+                self._observers = (*self._observers, observer)
+
+    def remove_observer(self, observer: StageObserver) -> None:
+        """オブザーバーの登録を解除する
+
+        Args:
+            observer: 解除するオブザーバー
+        """
+        with self._lock:
+            self._observers = tuple(o for o in self._observers if o is not observer)
+
+    @staticmethod
+    @contextmanager
+    def trace(key: str) -> Iterator[None]:
+        """このコンテキスト内のステージを 1 つの処理の単位にまとめる
+
+        Web リクエストとバックグラウンドのジョブのように、別々のタスクで
+        実行される同じ生成のステージを、トレースなどで関連付けるために使います。
+
+        Args:
+            key: 処理の単位を表すキー（生成 ID など）
+        """
+        token = _trace_key.set(key)
+        try:
+            yield
+        finally:
+            _trace_key.reset(token)
+
+    @contextmanager
+    def stage(
+        self,
+        kind: StageKind,
+        name: str,
+        *,
+        model: str = "",
+        tags: Mapping[str, Any] | None = None,
+    ) -> Iterator[StageScope]:
+        """ブロックの実行をステージとして計測する
+
+        同期・非同期のどちらのコードでも使えます（`await` を含むブロックも可）。
+        ブロック内で送出された例外は失敗として記録し、そのまま送出します。
+
+        Args:
+            kind: ステージの種類
+            name: ステージ名（ノード名、ツール名など）
+            model: 呼び出すモデル名（モデルを使わない場合は空文字）
+            tags: ステージの付加情報
+
+        Yields:
+            計測中のステージ
+        """
+        scope = StageScope(kind, name, model, tags)
+        observers = self._observers
+        if not observers:
+            yield scope
+            return
+
+        self._notify(observers, "stage_started", scope)
+        started_at = time.perf_counter()
+        try:
+            yield scope
+        except BaseException as e:
+            scope.error = e
+            raise
+        finally:
+            duration = time.perf_counter() - started_at
+            self._notify(observers, "stage_finished", scope, duration)
+
+    def instrumented(
+        self, kind: StageKind, name: str | None = None, *, model: str = ""
+    ) -> Callable[[Callable[P, R]], Callable[P, R]]:
+        """関数の呼び出しをステージとして計測するデコレータ
+
+        Args:
+            kind: ステージの種類
+            name: ステージ名（省略時は関数名）
+            model: 呼び出すモデル名
+
+        Returns:
+            デコレータ
+        """
+
+        def decorator(func: Callable[P, R]) -> Callable[P, R]:
+            stage_name = name or getattr(func, "__name__", repr(func))
+
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                    with self.stage(kind, stage_name, model=model):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper  # type: ignore[return-value]
+
+            @functools.wraps(func)
+            def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                with self.stage(kind, stage_name, model=model):
+                    return func(*args, **kwargs)
+
+            return sync_wrapper
+
+        return decorator
+
+    @staticmethod
+    def _notify(observers: tuple[StageObserver, ...], event: str, *args: Any) -> None:
+        # 計測の失敗で本来の処理を止めない
+        for observer in observers:
+            try:
+                getattr(observer, event)(*args)
+            except Exception:
+                logger.exception("Stage observer %r failed", observer)
+
+
+# プロセス全体で共有する計測フック
+instrumentation = Instrumentation()
@@ -0,0 +1,94 @@
+from collections.abc import Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ModelRequest,
+    ModelResponse,
+    ToolCallRequest,
+)
+from langchain_core.messages import ToolMessage
+from langgraph.types import Command
+
+from manganize_core.instrumentation import instrumentation
+from manganize_core.model_limiter import model_limiter
+
+ToolCallResult = ToolMessage | Command
+
+
+def _model_name(request: ModelRequest) -> str | None:
+    model = getattr(request.model, "model", None) or getattr(
+        request.model, "model_name", None
+    )
+    return model if isinstance(model, str) else None
+
+
+class ModelLimitMiddleware(AgentMiddleware):
+    """エージェントのモデル呼び出しごとに `model_limiter` の枠を確保するミドルウェア
+
+    エージェントの実行全体ではなく LLM の呼び出しだけを制限するため、
+    ツールの実行中（Web ページの取得など）は枠を占有しません。
+    """
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        model = _model_name(request)
+        if model is None:
+            return handler(request)
+        with model_limiter.limit(model):
+            return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        model = _model_name(request)
+        if model is None:
+            return await handler(request)
+        async with model_limiter.alimit(model):
+            return await handler(request)
+
+
+class InstrumentationMiddleware(AgentMiddleware):
+    """エージェントの LLM 呼び出しとツール呼び出しを計測するミドルウェア
+
+    `ModelLimitMiddleware` より内側に置くと、待ち行列での待ち時間を含まない
+    呼び出しそのものの時間を計測できます。
+    """
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        model = _model_name(request) or ""
+        with instrumentation.stage("llm", model or "unknown", model=model):
+            return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        model = _model_name(request) or ""
+        with instrumentation.stage("llm", model or "unknown", model=model):
+            return await handler(request)
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolCallResult],
+    ) -> ToolCallResult:
+        with instrumentation.stage("tool", request.tool_call["name"]):
+            return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolCallResult]],
+    ) -> ToolCallResult:
+        with instrumentation.stage("tool", request.tool_call["name"]):
+            return await handler(request)
@@ -0,0 +1,277 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from pydantic import BaseModel
+
+# 待ち行列での順番（1 始まり）を受け取るコールバック。0 は待ちが終わったことを表す
+QueueListener = Callable[[int], None]
+
+_queue_listener: ContextVar[QueueListener | None] = ContextVar(
+    "manganize_queue_listener", default=None
+)
+
+
+class ModelLimit(BaseModel):
+    """モデルごとの呼び出し制限
+
+    0 は制限なしを表します。
+    """
+
+    # 同時に実行できる呼び出しの数
+    max_concurrency: int = 0
+    # 1 分あたりに開始できる呼び出しの数（トークンバケット）
+    requests_per_minute: float = 0
+    # トークンバケットの容量（連続して開始できる呼び出しの数）
+    burst: int = 1
+
+
+def model_key(model: str) -> str:
+    """モデル名から制限のキーを作る
+
+    `google_genai:gemini-2.5-pro` や `models/gemini-2.5-pro` のような
+    プロバイダ・リソースの接頭辞を取り除きます。
+
+    Args:
+        model: モデル名
+
+    Returns:
+        制限のキー（例: `gemini-2.5-pro`）
+    """
+    return model.rsplit(":", 1)[-1].removeprefix("models/")
+
+
+class _Waiter:
+    """待ち行列の 1 件。スレッドからの待ちとイベントループからの待ちの両方を表す"""
+
+    def __init__(self, listener: QueueListener | None):
+        self.listener = listener
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.future: asyncio.Future[None] | None = None
+        self.event: threading.Event | None = None
+
+    @classmethod
+    def for_thread(cls, listener: QueueListener | None) -> "_Waiter":
+        waiter = cls(listener)
+        waiter.event = threading.Event()
+        return waiter
+
+    @classmethod
+    def for_loop(cls, listener: QueueListener | None) -> "_Waiter":
+        waiter = cls(listener)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        return waiter
+
+    def grant(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        elif self.loop is not None and self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+    def notify(self, position: int) -> None:
+        if self.listener is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        # 別のスレッドから通知する場合は、待っている側のイベントループで呼ぶ
+        if self.loop is not None and self.loop is not running_loop:
+            self.loop.call_soon_threadsafe(self.listener, position)
+        else:
+            self.listener(position)
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _ModelState:
+    """1 つのモデルの実行中の数、待ち行列、トークンバケット"""
+
+    def __init__(self, limit: ModelLimit):
+        self.limit = limit
+        self.active = 0
+        self.waiters: deque[_Waiter] = deque()
+        self.tokens = float(max(limit.burst, 1))
+        self.updated = time.monotonic()
+
+    def has_slot(self) -> bool:
+        return self.limit.max_concurrency <= 0 or (
+            self.active < self.limit.max_concurrency
+        )
+
+    def reserve_token(self) -> float:
+        """トークンを 1 つ予約し、使えるようになるまでの秒数を返す"""
+        rate = self.limit.requests_per_minute / 60
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        capacity = float(max(self.limit.burst, 1))
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        # 不足分は前借りし、後続の呼び出しはその分だけ長く待つ
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+
+class ModelLimiter:
+    """モデルごとの同時実行数とリクエストレートの制限
+
+    Gemini のクォータを超える呼び出しで 429 とリトライが連鎖しないよう、
+    モデルごとに同時実行数（セマフォ）と 1 分あたりの開始数（トークンバケット）
+    を制限します。
+
+    - 空きがない場合は到着順の待ち行列に並び、順番を `listen` で登録した
+      コールバックに通知します
+    - 同期コード（スレッド）と非同期コード（イベントループ）の両方から、
+      同じ制限を共有して使えます
+    - 制限が設定されていないモデルは待たずに実行します
+    """
+
+    def __init__(self, limits: dict[str, ModelLimit] | None = None):
+        self._lock = threading.Lock()
+        self._states: dict[str, _ModelState] = {
+            model_key(model): _ModelState(limit)
+            for model, limit in (limits or {}).items()
+        }
+
+    def configure(self, limits: dict[str, ModelLimit]) -> None:
+        """制限を設定し直す
+
+        実行中・待機中の呼び出しには影響しません（新しい呼び出しから適用）。
+
+        Args:
+            limits: モデル名ごとの制限
+        """
+        with self._lock:
+            self._states = {
+                model_key(model): _ModelState(limit) for model, limit in limits.items()
+            }
+
+    @staticmethod
+    @contextmanager
+    def listen(listener: QueueListener) -> Iterator[None]:
+        """このコンテキスト内の呼び出しの待ち行列での順番を通知する
+
+        Args:
+            listener: 順番（1 始まり、待ち終了時は 0）を受け取るコールバック
+        """
+        token = _queue_listener.set(listener)
+        try:
+            yield
+        finally:
+            _queue_listener.reset(token)
+
+    def waiting(self, model: str) -> int:
+        """モデルの待ち行列に並んでいる呼び出しの数
+
+        Args:
+            model: モデル名
+
+        Returns:
+            待っている呼び出しの数
+        """
+        with self._lock:
+            state = self._states.get(model_key(model))
+            return len(state.waiters) if state else 0
+
+    @contextmanager
+    def limit(self, model: str) -> Iterator[None]:
+        """モデルの呼び出し枠を確保して実行する（同期版）
+
+        Args:
+            model: モデル名
+        """
+        state, waiter = self._enter(model, _Waiter.for_thread)
+        if state is None:
+            yield
+            return
+
+        if waiter is not None and waiter.event is not None:
+            waiter.event.wait()
+            waiter.notify(0)
+        try:
+            with self._lock:
+                delay = state.reserve_token()
+            if delay > 0:
+                time.sleep(delay)
+            yield
+        finally:
+            self._release(state)
+
+    @asynccontextmanager
+    async def alimit(self, model: str) -> AsyncIterator[None]:
+        """モデルの呼び出し枠を確保して実行する（非同期版）
+
+        Args:
+            model: モデル名
+        """
+        state, waiter = self._enter(model, _Waiter.for_loop)
+        if state is None:
+            yield
+            return
+
+        if waiter is not None and waiter.future is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._cancel(state, waiter)
+                raise
+            waiter.notify(0)
+        try:
+            with self._lock:
+                delay = state.reserve_token()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self._release(state)
+
+    def _enter(
+        self, model: str, make_waiter: Callable[[QueueListener | None], _Waiter]
+    ) -> tuple[_ModelState | None, _Waiter | None]:
+        # 空きがあればすぐに枠を確保し、なければ待ち行列に並ぶ
+        with self._lock:
+            state = self._states.get(model_key(model))
+            if state is None:
+                return None, None
+            if state.has_slot() and not state.waiters:
+                state.active += 1
+                return state, None
+            waiter = make_waiter(_queue_listener.get())
+            state.waiters.append(waiter)
+            position = len(state.waiters)
+        waiter.notify(position)
+        return state, waiter
+
+    def _release(self, state: _ModelState) -> None:
+        # 枠は先頭の待ちにそのまま引き渡す（後から来た呼び出しに横取りさせない）
+        with self._lock:
+            state.active -= 1
+            if not state.waiters or not state.has_slot():
+                return
+            state.active += 1
+            granted = state.waiters.popleft()
+            remaining = list(state.waiters)
+        granted.grant()
+        for position, waiter in enumerate(remaining, start=1):
+            waiter.notify(position)
+
+    def _cancel(self, state: _ModelState, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter in state.waiters:
+                state.waiters.remove(waiter)
+                return
+        # 枠を引き渡された直後にキャンセルされた場合は次の待ちに回す
+        self._release(state)
+
+
+# プロセス全体で共有するモデル呼び出しの制限（既定では制限なし）
+model_limiter = ModelLimiter()
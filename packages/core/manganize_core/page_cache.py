@@ -0,0 +1,375 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pydantic import BaseModel
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "manganize" / "pages"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# キャッシュキーから除外するトラッキング用のクエリパラメータ
+_TRACKING_PARAMS = frozenset({"fbclid", "gclid", "yclid", "mc_cid", "mc_eid"})
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# 署名付き URL（S3 / GCS など）の署名用のクエリパラメータ
+_SIGNATURE_PARAMS = frozenset({"signature", "awsaccesskeyid", "googleaccessid"})
+_SIGNATURE_PREFIXES = ("x-amz-", "x-goog-")
+
+
+def normalize_url(url: str) -> str:
+    """キャッシュキーとして使うために URL を正規化する
+
+    スキームとホストの小文字化、デフォルトポートとフラグメントの除去、
+    トラッキング用パラメータ（utm_* など）の除去、クエリの並べ替えを行います。
+
+    Args:
+        url: 正規化する URL
+
+    Returns:
+        正規化された URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def is_signed_url(url: str) -> bool:
+    """URL が署名付き URL かどうかを判定する
+
+    署名付き URL は発行のたびに変わるため URL をキャッシュキーに使えず、
+    署名を除いて引くとキャッシュが認可を迂回してしまいます。
+
+    Args:
+        url: 判定する URL
+
+    Returns:
+        署名用のクエリパラメータを含んでいれば True
+    """
+    return any(
+        key.lower() in _SIGNATURE_PARAMS or key.lower().startswith(_SIGNATURE_PREFIXES)
+        for key, _ in parse_qsl(urlsplit(url).query, keep_blank_values=True)
+    )
+
+
+def content_key(data: bytes) -> str:
+    """内容のハッシュから URL の代わりに使うキャッシュキーを作る
+
+    Args:
+        data: ダウンロードした内容
+
+    Returns:
+        内容の SHA-256 を表すキー
+    """
+    return f"urn:sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """ファイルを一時ファイル経由で置き換え、書きかけの内容を読ませない
+
+    同じディレクトリの一時ファイルに書き込んでから `os.replace` で置き換えるため、
+    並行する読み込みやプロセスの異常終了でも、古い内容か新しい内容の
+    どちらかだけが見えます。
+
+    Args:
+        path: 書き込むファイルのパス（親ディレクトリは必要に応じて作成）
+        data: 書き込む内容
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class CachedPage(BaseModel):
+    """キャッシュされたページ"""
+
+    url: str
+    fetched_at: float
+    html: str | None = None
+    markdown: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class _Entry(BaseModel):
+    """ディスク上のエントリ（本文はハッシュで参照する）"""
+
+    url: str
+    fetched_at: float
+    html_hash: str | None = None
+    markdown_hash: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class PageCache:
+    """取得したウェブページと変換後の Markdown のディスクキャッシュ
+
+    エントリは正規化した URL のハッシュをキーに保存し、HTML と Markdown の
+    本文は内容のハッシュをキーとするブロブとして保存します（内容が同じ本文は
+    複数の URL で共有されます）。
+
+    - TTL を過ぎたエントリは `is_fresh` が False になります。ETag や
+      Last-Modified が保存されていれば、条件付きリクエストで再検証できます
+    - ブロブの合計サイズが上限を超えると、最後にアクセスされた時刻が古い
+      エントリから削除します（LRU）
+    - 既定では無効です。ライブラリとして使われたときにホームディレクトリへ
+      書き込まないよう、アプリケーションが `configure` で有効にします
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = False,
+    ):
+        self._directory = Path(directory)
+        self._ttl_seconds = ttl_seconds
+        self._max_bytes = max_bytes
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+
+    def configure(
+        self,
+        *,
+        directory: Path = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = False,
+    ) -> None:
+        """キャッシュの設定を変更する
+
+        Args:
+            directory: キャッシュを保存するディレクトリ
+            ttl_seconds: エントリを新鮮とみなす秒数
+            max_bytes: 本文の合計サイズの上限（バイト）
+            enabled: キャッシュを有効にするかどうか
+        """
+        with self._lock:
+            self._directory = Path(directory)
+            self._ttl_seconds = ttl_seconds
+            self._max_bytes = max_bytes
+            self._enabled = enabled
+            self._total_bytes = None
+
+    @property
+    def enabled(self) -> bool:
+        """キャッシュが有効かどうか"""
+        return self._enabled
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        """エントリが TTL 内かどうかを判定する
+
+        Args:
+            page: 判定するエントリ
+
+        Returns:
+            TTL 内であれば True
+        """
+        return time.time() - page.fetched_at < self._ttl_seconds
+
+    def get(self, url: str) -> CachedPage | None:
+        """URL のエントリを取得する
+
+        TTL を過ぎたエントリも再検証のために返します。
+
+        Args:
+            url: 取得する URL
+
+        Returns:
+            キャッシュされたページ、存在しない場合は None
+        """
+        if not self._enabled:
+            return None
+
+        entry_path = self._entry_path(url)
+        with self._lock:
+            entry = self._read_entry(entry_path)
+            if entry is None:
+                return None
+            try:
+                html = self._read_blob(entry.html_hash)
+                markdown = self._read_blob(entry.markdown_hash)
+            except FileNotFoundError:
+                # 本文が欠けているエントリは壊れているので破棄する
+                entry_path.unlink(missing_ok=True)
+                return None
+            # LRU のためにアクセス時刻を更新する
+            os.utime(entry_path)
+
+        return CachedPage(
+            url=entry.url,
+            fetched_at=entry.fetched_at,
+            html=html,
+            markdown=markdown,
+            etag=entry.etag,
+            last_modified=entry.last_modified,
+        )
+
+    def put(
+        self,
+        url: str,
+        *,
+        html: str | None = None,
+        markdown: str | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """URL のエントリを保存する
+
+        Args:
+            url: 保存する URL
+            html: レンダリング後の HTML
+            markdown: 変換後の Markdown
+            etag: レスポンスの ETag ヘッダー
+            last_modified: レスポンスの Last-Modified ヘッダー
+        """
+        if not self._enabled:
+            return
+
+        with self._lock:
+            entry = _Entry(
+                url=normalize_url(url),
+                fetched_at=time.time(),
+                html_hash=self._write_blob(html),
+                markdown_hash=self._write_blob(markdown),
+                etag=etag,
+                last_modified=last_modified,
+            )
+            atomic_write(self._entry_path(url), entry.model_dump_json().encode("utf-8"))
+            if self._total_bytes is not None and self._total_bytes > self._max_bytes:
+                self._evict()
+
+    def touch(self, url: str) -> None:
+        """再検証に成功したエントリの取得時刻を更新する
+
+        Args:
+            url: 更新する URL
+        """
+        if not self._enabled:
+            return
+
+        entry_path = self._entry_path(url)
+        with self._lock:
+            entry = self._read_entry(entry_path)
+            if entry is None:
+                return
+            entry.fetched_at = time.time()
+            atomic_write(entry_path, entry.model_dump_json().encode("utf-8"))
+
+    def clear(self) -> None:
+        """すべてのエントリと本文を削除する"""
+        with self._lock:
+            shutil.rmtree(self._directory / "entries", ignore_errors=True)
+            shutil.rmtree(self._directory / "blobs", ignore_errors=True)
+            self._total_bytes = 0
+
+    def _entry_path(self, url: str) -> Path:
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return self._directory / "entries" / f"{key}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self._directory / "blobs" / digest[:2] / digest
+
+    def _read_entry(self, entry_path: Path) -> _Entry | None:
+        try:
+            return _Entry.model_validate_json(entry_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def _read_blob(self, digest: str | None) -> str | None:
+        if digest is None:
+            return None
+        return self._blob_path(digest).read_text(encoding="utf-8")
+
+    def _write_blob(self, content: str | None) -> str | None:
+        if content is None:
+            return None
+
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            atomic_write(blob_path, data)
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total_bytes()
+            else:
+                self._total_bytes += len(data)
+        return digest
+
+    def _scan_total_bytes(self) -> int:
+        return sum(
+            path.stat().st_size
+            for path in (self._directory / "blobs").glob("*/*")
+            if path.is_file()
+        )
+
+    def _evict(self) -> None:
+        """古いエントリから削除し、参照されなくなった本文を回収する"""
+        entries = sorted(
+            (self._directory / "entries").glob("*.json"),
+            key=lambda path: path.stat().st_mtime,
+        )
+        # 上限の 9 割まで減らし、毎回の書き込みで削除が走らないようにする
+        target = self._max_bytes * 0.9
+        total = self._total_bytes or 0
+        referenced: dict[str, int] = {}
+        loaded: list[tuple[Path, _Entry]] = []
+        for path in entries:
+            entry = self._read_entry(path)
+            if entry is None:
+                path.unlink(missing_ok=True)
+                continue
+            loaded.append((path, entry))
+            for digest in (entry.html_hash, entry.markdown_hash):
+                if digest is not None:
+                    referenced[digest] = referenced.get(digest, 0) + 1
+
+        # 上書きなどで参照されなくなった本文を先に回収する
+        for blob_path in (self._directory / "blobs").glob("*/*"):
+            if blob_path.name not in referenced:
+                total -= blob_path.stat().st_size
+                blob_path.unlink(missing_ok=True)
+
+        for path, entry in loaded:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            for digest in (entry.html_hash, entry.markdown_hash):
+                if digest is None:
+                    continue
+                referenced[digest] -= 1
+                if referenced[digest] == 0:
+                    blob_path = self._blob_path(digest)
+                    try:
+                        total -= blob_path.stat().st_size
+                        blob_path.unlink()
+                    except FileNotFoundError:
+                        pass
+
+        self._total_bytes = total
+
+
+# プロセス全体で共有するページキャッシュ
+page_cache = PageCache()
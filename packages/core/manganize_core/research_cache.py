@@ -0,0 +1,221 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import date
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from manganize_core.page_cache import atomic_write, normalize_url
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "manganize" / "research"
+DEFAULT_TTL_SECONDS = 3 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_BUCKET_DAYS = 1
+
+_URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
+
+
+def extract_urls(topic: str) -> list[str]:
+    """トピックに含まれる URL を取り出す
+
+    Args:
+        topic: トピック
+
+    Returns:
+        正規化された URL のリスト（重複なし、並べ替え済み）
+    """
+    text = unicodedata.normalize("NFKC", topic)
+    return sorted({normalize_url(url) for url in _URL_PATTERN.findall(text)})
+
+
+def normalize_topic(topic: str) -> str:
+    """キャッシュキーとして使うためにトピックを正規化する
+
+    Unicode 正規化（NFKC）、小文字化、空白の統一を行います。トピック中の
+    URL は `normalize_url` で正規化し、並べ替えて末尾にまとめます。
+
+    Args:
+        topic: 正規化するトピック
+
+    Returns:
+        正規化されたトピック
+    """
+    text = unicodedata.normalize("NFKC", topic)
+    words = _URL_PATTERN.sub(" ", text).lower().split()
+    return " ".join([*words, *extract_urls(topic)])
+
+
+class CachedResearch(BaseModel):
+    """キャッシュされたリサーチ結果"""
+
+    topic_title: str
+    output: str
+    relevance: float
+    created_at: float
+
+
+class ResearchCache:
+    """リサーチャーの出力のディスクキャッシュ
+
+    正規化したトピック、ソースの内容のハッシュ、日付のバケットから作った
+    キーでリサーチ結果を保存します。同じトピックが同じ期間に何度も投稿された
+    場合に、ツールを使うリサーチャーの実行を省略するために使います。
+
+    - TTL を過ぎたエントリは返しません
+    - エントリ数が上限を超えると、最後にアクセスされた時刻が古いものから
+      削除します（LRU）
+    - 既定では無効です。ライブラリとして使われたときにホームディレクトリへ
+      書き込まないよう、アプリケーションが `configure` で有効にします
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        bucket_days: int = DEFAULT_BUCKET_DAYS,
+        enabled: bool = False,
+    ):
+        self._directory = Path(directory)
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._bucket_days = max(bucket_days, 1)
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._entry_count: int | None = None
+
+    def configure(
+        self,
+        *,
+        directory: Path = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        bucket_days: int = DEFAULT_BUCKET_DAYS,
+        enabled: bool = False,
+    ) -> None:
+        """キャッシュの設定を変更する
+
+        Args:
+            directory: キャッシュを保存するディレクトリ
+            ttl_seconds: エントリを有効とみなす秒数
+            max_entries: 保存するエントリ数の上限
+            bucket_days: 同じキーとみなす日数（日付のバケットの幅）
+            enabled: キャッシュを有効にするかどうか
+        """
+        with self._lock:
+            self._directory = Path(directory)
+            self._ttl_seconds = ttl_seconds
+            self._max_entries = max_entries
+            self._bucket_days = max(bucket_days, 1)
+            self._enabled = enabled
+            self._entry_count = None
+
+    @property
+    def enabled(self) -> bool:
+        """キャッシュが有効かどうか"""
+        return self._enabled
+
+    def make_key(
+        self,
+        topic: str,
+        *,
+        source_hash: str | None = None,
+        today: date | None = None,
+    ) -> str:
+        """リサーチ結果のキャッシュキーを作る
+
+        Args:
+            topic: ユーザが入力したトピック
+            source_hash: 添付ドキュメントや参照ページの内容のハッシュ
+            today: 基準日（省略時は今日）
+
+        Returns:
+            キャッシュキー
+        """
+        bucket = (today or date.today()).toordinal() // self._bucket_days
+        material = "\n".join([normalize_topic(topic), source_hash or "", str(bucket)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> CachedResearch | None:
+        """キーのリサーチ結果を取得する
+
+        Args:
+            key: `make_key` で作ったキャッシュキー
+
+        Returns:
+            TTL 内のリサーチ結果、存在しない場合は None
+        """
+        if not self._enabled:
+            return None
+
+        entry_path = self._entry_path(key)
+        with self._lock:
+            try:
+                entry = CachedResearch.model_validate_json(entry_path.read_bytes())
+            except (OSError, ValueError):
+                return None
+            if time.time() - entry.created_at >= self._ttl_seconds:
+                entry_path.unlink(missing_ok=True)
+                if self._entry_count is not None:
+                    self._entry_count -= 1
+                return None
+            # LRU のためにアクセス時刻を更新する
+            os.utime(entry_path)
+        return entry
+
+    def put(self, key: str, *, topic_title: str, output: str, relevance: float) -> None:
+        """リサーチ結果を保存する
+
+        Args:
+            key: `make_key` で作ったキャッシュキー
+            topic_title: トピックのタイトル
+            output: ネタ帳（ファクトシート）
+            relevance: 入力に対する関連度
+        """
+        if not self._enabled:
+            return
+
+        entry = CachedResearch(
+            topic_title=topic_title,
+            output=output,
+            relevance=relevance,
+            created_at=time.time(),
+        )
+        entry_path = self._entry_path(key)
+        with self._lock:
+            if self._entry_count is None:
+                self._entry_count = len(self._entry_paths())
+            if not entry_path.exists():
+                self._entry_count += 1
+            atomic_write(entry_path, entry.model_dump_json().encode("utf-8"))
+            if self._entry_count > self._max_entries:
+                self._evict()
+
+    def clear(self) -> None:
+        """すべてのエントリを削除する"""
+        with self._lock:
+            for path in self._entry_paths():
+                path.unlink(missing_ok=True)
+            self._entry_count = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self._directory / key[:2] / f"{key}.json"
+
+    def _entry_paths(self) -> list[Path]:
+        return list(self._directory.glob("*/*.json"))
+
+    def _evict(self) -> None:
+        """アクセス時刻の古いエントリから上限の 9 割まで削除する"""
+        entries = sorted(self._entry_paths(), key=lambda path: path.stat().st_mtime)
+        target = int(self._max_entries * 0.9)
+        for path in entries[: max(len(entries) - target, 0)]:
+            path.unlink(missing_ok=True)
+        self._entry_count = min(len(entries), target)
+
+
+# プロセス全体で共有するリサーチ結果キャッシュ
+research_cache = ResearchCache()
@@ -0,0 +1,332 @@
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable, Coroutine, Iterator
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeIs, TypeVar, overload
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from google.genai.errors import APIError
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# 一時的な失敗とみなす HTTP ステータス
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+_DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)s\s*$")
+
+
+class RetryPolicy(BaseModel):
+    """リトライの回数と待ち時間の設定"""
+
+    # 最初の呼び出しを含む最大試行回数
+    max_attempts: int = 3
+    # 指数バックオフの初回の待ち時間（秒）と上限（秒）
+    base_delay: float = 4.0
+    max_delay: float = 15.0
+    # サーバが指定した待ち時間（Retry-After など）がこれより長い場合は
+    # リトライせずに諦める
+    max_retry_after: float = 60.0
+
+
+class RetryBudget:
+    """プロセス全体のリトライの予算（トークンバケット）
+
+    呼び出しのたびに `ratio` ずつトークンが貯まり、リトライのたびに 1 つ
+    消費します。上流の障害でほとんどの呼び出しが失敗しても、リトライの数は
+    呼び出し数の `ratio` 倍程度に抑えられるため、リトライが負荷を増幅しません。
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self._lock = threading.Lock()
+        self._ratio = ratio
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def configure(self, *, ratio: float, max_tokens: float) -> None:
+        """予算の設定を変更する
+
+        Args:
+            ratio: 呼び出し 1 回あたりに貯まるトークン
+            max_tokens: 貯められるトークンの上限
+        """
+        with self._lock:
+            self._ratio = ratio
+            self._max_tokens = max_tokens
+            self._tokens = min(self._tokens, max_tokens)
+
+    def deposit(self) -> None:
+        """呼び出し 1 回分のトークンを貯める"""
+        with self._lock:
+            self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    def withdraw(self) -> bool:
+        """リトライ 1 回分のトークンを使う
+
+        Returns:
+            予算が残っていてリトライできる場合は True
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def _is_api_error(error: BaseException) -> TypeIs["APIError"]:
+    # google.genai は読み込みが重いためインポートしない
+    # （読み込まれていなければ APIError は発生していない）
+    errors = sys.modules.get("google.genai.errors")
+    return errors is not None and isinstance(error, errors.APIError)
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    # httpx も CLI 用の依存（rich など）まで読み込むためインポートしない
+    # （読み込まれていなければ httpx のエラーは発生していない）
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(
+        error, (httpx.TimeoutException, httpx.TransportError)
+    )
+
+
+def _causes(error: BaseException) -> Iterator[BaseException]:
+    # ツールは失敗を RuntimeError で包むため、原因をたどって分類する
+    seen: set[int] = set()
+    current: BaseException | None = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def is_retryable(error: BaseException) -> bool:
+    """エラーが一時的な失敗（リトライで回復しうる）かどうかを判定する
+
+    レート制限（429）、サーバエラー（5xx）、タイムアウト、接続エラーは
+    リトライ可能とみなします。リクエストの不備や安全性による拒否などの
+    その他の 4xx は、何度送っても結果が変わらないためリトライしません。
+
+    Args:
+        error: 発生したエラー
+
+    Returns:
+        リトライ可能な場合は True
+    """
+    for cause in _causes(error):
+        if _is_api_error(cause):
+            return cause.code in RETRYABLE_STATUS_CODES
+        if _is_transport_error(cause):
+            return True
+        if isinstance(cause, (TimeoutError, ConnectionError)):
+            return True
+    return False
+
+
+def _parse_retry_after(value: str) -> float | None:
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def _find_retry_delay(details: Any) -> float | None:
+    # google.rpc.RetryInfo の retryDelay（例: "32s"）を探す
+    if isinstance(details, dict):
+        delay = details.get("retryDelay")
+        if isinstance(delay, str) and (match := _DURATION_PATTERN.match(delay)):
+            return float(match.group(1))
+        values = details.values()
+    elif isinstance(details, list):
+        values = details
+    else:
+        return None
+    for value in values:
+        if (found := _find_retry_delay(value)) is not None:
+            return found
+    return None
+
+
+def retry_after(error: BaseException) -> float | None:
+    """サーバが指定した再試行までの待ち時間を取り出す
+
+    `Retry-After` ヘッダー、またはクォータ超過時のエラー詳細に含まれる
+    `RetryInfo.retryDelay` を参照します。
+
+    Args:
+        error: 発生したエラー
+
+    Returns:
+        待ち時間（秒）、指定がない場合は None
+    """
+    for cause in _causes(error):
+        if not _is_api_error(cause):
+            continue
+        headers = getattr(cause.response, "headers", None)
+        value = headers.get("retry-after") if headers is not None else None
+        if value and (delay := _parse_retry_after(value)) is not None:
+            return delay
+        return _find_retry_delay(cause.details)
+    return None
+
+
+class Retrier:
+    """エラーの種類とリトライの予算に応じてリトライするデコレータ
+
+    - 一時的な失敗だけをリトライし、恒久的な失敗はすぐに送出します
+    - サーバが待ち時間を指定した場合はそれに従い、指定がなければ
+      ジッター付きの指数バックオフで待ちます
+    - 非同期関数では `asyncio.sleep` で待つため、イベントループを塞ぎません
+    - プロセス全体のリトライの予算を使い切った場合はリトライしません
+
+    Example:
+        >>> @gemini_retry
+        ... async def call() -> bytes: ...
+    """
+
+    def __init__(
+        self, policy: RetryPolicy | None = None, budget: RetryBudget | None = None
+    ):
+        self.policy = policy or RetryPolicy()
+        self.budget = budget or RetryBudget()
+
+    def configure(
+        self,
+        *,
+        max_attempts: int = 3,
+        base_delay: float = 4.0,
+        max_delay: float = 15.0,
+        max_retry_after: float = 60.0,
+        budget_ratio: float = 0.2,
+        budget_max_tokens: float = 10.0,
+    ) -> None:
+        """リトライの設定を変更する
+
+        Args:
+            max_attempts: 最初の呼び出しを含む最大試行回数
+            base_delay: 指数バックオフの初回の待ち時間（秒）
+            max_delay: 指数バックオフの待ち時間の上限（秒）
+            max_retry_after: 従うサーバ指定の待ち時間の上限（秒）
+            budget_ratio: 呼び出し 1 回あたりに貯まるリトライの予算
+            budget_max_tokens: リトライの予算の上限
+        """
+        self.policy = RetryPolicy(
+            max_attempts=max_attempts,
+            base_delay=base_delay,
+            max_delay=max_delay,
+            max_retry_after=max_retry_after,
+        )
+        self.budget.configure(ratio=budget_ratio, max_tokens=budget_max_tokens)
+
+    def next_delay(self, error: BaseException, attempt: int) -> float | None:
+        """次の試行までの待ち時間を決める
+
+        Args:
+            error: 直前の試行で発生したエラー
+            attempt: 直前の試行の回数（1 始まり）
+
+        Returns:
+            待ち時間（秒）、リトライしない場合は None
+        """
+        policy = self.policy
+        if attempt >= policy.max_attempts or not is_retryable(error):
+            return None
+
+        hinted = retry_after(error)
+        if hinted is not None and hinted > policy.max_retry_after:
+            return None
+
+        if not self.budget.withdraw():
+            logger.warning("Retry budget exhausted; giving up after: %s", error)
+            return None
+
+        if hinted is not None:
+            return hinted
+        # ジッター付きの指数バックオフ（下限は base_delay の半分）
+        ceiling = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+        return random.uniform(min(policy.base_delay / 2, ceiling), ceiling)
+
+    @overload
+    def __call__(
+        self, func: Callable[P, Coroutine[Any, Any, R]]
+    ) -> Callable[P, Coroutine[Any, Any, R]]: ...
+
+    @overload
+    def __call__(self, func: Callable[P, R]) -> Callable[P, R]: ...
+
+    def __call__(self, func: Callable[P, Any]) -> Callable[P, Any]:
+        if inspect.iscoroutinefunction(func):
+            return self._wrap_async(func)
+        return self._wrap_sync(func)
+
+    def _wrap_async(
+        self, func: Callable[P, Coroutine[Any, Any, R]]
+    ) -> Callable[P, Coroutine[Any, Any, R]]:
+        @functools.wraps(func)
+        async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            self.budget.deposit()
+            attempt = 1
+            while True:
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    delay = self.next_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    self._log_retry(func, attempt, delay, e)
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+        return async_wrapper
+
+    def _wrap_sync(self, func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            self.budget.deposit()
+            attempt = 1
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    delay = self.next_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    self._log_retry(func, attempt, delay, e)
+                    time.sleep(delay)
+                    attempt += 1
+
+        return sync_wrapper
+
+    @staticmethod
+    def _log_retry(
+        func: Callable[..., Any], attempt: int, delay: float, error: BaseException
+    ) -> None:
+        logger.warning(
+            "%s failed (attempt %d), retrying in %.1fs: %s",
+            getattr(func, "__qualname__", repr(func)),
+            attempt,
+            delay,
+            error,
+        )
+
+
+# Gemini の呼び出しで共有するリトライ（予算はプロセス全体で共有）
+gemini_retry = Retrier()
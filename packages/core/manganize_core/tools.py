@@ -1,23 +1,37 @@
-import tempfile
+import asyncio
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlparse
 
-import requests
-from google import genai
-from google.genai import types
-from langchain.tools import tool
-from markitdown import MarkItDown
-from PIL import Image
-from playwright.sync_api import sync_playwright
-from tenacity import retry, stop_after_attempt, wait_exponential
+# @tool はデコレーターとして定義時に必要なため、langchain_core はインポート時に読み込む
+from langchain_core.tools import tool
 
+from manganize_core.browser_pool import DEFAULT_USER_AGENT, browser_pool
 from manganize_core.character import BaseCharacter
+from manganize_core.genai_client import get_async_genai_client, get_genai_client
+from manganize_core.instrumentation import instrumentation, url_tag
+from manganize_core.model_limiter import model_limiter
+from manganize_core.page_cache import (
+    CachedPage,
+    content_key,
+    is_signed_url,
+    page_cache,
+)
 from manganize_core.prompts import (
     get_image_generation_system_prompt,
     get_image_revision_system_prompt,
 )
+from manganize_core.retry import gemini_retry
+
+# genai / MarkItDown / PIL / requests は読み込みが重いため、初回の使用時にインポートする
+if TYPE_CHECKING:
+    import requests
+    from google.genai import types
+    from markitdown import MarkItDown
+
+IMAGE_GENERATION_MODEL = "gemini-3-pro-image-preview"
 
 REVISION_IMAGE_TARGET_BYTES = 1_500_000
 REVISION_IMAGE_MIN_QUALITY = 65
@@ -25,7 +39,8 @@ REVISION_IMAGE_QUALITY_STEPS = (90, 85, 80, 75, 70, 65)
 REVISION_IMAGE_MAX_LONG_EDGE = 2048
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=15))
+@instrumentation.instrumented("tool", model=IMAGE_GENERATION_MODEL)
+@gemini_retry
 def generate_manga_image(content: str, character: BaseCharacter) -> bytes | None:
     """マンガの作画を行うエージェントです。
 
@@ -54,44 +69,88 @@ def generate_manga_image(content: str, character: BaseCharacter) -> bytes | None
     """
 
     try:
-        client = genai.Client()
-
-        response = client.models.generate_content(
-            model="gemini-3-pro-image-preview",
-            contents=[
-                types.Part.from_bytes(
-                    data=character.get_portrait_bytes(),
-                    mime_type="image/png",
-                ),
-                types.Part.from_bytes(
-                    data=character.get_full_body_bytes(),
-                    mime_type="image/png",
-                ),
-                types.Part.from_text(text=f"脚本:\n{content}"),
-            ],
-            config=types.GenerateContentConfig(
-                system_instruction=get_image_generation_system_prompt(character),
-                image_config=types.ImageConfig(aspect_ratio="9:16", image_size="2K"),
-                tools=[{"google_search": {}}],
+        client = get_genai_client()
+        contents, config = _build_generation_request(content, character)
+
+        # リトライのたびに枠を確保し直す（待機中は枠を占有しない）
+        with (
+            model_limiter.limit(IMAGE_GENERATION_MODEL),
+            instrumentation.stage(
+                "llm", IMAGE_GENERATION_MODEL, model=IMAGE_GENERATION_MODEL
             ),
-        )
+        ):
+            response = client.models.generate_content(
+                model=IMAGE_GENERATION_MODEL,
+                contents=contents,
+                config=config,
+            )
+        return _extract_image_data(response)
+    except Exception as e:
+        raise RuntimeError(f"画像生成に失敗しました: {e}") from e
 
-        if response.parts is None:
-            return None
 
-        image_parts = [part for part in response.parts if part.inline_data]
+# 同期版と同じステージ名で計測する
+@instrumentation.instrumented(
+    "tool", "generate_manga_image", model=IMAGE_GENERATION_MODEL
+)
+@gemini_retry
+async def agenerate_manga_image(content: str, character: BaseCharacter) -> bytes | None:
+    """`generate_manga_image` の非同期版です。
 
-        if image_parts:
-            # inline_dataから直接バイトデータを取得
-            image_data = (
-                image_parts[0].inline_data.data if image_parts[0].inline_data else None
-            )
-            if image_data:
-                return image_data
+    genai の非同期クライアントでリクエストを送信し、キャラクター画像の読み込みは
+    スレッドで実行するため、イベントループをブロックしません。
+
+    Args:
+        content: 画像生成のためのコンテンツ。漫画化したいテキストやストーリーの説明を含む。
+        character: 使用するキャラクター情報
+
+    Returns:
+        生成された画像のバイトデータ（PNG形式）、失敗時はNone
+    """
+    try:
+        client = get_async_genai_client()
+        contents, config = await asyncio.to_thread(
+            _build_generation_request, content, character
+        )
+
+        # リトライのたびに枠を確保し直す（待機中は枠を占有しない）
+        async with model_limiter.alimit(IMAGE_GENERATION_MODEL):
+            with instrumentation.stage(
+                "llm", IMAGE_GENERATION_MODEL, model=IMAGE_GENERATION_MODEL
+            ):
+                response = await client.models.generate_content(
+                    model=IMAGE_GENERATION_MODEL,
+                    contents=contents,
+                    config=config,
+                )
+        return _extract_image_data(response)
     except Exception as e:
         raise RuntimeError(f"画像生成に失敗しました: {e}") from e
 
-    return None
+
+def _build_generation_request(
+    content: str, character: BaseCharacter
+) -> tuple[list["types.PartUnionDict"], "types.GenerateContentConfig"]:
+    """Build contents and config for an image generation request."""
+    from google.genai import types
+
+    contents: list[types.PartUnionDict] = [
+        types.Part.from_bytes(
+            data=character.get_portrait_bytes(),
+            mime_type="image/png",
+        ),
+        types.Part.from_bytes(
+            data=character.get_full_body_bytes(),
+            mime_type="image/png",
+        ),
+        types.Part.from_text(text=f"脚本:\n{content}"),
+    ]
+    config = types.GenerateContentConfig(
+        system_instruction=get_image_generation_system_prompt(character),
+        image_config=types.ImageConfig(aspect_ratio="9:16", image_size="2K"),
+        tools=[{"google_search": {}}],
+    )
+    return contents, config
 
 
 def _format_revision_payload(revision_payload: dict[str, Any]) -> str:
@@ -144,6 +203,8 @@ def _prepare_revision_base_image(base_image: bytes) -> tuple[bytes, str]:
     This reduces payload size for revision requests while keeping quality high.
     Falls back to the original PNG bytes if conversion fails.
     """
+    from PIL import Image
+
     try:
         image = Image.open(BytesIO(base_image))
 
@@ -200,7 +261,60 @@ def _prepare_revision_base_image(base_image: bytes) -> tuple[bytes, str]:
     return base_image, "image/png"
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=15))
+def _extract_image_data(response: "types.GenerateContentResponse") -> bytes | None:
+    """Return the first inline image of a Gemini response, if any."""
+    if response.parts is None:
+        return None
+
+    image_parts = [part for part in response.parts if part.inline_data]
+    if image_parts:
+        image_data = (
+            image_parts[0].inline_data.data if image_parts[0].inline_data else None
+        )
+        if image_data:
+            return image_data
+
+    return None
+
+
+def _build_revision_request(
+    content: str,
+    prepared_base_image: bytes,
+    base_image_mime_type: str,
+    revision_payload: dict[str, Any],
+    character: BaseCharacter,
+) -> tuple[list["types.PartUnionDict"], "types.GenerateContentConfig"]:
+    """Build contents and config for a revision request."""
+    from google.genai import types
+
+    revision_text = _format_revision_payload(revision_payload)
+    contents: list[types.PartUnionDict] = [
+        types.Part.from_bytes(
+            data=character.get_portrait_bytes(),
+            mime_type="image/png",
+        ),
+        types.Part.from_bytes(
+            data=character.get_full_body_bytes(),
+            mime_type="image/png",
+        ),
+        types.Part.from_bytes(
+            data=prepared_base_image,
+            mime_type=base_image_mime_type,
+        ),
+        types.Part.from_text(
+            text=(f"元トピック:\n{content}\n\n修正指示:\n{revision_text}")
+        ),
+    ]
+    config = types.GenerateContentConfig(
+        system_instruction=get_image_revision_system_prompt(character),
+        image_config=types.ImageConfig(aspect_ratio="9:16", image_size="2K"),
+        tools=[{"google_search": {}}],
+    )
+    return contents, config
+
+
+@instrumentation.instrumented("tool", model=IMAGE_GENERATION_MODEL)
+@gemini_retry
 def edit_manga_image(
     content: str,
     base_image: bytes,
@@ -219,111 +333,212 @@ def edit_manga_image(
         修正後の画像バイトデータ（PNG形式）、失敗時はNone
     """
     try:
-        client = genai.Client()
-        revision_text = _format_revision_payload(revision_payload)
+        client = get_genai_client()
         prepared_base_image, base_image_mime_type = _prepare_revision_base_image(
             base_image
         )
+        contents, config = _build_revision_request(
+            content,
+            prepared_base_image,
+            base_image_mime_type,
+            revision_payload,
+            character,
+        )
 
-        response = client.models.generate_content(
-            model="gemini-3-pro-image-preview",
-            contents=[
-                types.Part.from_bytes(
-                    data=character.get_portrait_bytes(),
-                    mime_type="image/png",
-                ),
-                types.Part.from_bytes(
-                    data=character.get_full_body_bytes(),
-                    mime_type="image/png",
-                ),
-                types.Part.from_bytes(
-                    data=prepared_base_image,
-                    mime_type=base_image_mime_type,
-                ),
-                types.Part.from_text(
-                    text=(f"元トピック:\n{content}\n\n修正指示:\n{revision_text}")
-                ),
-            ],
-            config=types.GenerateContentConfig(
-                system_instruction=get_image_revision_system_prompt(character),
-                image_config=types.ImageConfig(aspect_ratio="9:16", image_size="2K"),
-                tools=[{"google_search": {}}],
+        # リトライのたびに枠を確保し直す（待機中は枠を占有しない）
+        with (
+            model_limiter.limit(IMAGE_GENERATION_MODEL),
+            instrumentation.stage(
+                "llm", IMAGE_GENERATION_MODEL, model=IMAGE_GENERATION_MODEL
             ),
-        )
+        ):
+            response = client.models.generate_content(
+                model=IMAGE_GENERATION_MODEL,
+                contents=contents,
+                config=config,
+            )
+        return _extract_image_data(response)
+    except Exception as e:
+        raise RuntimeError(f"画像修正に失敗しました: {e}") from e
 
-        if response.parts is None:
-            return None
 
-        image_parts = [part for part in response.parts if part.inline_data]
-        if image_parts:
-            image_data = (
-                image_parts[0].inline_data.data if image_parts[0].inline_data else None
-            )
-            if image_data:
-                return image_data
+# 同期版と同じステージ名で計測する
+@instrumentation.instrumented("tool", "edit_manga_image", model=IMAGE_GENERATION_MODEL)
+@gemini_retry
+async def aedit_manga_image(
+    content: str,
+    base_image: bytes,
+    revision_payload: dict[str, Any],
+    character: BaseCharacter,
+) -> bytes | None:
+    """`edit_manga_image` の非同期版です。
+
+    Gemini へのリクエストは genai の非同期クライアントで送信し、PIL による
+    ベース画像の圧縮はスレッドで実行するため、イベントループをブロックしません。
+    リトライ時の待機も非同期で行われます（恒久的な失敗はリトライしません）。
+
+    Args:
+        content: 元トピックのテキスト
+        base_image: 親画像のバイナリ
+        revision_payload: 修正指示（point/box + instruction）
+        character: 使用するキャラクター情報
+
+    Returns:
+        修正後の画像バイトデータ（PNG形式）、失敗時はNone
+    """
+    try:
+        client = get_async_genai_client()
+        prepared_base_image, base_image_mime_type = await asyncio.to_thread(
+            _prepare_revision_base_image, base_image
+        )
+        contents, config = await asyncio.to_thread(
+            _build_revision_request,
+            content,
+            prepared_base_image,
+            base_image_mime_type,
+            revision_payload,
+            character,
+        )
+
+        # リトライのたびに枠を確保し直す（待機中は枠を占有しない）
+        async with model_limiter.alimit(IMAGE_GENERATION_MODEL):
+            with instrumentation.stage(
+                "llm", IMAGE_GENERATION_MODEL, model=IMAGE_GENERATION_MODEL
+            ):
+                response = await client.models.generate_content(
+                    model=IMAGE_GENERATION_MODEL,
+                    contents=contents,
+                    config=config,
+                )
+        return _extract_image_data(response)
     except Exception as e:
         raise RuntimeError(f"画像修正に失敗しました: {e}") from e
 
-    return None
+
+def _conditional_headers(cached: CachedPage | None) -> dict[str, str]:
+    """Build revalidation headers from a cached entry."""
+    headers: dict[str, str] = {}
+    if cached is None:
+        return headers
+    if cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+def _http_get(
+    url: str, *, timeout: float, cached: CachedPage | None = None
+) -> "requests.Response":
+    """GET a URL, revalidating the cached entry when it has validators."""
+    import requests
+
+    return requests.get(
+        url,
+        timeout=timeout,
+        headers={"User-Agent": DEFAULT_USER_AGENT, **_conditional_headers(cached)},
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_markitdown() -> "MarkItDown":
+    """Return a shared MarkItDown instance (converter setup is not free)."""
+    from markitdown import MarkItDown
+
+    return MarkItDown()
+
+
+@instrumentation.instrumented("convert", "markitdown")
+def _convert_html_to_markdown(html: str) -> str:
+    """Convert rendered HTML to Markdown in memory with MarkItDown."""
+    from markitdown import StreamInfo
+
+    result = _get_markitdown().convert_stream(
+        BytesIO(html.encode("utf-8")),
+        stream_info=StreamInfo(
+            mimetype="text/html", extension=".html", charset="utf-8"
+        ),
+    )
+    return result.text_content
+
+
+def _cached_markdown(url: str, cached: CachedPage) -> str:
+    """Return the Markdown of a cached page, converting stored HTML if needed."""
+    if cached.markdown is not None:
+        return cached.markdown
+    if cached.html is None:
+        return ""
+    markdown = _convert_html_to_markdown(cached.html)
+    page_cache.put(
+        url,
+        html=cached.html,
+        markdown=markdown,
+        etag=cached.etag,
+        last_modified=cached.last_modified,
+    )
+    return markdown
 
 
 @tool
 def retrieve_webpage(url: str) -> str:
     """指定されたURLのウェブページを取得し、Markdown形式で返すツール。
 
-    Playwright を使用して JavaScript レンダリング後の HTML を取得し、
-    MarkItDown で LLM 向けに最適化された Markdown に変換します。
+    常駐する Playwright のブラウザプールを使用して JavaScript レンダリング後の
+    HTML を取得し、MarkItDown で LLM 向けに最適化された Markdown に変換します。
+    取得結果はディスクにキャッシュされ、TTL 内であればレンダリングと変換を省略します。
+    TTL を過ぎたエントリは、再レンダリングの前に ETag / Last-Modified で再検証します。
     """
 
-    try:
-        # Playwright でページを取得
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0.0.0 Safari/537.36"
-                )
-            )
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            html = page.content()
-            browser.close()
+    cached = page_cache.get(url)
+    if cached is not None and page_cache.is_fresh(cached):
+        return _cached_markdown(url, cached)
 
-        # MarkItDown で HTML を Markdown に変換
-        md = MarkItDown()
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".html", delete=False, encoding="utf-8"
-        ) as f:
-            f.write(html)
-            f.flush()
-            temp_path = f.name
+    if cached is not None and (cached.etag or cached.last_modified):
+        # 変更がなければ条件付きリクエストだけで済ませ、レンダリングを省略する
+        from requests import RequestException
 
         try:
-            result = md.convert(temp_path)
-            return result.text_content
-        finally:
-            # 一時ファイルを削除
-            Path(temp_path).unlink(missing_ok=True)
+            response = _http_get(url, timeout=10.0, cached=cached)
+        except RequestException:
+            response = None
+        if response is not None and response.status_code == 304:
+            page_cache.touch(url)
+            return _cached_markdown(url, cached)
+
+    try:
+        # 常駐ブラウザプールのコンテキストを借りてページを取得
+        page = browser_pool.fetch_page(url, wait_until="networkidle", timeout_ms=30000)
+
+        # MarkItDown で HTML を Markdown に変換
+        markdown = _convert_html_to_markdown(page.html)
+        page_cache.put(
+            url,
+            html=page.html,
+            markdown=markdown,
+            etag=page.etag,
+            last_modified=page.last_modified,
+        )
+        return markdown
 
     except Exception as e:
         # Playwright が失敗した場合、従来の requests にフォールバック
-        # ただし、Markdown 変換は行わず HTML をそのまま返す
+        # （JavaScript はレンダリングされないが、同じように Markdown に変換する）
         try:
-            response = requests.get(
+            response = _http_get(url, timeout=10.0, cached=cached)
+            if response.status_code == 304 and cached is not None:
+                # 変更がなければキャッシュ済みの内容を使う
+                page_cache.touch(url)
+                return _cached_markdown(url, cached)
+            response.raise_for_status()
+            markdown = _convert_html_to_markdown(response.text)
+            page_cache.put(
                 url,
-                timeout=10.0,
-                headers={
-                    "User-Agent": (
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/120.0.0.0 Safari/537.36"
-                    )
-                },
+                html=response.text,
+                markdown=markdown,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
             )
-            response.raise_for_status()
-            # フォールバック時は HTML をそのまま返す
-            return response.text
+            return markdown
         except Exception as fallback_error:
             raise RuntimeError(
                 f"ウェブページの取得に失敗しました: {e}, "
@@ -337,7 +552,9 @@ def read_document_file(source: str) -> str:
 
     ローカルファイルパスまたは URL を指定できます。
     MarkItDown を使用して様々な形式のドキュメントを LLM 向けに
-    最適化された Markdown に変換します。
+    最適化された Markdown に変換します。URL の変換結果はディスクにキャッシュされ、
+    TTL を過ぎた後は ETag / Last-Modified による再検証を行います。
+    署名付き URL は毎回ダウンロードし、変換結果を内容のハッシュで再利用します。
 
     対応形式:
         - PDF (.pdf)
@@ -354,45 +571,71 @@ def read_document_file(source: str) -> str:
     Returns:
         Markdown 形式に変換されたドキュメント内容
     """
-    md = MarkItDown()
+    from markitdown import StreamInfo
+
+    md = _get_markitdown()
 
     # URL かどうかを判定
     is_url = source.startswith("http://") or source.startswith("https://")
 
     if is_url:
-        # URL からダウンロード
-        response = requests.get(
-            source,
-            timeout=60.0,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0.0.0 Safari/537.36"
-                )
-            },
-        )
+        # 署名付き URL は呼び出しごとに変わり、キャッシュで認可を省略することも
+        # できないため、毎回ダウンロードして変換結果だけを内容のハッシュで引く
+        signed = is_signed_url(source)
+        cached = None if signed else page_cache.get(source)
+        markdown = cached.markdown if cached is not None else None
+        if cached is None or markdown is None:
+            cached = None
+        elif page_cache.is_fresh(cached):
+            return markdown
+
+        # URL からダウンロード（キャッシュがあれば条件付きリクエストで再検証）
+        response = _http_get(source, timeout=60.0, cached=cached)
+        if response.status_code == 304 and markdown is not None:
+            page_cache.touch(source)
+            return markdown
         response.raise_for_status()
 
+        cache_key = source
+        if signed:
+            cache_key = content_key(response.content)
+            converted = page_cache.get(cache_key)
+            if converted is not None and converted.markdown is not None:
+                page_cache.touch(cache_key)
+                return converted.markdown
+
         # URL から拡張子を推測
         parsed_url = urlparse(source)
         url_path = parsed_url.path
         suffix = Path(url_path).suffix or ".pdf"  # デフォルトは PDF
+        mimetype = response.headers.get("Content-Type", "").split(";")[0].strip()
 
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
-            f.write(response.content)
-            temp_path = f.name
+        # 一時ファイルを経由せずにメモリ上で変換する
+        with instrumentation.stage(
+            "convert", "markitdown", tags={"url": url_tag(source)}
+        ):
+            result = md.convert_stream(
+                BytesIO(response.content),
+                stream_info=StreamInfo(
+                    mimetype=mimetype or None,
+                    extension=suffix,
+                    url=source,
+                ),
+            )
 
-        try:
-            result = md.convert(temp_path)
-            return result.text_content
-        finally:
-            Path(temp_path).unlink(missing_ok=True)
+        page_cache.put(
+            cache_key,
+            markdown=result.text_content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return result.text_content
     else:
         # ローカルファイル
         file_path = Path(source)
         if not file_path.exists():
             raise FileNotFoundError(f"ファイルが見つかりません: {source}")
 
-        result = md.convert(str(file_path))
+        with instrumentation.stage("convert", "markitdown"):
+            result = md.convert(str(file_path))
         return result.text_content
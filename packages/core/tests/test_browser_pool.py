@@ -0,0 +1,42 @@
+import pytest
+from manganize_core.browser_pool import BrowserLaunchError, BrowserPool
+
+
+def _failing_pool(
+    monkeypatch: pytest.MonkeyPatch, launch_retry_interval: float
+) -> tuple[BrowserPool, list[int]]:
+    pool = BrowserPool(launch_retry_interval=launch_retry_interval)
+    launches: list[int] = []
+
+    async def launch() -> None:
+        launches.append(len(launches))
+        raise RuntimeError("no browser")
+
+    monkeypatch.setattr(pool, "_launch", launch)
+    return pool, launches
+
+
+def test_failed_launch_is_not_retried_within_the_interval(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pool, launches = _failing_pool(monkeypatch, launch_retry_interval=60)
+
+    with pytest.raises(RuntimeError, match="no browser"):
+        pool.start()
+    # ブラウザを起動せずにすぐ失敗する
+    with pytest.raises(BrowserLaunchError):
+        pool.start()
+
+    assert len(launches) == 1
+
+
+def test_failed_launch_is_retried_after_the_interval(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pool, launches = _failing_pool(monkeypatch, launch_retry_interval=0)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="no browser"):
+            pool.start()
+
+    assert len(launches) == 2
@@ -0,0 +1,112 @@
+import httpx
+import pytest
+from google.genai import errors
+from manganize_core.retry import Retrier, RetryBudget, RetryPolicy, is_retryable
+
+
+def _retrier(**policy: float) -> Retrier:
+    # 予算で打ち切られないよう、十分なトークンを持たせる
+    return Retrier(
+        RetryPolicy.model_validate(policy), RetryBudget(ratio=0, max_tokens=100)
+    )
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        httpx.ReadTimeout("timeout"),
+        httpx.ConnectError("refused"),
+        TimeoutError(),
+        ConnectionResetError(),
+    ],
+)
+def test_transient_errors_are_retryable(error: BaseException) -> None:
+    assert is_retryable(error)
+
+
+def _api_error(code: int, retry_delay: str | None = None) -> errors.APIError:
+    details = (
+        [
+            {
+                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                "retryDelay": retry_delay,
+            }
+        ]
+        if retry_delay
+        else []
+    )
+    return errors.APIError(
+        code, {"error": {"code": code, "message": "error", "details": details}}
+    )
+
+
+def test_permanent_errors_are_not_retryable() -> None:
+    assert not is_retryable(ValueError("bad request"))
+
+
+@pytest.mark.parametrize(
+    ("code", "retryable"), [(429, True), (503, True), (400, False)]
+)
+def test_api_errors_are_classified_by_status(code: int, retryable: bool) -> None:
+    assert is_retryable(_api_error(code)) is retryable
+
+
+def test_wrapped_errors_are_classified_by_their_cause() -> None:
+    # ツールは失敗を RuntimeError で包んで送出する
+    try:
+        try:
+            raise httpx.ReadTimeout("timeout")
+        except httpx.ReadTimeout as e:
+            raise RuntimeError("画像生成に失敗しました") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped)
+
+
+def test_next_delay_backs_off_exponentially_within_bounds() -> None:
+    retrier = _retrier(max_attempts=5, base_delay=1.0, max_delay=3.0)
+
+    for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 3.0), (4, 3.0)]:
+        delay = retrier.next_delay(TimeoutError(), attempt)
+        assert delay is not None
+        assert 0.5 <= delay <= ceiling
+
+
+def test_next_delay_stops_after_max_attempts() -> None:
+    retrier = _retrier(max_attempts=3)
+
+    assert retrier.next_delay(TimeoutError(), 2) is not None
+    assert retrier.next_delay(TimeoutError(), 3) is None
+
+
+def test_next_delay_does_not_retry_permanent_errors() -> None:
+    assert _retrier().next_delay(ValueError("bad request"), 1) is None
+
+
+def test_next_delay_follows_the_server_retry_delay() -> None:
+    retrier = _retrier(max_retry_after=10.0)
+
+    assert retrier.next_delay(_api_error(429, "7s"), 1) == 7.0
+    # サーバの指定が上限より長い場合はリトライしない
+    assert retrier.next_delay(_api_error(429, "30s"), 1) is None
+
+
+def test_next_delay_gives_up_when_the_budget_is_exhausted() -> None:
+    retrier = Retrier(RetryPolicy(), RetryBudget(ratio=0, max_tokens=1))
+
+    assert retrier.next_delay(TimeoutError(), 1) is not None
+    assert retrier.next_delay(TimeoutError(), 1) is None
+
+
+async def test_decorated_coroutine_retries_transient_failures() -> None:
+    calls = 0
+
+    @_retrier(max_attempts=3, base_delay=0.0, max_delay=0.0)
+    async def flaky() -> str:
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            raise TimeoutError
+        return "ok"
+
+    assert await flaky() == "ok"
+    assert calls == 3